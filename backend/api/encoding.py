@@ -0,0 +1,163 @@
+"""
+Response encodings - JSON (orjson when installed), MessagePack and Arrow IPC
+Binary encodings carry NumPy arrays as raw little-endian buffers
+"""
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import pyarrow as pa
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+
+MEDIA_TYPES = {
+    JSON: JSON,
+    "*/*": JSON,
+    "application/*": JSON,
+    MSGPACK: MSGPACK,
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+    ARROW: ARROW,
+}
+
+if ORJSON_AVAILABLE:
+    class FastJSONResponse(JSONResponse):
+        """JSONResponse rendered by orjson (NumPy arrays serialized natively, NaN as null)"""
+
+        def render(self, content: Any) -> bytes:
+            return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+else:
+    class FastJSONResponse(JSONResponse):
+        """JSONResponse that converts NumPy arrays (orjson is not installed)"""
+
+        def render(self, content: Any) -> bytes:
+            return super().render(to_builtin(content))
+
+
+def to_builtin(value: Any) -> Any:
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    if isinstance(value, dict):
+        return {key: to_builtin(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_builtin(item) for item in value]
+    return value
+
+
+def available() -> List[str]:
+    media = [JSON]
+    if MSGPACK_AVAILABLE:
+        media.append(MSGPACK)
+    if ARROW_AVAILABLE:
+        media.append(ARROW)
+    return media
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """
+    The best supported media type for an Accept header
+
+    Highest q wins (earlier entries break ties); anything unsupported or
+    not installed falls back to JSON.
+    """
+    supported = set(available())
+    best, best_q = JSON, -1.0
+    for part in (accept or "").split(","):
+        media, _, params = part.strip().partition(";")
+        media = MEDIA_TYPES.get(media.strip().lower())
+        if media not in supported:
+            continue
+
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > best_q and q > 0:
+            best, best_q = media, q
+    return best
+
+
+def pack_array(array: np.ndarray) -> Dict:
+    """{"dtype", "shape", "data"}: data is the raw little-endian C-order buffer"""
+    array = np.ascontiguousarray(array)
+    array = array.astype(array.dtype.newbyteorder("<"), copy=False)
+    return {"dtype": array.dtype.name, "shape": list(array.shape), "data": array.tobytes()}
+
+
+def msgpack_response(content: Dict) -> Response:
+    """MessagePack body; NumPy arrays become pack_array() maps"""
+    def default(value):
+        if isinstance(value, np.ndarray):
+            return pack_array(value)
+        if isinstance(value, np.generic):
+            return value.item()
+        raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+    return Response(msgpack.packb(content, default=default), media_type=MSGPACK)
+
+
+def upper_offsets(n: int) -> np.ndarray:
+    """Row offsets into a row-major strict upper triangle of an n x n matrix"""
+    lengths = np.arange(n - 1, -1, -1, dtype=np.int32)
+    offsets = np.zeros(n + 1, dtype=np.int32)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+def ragged_upper(flat: np.ndarray, n: int) -> List[np.ndarray]:
+    """A strict upper triangle as rows (views of flat; the last row is empty)"""
+    return np.split(flat, upper_offsets(n)[1:-1]) if n else []
+
+
+def arrow_slots_response(columns: Dict[str, Any], matrix: Optional[np.ndarray], layout: str) -> Response:
+    """
+    Arrow IPC stream with one record batch: a row per slot, 2-D columns as
+    fixed-size lists, and the slot's orthogonality row ("full": N values,
+    "upper": the values right of the diagonal) in the matrix's dtype
+    """
+    arrays, names = [], []
+    for name, values in columns.items():
+        if isinstance(values, np.ndarray) and values.ndim == 2:
+            arrays.append(pa.FixedSizeListArray.from_arrays(pa.array(values.reshape(-1)), values.shape[1]))
+        else:
+            arrays.append(pa.array(values))
+        names.append(name)
+
+    if matrix is not None:
+        n = len(columns["id"])
+        values = pa.array(matrix.reshape(-1))
+        if layout == "upper":
+            arrays.append(pa.ListArray.from_arrays(pa.array(upper_offsets(n)), values))
+        else:
+            arrays.append(pa.FixedSizeListArray.from_arrays(values, n))
+        names.append("orthogonality")
+
+    batch = pa.RecordBatch.from_arrays(arrays, names=names).replace_schema_metadata({"matrix_layout": layout})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return Response(sink.getvalue().to_pybytes(), media_type=ARROW)
@@ -3,120 +3,461 @@ Avadhan API Routes
 """
 import os
 import asyncio
-from typing import Optional, Dict, Any
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, BackgroundTasks
+import hashlib
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Dict, Any, List
+from fastapi import APIRouter, HTTPException, Request, Response
 from pydantic import BaseModel
-import aiofiles
 
 from config import settings
+from api.training_runner import run_training, run_data_parallel
+from api.scheduler import SchedulerFull, TrainingJob, TrainingScheduler
+from api.sessions import WORKER_ID, session_store
+from models.cache import ModelCache
+from models.uploads import UploadError, UploadStore
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
-# In-memory storage for training sessions
+# Sessions owned by this worker (engines, stop events, metrics stores);
+# status, config and metrics are also kept in the shared session_store
 training_sessions: Dict[str, Any] = {}
 
+# Model uploads in progress, and the content-addressed model store
+upload_store = UploadStore(
+    settings.MODELS_DIR,
+    max_bytes=settings.MAX_MODEL_SIZE_MB * 1024 * 1024,
+    chunk_size=settings.UPLOAD_CHUNK_SIZE,
+    session_ttl=settings.UPLOAD_SESSION_TTL,
+)
+
+# Loaded models, shared by every /model/load call in this process
+model_cache = ModelCache(max_bytes=settings.MODEL_CACHE_MB * 1024 * 1024)
+
+# Admission control: bounded concurrent training, priority queue for the rest
+training_scheduler = TrainingScheduler(
+    max_running=settings.MAX_CONCURRENT_TRAINING,
+    max_queued=settings.MAX_QUEUED_TRAINING,
+    cpu_threads=settings.TRAINING_CPU_THREADS,
+    threads_per_job=settings.TRAINING_THREADS_PER_JOB,
+)
+
 # ============== Request/Response Models ==============
 
 class TrainingConfig(BaseModel):
     regime: str = "ashta"  # ashta, shata, sahasra
-    num_slots: int = 8
+    # Performance settings; None = chosen by the regime profile
+    num_slots: Optional[int] = None
+    slot_groups: Optional[int] = None  # 0 = flat slot layout
+    orthogonalization: Optional[str] = None  # exact, incremental
+    lazy_attention: Optional[bool] = None
+    memory_compression: Optional[str] = None  # none, fp16, int8, pq
+    memory_rerank: Optional[int] = None  # exact re-rank candidates for pq
+    routing_threshold: Optional[float] = None  # content routing for unknown threads; None = off
+    negative_queue_size: int = 0  # memory-bank negatives for the contrastive loss; 0 = off
     encoder_dim: int = 384
     orthogonality_weight: float = 0.1
     learning_rate: float = 1e-4
     batch_size: int = 8
+    gradient_accumulation_steps: int = 1
     max_epochs: int = 100
+    episodic_ttl: Optional[float] = None  # seconds; None = never expire
+    dataset_path: Optional[str] = None  # relative to DATASETS_DIR; None = synthetic
+    dataset_format: str = "auto"  # auto, jsonl, parquet, text
+    text_field: str = "text"
+    thread_field: str = "thread_id"
+    shuffle_buffer: int = 1000
+    num_workers: int = 1  # > 1 = data-parallel worker processes (CPU, gloo)
+    sync_every: int = 10  # steps between slot/memory merges across workers
+    checkpoint_every: int = 0  # steps between background checkpoints; 0 = off
+    resume_from: Optional[str] = None  # checkpoint name under the project, or "latest"
 
 class StartTrainingRequest(BaseModel):
     project_id: str
     config: Optional[TrainingConfig] = None
+    priority: int = 0  # higher starts first when training is queued
 
 class StopTrainingRequest(BaseModel):
     project_id: str
     action: str = "stop"  # stop or pause
 
+class TraceRequest(BaseModel):
+    project_id: str
+    steps: int = 5
+    mode: str = "torch"  # torch or cprofile
+
+class BeginUploadRequest(BaseModel):
+    project_id: str
+    filename: str
+    size: Optional[int] = None  # total bytes; writes past it are rejected
+    sha256: Optional[str] = None  # verified on completion; a stored match skips the upload
+    model_type: str = "pytorch"
+
 class LoadModelRequest(BaseModel):
     project_id: str
     model_type: str = "pytorch"  # pytorch, onnx, huggingface, safetensors
+    lazy: bool = False  # memory-map weights, read on first use (pytorch, safetensors)
 
 # ============== Training Endpoints ==============
 
+def resolve_dataset_path(dataset_path: str) -> Path:
+    """Resolve a dataset path, confined to DATASETS_DIR"""
+    base = Path(settings.DATASETS_DIR).resolve()
+    path = (base / dataset_path).resolve()
+    
+    if path != base and base not in path.parents:
+        raise HTTPException(status_code=400, detail="Dataset path outside datasets directory")
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    return path
+
+def dataset_kwargs(config: TrainingConfig) -> Optional[Dict[str, Any]]:
+    """StreamingDataset arguments for a training config (None = synthetic)"""
+    if not config.dataset_path:
+        return None
+    
+    return {
+        "path": str(resolve_dataset_path(config.dataset_path)),
+        "text_field": config.text_field,
+        "thread_field": config.thread_field,
+        "format": config.dataset_format,
+        "shuffle_buffer": config.shuffle_buffer,
+    }
+
+def open_dataset(config: TrainingConfig):
+    """Build the streaming dataset for a training config (None = synthetic)"""
+    from avadhan.dataset import StreamingDataset
+    
+    kwargs = dataset_kwargs(config)
+    if kwargs is None:
+        return None
+    
+    try:
+        return StreamingDataset(**kwargs, repeat=True)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+def resolve_config(config: TrainingConfig) -> TrainingConfig:
+    """Fill unset performance settings from the regime profile"""
+    from avadhan.regimes import PROFILE_KEYS, resolve_regime
+    
+    try:
+        profile = resolve_regime(
+            config.regime,
+            {key: getattr(config, key) for key in PROFILE_KEYS},
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return config.model_copy(update=profile)
+
+def engine_kwargs(config: TrainingConfig) -> Dict[str, Any]:
+    """AvadhanEngine arguments for a resolved training config (device excluded)"""
+    return {
+        "num_slots": config.num_slots,
+        "slot_groups": config.slot_groups,
+        "orthogonalization": config.orthogonalization,
+        "lazy_attention": config.lazy_attention,
+        "memory_compression": config.memory_compression,
+        "memory_rerank": config.memory_rerank,
+        "routing_threshold": config.routing_threshold,
+        "negative_queue_size": config.negative_queue_size,
+        "encoder_dim": config.encoder_dim,
+        "orthogonality_weight": config.orthogonality_weight,
+        "learning_rate": config.learning_rate,
+        "batch_size": config.batch_size,
+        "gradient_accumulation_steps": config.gradient_accumulation_steps,
+        "episodic_ttl": config.episodic_ttl,
+        "profile_window": settings.PROFILE_WINDOW,
+        "metrics_retention": settings.METRICS_RETENTION,
+        "metrics_bucket_size": settings.METRICS_BUCKET_SIZE,
+    }
+
+def checkpoint_dir(project_id: str) -> str:
+    return os.path.join(settings.CHECKPOINTS_DIR, project_id)
+
+def resolve_resume_path(project_id: str, name: str) -> str:
+    """Checkpoint directory to resume from ("latest" or a checkpoint name)"""
+    from avadhan.checkpoint import list_checkpoints
+    
+    checkpoints = list_checkpoints(checkpoint_dir(project_id))
+    if name != "latest":
+        checkpoints = [checkpoint for checkpoint in checkpoints if checkpoint["name"] == name]
+    if not checkpoints:
+        raise HTTPException(status_code=404, detail=f"Checkpoint not found: {name}")
+    
+    return checkpoints[-1]["path"]
+
 @router.post("/train/start")
-async def start_training(request: StartTrainingRequest, background_tasks: BackgroundTasks):
-    """Start Avadhan training"""
-    from avadhan.engine import AvadhanEngine
+async def start_training(request: StartTrainingRequest):
+    """
+    Queue Avadhan training
+    
+    The session is admitted by the training scheduler: it starts at once
+    if fewer than MAX_CONCURRENT_TRAINING sessions are training, otherwise
+    it is queued by priority (status "queued"; see /train/status for its
+    position and estimated start). The engine is built when it starts.
+    """
+    from avadhan.engine import METRIC_FIELDS
+    from avadhan.metrics import MetricsStore
     
     project_id = request.project_id
-    config = request.config or TrainingConfig()
+    config = resolve_config(request.config or TrainingConfig())
     
     # Check if already training
     if project_id in training_sessions:
         session = training_sessions[project_id]
-        if session.get("status") == "training":
+        if session.get("status") in ("queued", "training"):
             return {"success": False, "error": "Training already in progress"}
     
-    # Create engine
-    try:
-        engine = AvadhanEngine(
-            num_slots=config.num_slots,
-            encoder_dim=config.encoder_dim,
-            orthogonality_weight=config.orthogonality_weight,
-            learning_rate=config.learning_rate,
-            device=settings.DEVICE,
+    if config.num_workers > 1 and (config.checkpoint_every or config.resume_from):
+        raise HTTPException(
+            status_code=400,
+            detail="Checkpointing requires a single-process session",
         )
+    resume_path = resolve_resume_path(project_id, config.resume_from) if config.resume_from else None
+    # Opening validates the path (400/404) for data-parallel sessions too,
+    # whose ranks open their own shards when the session starts
+    dataset = open_dataset(config)
+    if config.num_workers > 1:
+        dataset = None
+    
+    if training_scheduler.is_full():
+        raise HTTPException(status_code=503, detail="Training queue is full")
+    
+    # Another worker may own a running session for this project
+    claimed = await asyncio.to_thread(
+        session_store.claim, project_id, config.model_dump(), settings.SESSION_STALE_AFTER, "queued"
+    )
+    if not claimed:
+        return {"success": False, "error": "Training already in progress in another worker"}
+    
+    previous = training_sessions.get(project_id, {})
+    if previous.get("engine"):
+        previous["engine"].close()
+    
+    session = {
+        "project_id": project_id,
+        "engine": None,
+        "config": config.model_dump(),
+        "status": "queued",
+        "current_epoch": 0,
+        "dataset": dataset,
+        "stop_event": threading.Event(),
+        # Replaced by the engine's store when the session starts
+        "metrics": MetricsStore(
+            METRIC_FIELDS,
+            retention=settings.METRICS_RETENTION,
+            bucket_size=settings.METRICS_BUCKET_SIZE,
+        ),
+    }
+    
+    # A loaded model outlives restarts (the cache reference moves with it)
+    if "model_entry" in previous:
+        session["model"] = previous["model"]
+        session["model_entry"] = previous["model_entry"]
+    
+    job = TrainingJob(
+        project_id=project_id,
+        run=lambda job: launch_session(session, config, resume_path, job),
+        max_epochs=config.max_epochs,
+        progress=lambda: session["current_epoch"] - session.get("start_epoch", 0),
+        priority=request.priority,
+        weight=max(1, config.num_workers),
+    )
+    session["scheduled"] = job
+    training_sessions[project_id] = session
+    try:
+        training_scheduler.submit(job)
+    except SchedulerFull as e:
+        # Filled up while the session was being claimed
+        del training_sessions[project_id]
+        session_store.update(project_id, status="failed", error=str(e))
+        raise HTTPException(status_code=503, detail=str(e))
+    if job.started_at is not None:
+        session["status"] = "training"
+    
+    return {
+        "success": True,
+        "message": "Training started" if session["status"] == "training" else "Training queued",
+        "project_id": project_id,
+        "status": session["status"],
+        "config": config.model_dump(),
+        **training_scheduler.queue_status(project_id),
+    }
+
+async def launch_session(session: Dict[str, Any], config: TrainingConfig, resume_path: Optional[str], job):
+    """
+    Build a scheduled session's engine (or data-parallel job) and train it
+    
+    Runs when the scheduler admits the session; the job's share of CPU
+    threads comes from the scheduler. Failures to build are reported as
+    the session's error.
+    """
+    from avadhan.engine import AvadhanEngine
+    from avadhan.distributed import DataParallelJob
+    from avadhan.checkpoint import CheckpointManager
+    
+    project_id = session["project_id"]
+    if session["status"] not in ("queued", "training"):
+        # Stopped before it started
+        return
+    session["status"] = "training"
+    session_store.update(project_id, status="training")
+    
+    try:
+        if config.num_workers > 1:
+            # Data-parallel: workers own the engines; dataset is sharded per rank
+            parallel_job = DataParallelJob(
+                world_size=config.num_workers,
+                engine_kwargs=engine_kwargs(config),
+                max_epochs=config.max_epochs,
+                sync_every=config.sync_every,
+                dataset_kwargs=dataset_kwargs(config),
+                num_threads=max(1, training_scheduler.threads_for(job) // config.num_workers),
+            )
+            session["job"] = parallel_job
+            session["stop_event"] = parallel_job.stop_event
+            await run_data_parallel(session, config.max_epochs)
+            return
         
-        training_sessions[project_id] = {
-            "engine": engine,
-            "config": config.model_dump(),
-            "status": "training",
-            "current_epoch": 0,
-            "metrics": [],
-        }
+        engine = await asyncio.to_thread(AvadhanEngine, **engine_kwargs(config), device=settings.DEVICE)
+        session["engine"] = engine
         
-        # Start training in background
-        background_tasks.add_task(run_training, project_id, config.max_epochs)
+        if resume_path:
+            try:
+                await asyncio.to_thread(engine.load_checkpoint, resume_path)
+            except ValueError as e:
+                raise ValueError(f"Cannot resume from {config.resume_from}: {e}")
+            session["current_epoch"] = session["start_epoch"] = engine.current_epoch
+            session_store.append_metrics(project_id, engine.metrics.rows(limit=None))
+        session["metrics"] = engine.metrics
         
-        return {
-            "success": True,
-            "message": "Training started",
-            "project_id": project_id,
-            "config": config.model_dump(),
-        }
+        if config.checkpoint_every > 0:
+            session["checkpointer"] = CheckpointManager(
+                checkpoint_dir(project_id),
+                keep_last=settings.CHECKPOINT_KEEP_LAST,
+                keep_every=settings.CHECKPOINT_KEEP_EVERY,
+            )
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-async def run_training(project_id: str, max_epochs: int):
-    """Background training loop"""
-    session = training_sessions.get(project_id)
-    if not session:
+        if session.get("engine"):
+            session["engine"].close()
+            session["engine"] = None
+        session["error"] = str(e)
+        session["status"] = "failed"
+        session_store.update(project_id, status="failed", error=str(e))
         return
     
-    engine = session["engine"]
-    
-    for epoch in range(max_epochs):
-        if session["status"] != "training":
-            break
+    # Training runs in the training executor
+    await run_training(session, config.max_epochs, lambda: training_scheduler.threads_for(job))
+
+async def sweep_expired_memory(interval: float):
+    """
+    Periodically expire episodic gists for every session, discard idle
+    resumable uploads and (every UPLOAD_PRUNE_INTERVAL) delete blobs no
+    project file links to any more
+    """
+    last_prune = time.monotonic()
+    while True:
+        await asyncio.sleep(interval)
         
-        # Run training step
-        metrics = engine.training_step()
+        # Part files are deleted off the loop; the uploads themselves are
+        # forgotten on it, where every other upload request runs
+        try:
+            await asyncio.to_thread(upload_store.remove_parts, upload_store.pop_expired())
+        except Exception:
+            logger.exception("Expiring idle uploads failed")
+        if time.monotonic() - last_prune >= settings.UPLOAD_PRUNE_INTERVAL:
+            last_prune = time.monotonic()
+            try:
+                await asyncio.to_thread(upload_store.prune_blobs)
+            except Exception:
+                logger.exception("Pruning upload blobs failed")
+        
+        for project_id, session in list(training_sessions.items()):
+            engine = session.get("engine")
+            if not engine:
+                continue
+            # Off the loop: the memory lock may be held by a training step or consolidation
+            try:
+                await asyncio.to_thread(engine.memory.expire_gists)
+            except Exception:
+                logger.exception(f"Expiring episodic memory failed for {project_id}")
+
+async def sync_sessions(interval: float):
+    """
+    Periodically heartbeat this worker's running sessions in the session
+    store, apply stop requests other workers recorded for them, and mark
+    sessions whose owner stopped heartbeating as interrupted
+    """
+    while True:
+        await asyncio.sleep(interval)
         
-        session["current_epoch"] = epoch + 1
-        session["metrics"].append(metrics)
+        running = {
+            project_id: session for project_id, session in training_sessions.items()
+            if session["status"] in ("queued", "training")
+        }
+        try:
+            requests = await asyncio.to_thread(session_store.heartbeat, list(running))
+            await asyncio.to_thread(session_store.expire, settings.SESSION_STALE_AFTER)
+        except Exception as e:
+            print(f"Session sync failed: {e}")
+            continue
         
-        # Small delay to prevent CPU hogging
-        await asyncio.sleep(0.1)
+        for project_id, action in requests.items():
+            if action and running[project_id]["status"] in ("queued", "training"):
+                stop_session(running[project_id], action)
+
+def stop_session(session: Dict[str, Any], action: str):
+    session["status"] = "paused" if action == "pause" else "stopped"
+    
+    # A queued session just leaves the queue
+    training_scheduler.cancel(session["project_id"])
     
-    session["status"] = "completed"
+    # Training loop exits before its next step
+    if session.get("stop_event"):
+        session["stop_event"].set()
+    
+    session_store.update(session["project_id"], status=session["status"], stop_requested=None)
+
+async def local_session(project_id: str) -> Dict[str, Any]:
+    """This worker's session for project_id (404 if unknown, 409 if another worker owns it)"""
+    session = training_sessions.get(project_id)
+    if session is not None:
+        return session
+    
+    record = await asyncio.to_thread(session_store.get, project_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    raise HTTPException(
+        status_code=409,
+        detail=f"Session is owned by worker {record['owner']}",
+    )
 
 @router.post("/train/stop")
 async def stop_training(request: StopTrainingRequest):
-    """Stop or pause training"""
+    """Stop or pause training (sessions of other workers are stopped by their owner)"""
     project_id = request.project_id
     
     if project_id not in training_sessions:
-        raise HTTPException(status_code=404, detail="Training session not found")
+        record = await asyncio.to_thread(session_store.get, project_id)
+        if record is None:
+            raise HTTPException(status_code=404, detail="Training session not found")
+        
+        requested = await asyncio.to_thread(session_store.request_stop, project_id, request.action)
+        return {
+            "success": requested,
+            "message": f"Training {request.action} requested" if requested else "Training is not running",
+            "status": record["status"],
+            "owner": record["owner"],
+        }
     
     session = training_sessions[project_id]
-    session["status"] = "paused" if request.action == "pause" else "stopped"
+    stop_session(session, request.action)
     
     return {
         "success": True,
@@ -128,58 +469,246 @@ async def stop_training(request: StopTrainingRequest):
 async def get_training_status(project_id: str):
     """Get training status"""
     if project_id not in training_sessions:
-        return {"success": False, "error": "Session not found", "status": "idle"}
+        record = await asyncio.to_thread(session_store.get, project_id)
+        if record is None:
+            return {"success": False, "error": "Session not found", "status": "idle"}
+        
+        latest = await asyncio.to_thread(session_store.metrics, project_id, None, 1)
+        return {
+            "success": True,
+            "status": record["status"],
+            "current_epoch": record["current_epoch"],
+            "config": record["config"],
+            "latest_metrics": latest[-1] if latest else None,
+            "slots": record["slots"] or [],
+            "checkpoints": None,
+            "error": record["error"],
+            "owner": record["owner"],
+            # The queue belongs to the owning worker
+            "queue_position": None,
+            "estimated_start": None,
+        }
     
     session = training_sessions[project_id]
     engine = session.get("engine")
+    checkpointer = session.get("checkpointer")
     
     return {
         "success": True,
         "status": session["status"],
         "current_epoch": session["current_epoch"],
         "config": session["config"],
-        "latest_metrics": session["metrics"][-1] if session["metrics"] else None,
-        "slots": engine.get_slot_states() if engine else [],
+        "latest_metrics": session["metrics"].latest(),
+        "slots": session.get("slots") or (engine.get_slot_states() if engine else []),
+        "checkpoints": checkpointer.get_status() if checkpointer else None,
+        "error": session.get("error"),
+        "owner": WORKER_ID,
+        "priority": session["scheduled"].priority,
+        **training_scheduler.queue_status(project_id),
     }
 
-# ============== Model Endpoints ==============
+@router.get("/train/queue")
+async def get_training_queue():
+    """Running and queued training sessions of this worker, with thread shares and start estimates"""
+    return {"success": True, **training_scheduler.get_status()}
 
-@router.post("/model/upload")
-async def upload_model(
-    file: UploadFile = File(...),
-    project_id: str = Form(...),
-    model_type: str = Form("pytorch"),
-):
-    """Upload a model file"""
-    # Validate file size
-    content = await file.read()
-    size_mb = len(content) / (1024 * 1024)
+@router.get("/train/checkpoints/{project_id}")
+async def list_training_checkpoints(project_id: str):
+    """List a project's checkpoints on disk, oldest first"""
+    from avadhan.checkpoint import list_checkpoints
+    
+    checkpoints = await asyncio.to_thread(list_checkpoints, checkpoint_dir(project_id))
+    return {
+        "success": True,
+        "checkpoints": [
+            {key: value for key, value in checkpoint.items() if key != "path"}
+            for checkpoint in checkpoints
+        ],
+    }
+
+# ============== Profiling Endpoints ==============
+
+@router.get("/profile/{project_id}")
+async def get_profile(project_id: str):
+    """Get per-stage timing percentiles for a session"""
+    session = await local_session(project_id)
+    engine = session.get("engine")
+    
+    # Data-parallel sessions report rank 0's timings at each sync point
+    profile = engine.get_profile() if engine else session.get("profile")
+    if profile is None:
+        raise HTTPException(status_code=404, detail="No profile available yet")
+    
+    return {
+        "success": True,
+        "current_epoch": session["current_epoch"],
+        **profile,
+    }
+
+@router.post("/profile/trace")
+async def start_trace(request: TraceRequest):
+    """Dump a torch.profiler / cProfile trace of the next N training steps"""
+    project_id = request.project_id
     
-    if size_mb > settings.MAX_MODEL_SIZE_MB:
+    session = await local_session(project_id)
+    engine = session.get("engine")
+    if not engine:
+        raise HTTPException(status_code=400, detail="Tracing requires a single-process session")
+    if not 1 <= request.steps <= settings.MAX_TRACE_STEPS:
         raise HTTPException(
             status_code=400,
-            detail=f"File too large. Max: {settings.MAX_MODEL_SIZE_MB}MB"
+            detail=f"steps must be between 1 and {settings.MAX_TRACE_STEPS}",
         )
     
-    # Save file
-    save_dir = os.path.join(settings.MODELS_DIR, project_id)
-    os.makedirs(save_dir, exist_ok=True)
-    
-    file_path = os.path.join(save_dir, file.filename)
-    async with aiofiles.open(file_path, "wb") as f:
-        await f.write(content)
+    try:
+        trace = engine.request_trace(
+            request.steps,
+            os.path.join(settings.PROFILES_DIR, project_id),
+            request.mode,
+        )
+    except (ValueError, RuntimeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return {
         "success": True,
-        "filename": file.filename,
-        "size_mb": round(size_mb, 2),
+        "trace": trace.get_status(),
+    }
+
+# ============== Model Endpoints ==============
+
+def upload_response(result: Dict[str, Any], filename: str, model_type: str) -> Dict[str, Any]:
+    return {
+        "success": True,
+        "filename": filename,
+        "size_mb": round(result["size"] / (1024 * 1024), 2),
         "model_type": model_type,
-        "path": file_path,
+        "path": result["path"],
+        "sha256": result["sha256"],
+        "deduplicated": result["deduplicated"],
+    }
+
+@router.post("/model/upload")
+async def upload_model(request: Request):
+    """
+    Upload a model file (multipart: file, project_id, model_type)
+    
+    The body is parsed as it arrives and the file is streamed to disk and
+    hashed chunk by chunk, so an oversized upload is rejected from its
+    Content-Length, or as soon as the limit is passed, not after receiving it.
+    """
+    try:
+        length = int(request.headers["content-length"]) if "content-length" in request.headers else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Content-Length")
+    
+    try:
+        result, fields = await upload_store.receive_form(
+            request.stream(), request.headers.get("content-type", ""), length
+        )
+    except UploadError as e:
+        raise HTTPException(status_code=e.status, detail=str(e))
+    
+    filename = os.path.basename(result["path"])
+    return upload_response(result, filename, fields.get("model_type", "pytorch"))
+
+@router.post("/model/uploads")
+async def begin_upload(request: BeginUploadRequest):
+    """
+    Start a resumable upload
+    
+    If a file with the given sha256 is already stored it is linked into the
+    project right away and no data needs to be sent ("complete": true).
+    """
+    try:
+        if request.sha256:
+            result = await asyncio.to_thread(
+                upload_store.dedupe, request.project_id, request.filename, request.sha256
+            )
+            if result is not None:
+                return {
+                    **upload_response(result, request.filename, request.model_type),
+                    "complete": True,
+                }
+        
+        upload = upload_store.begin(
+            request.project_id, request.filename, request.size, request.sha256
+        )
+    except UploadError as e:
+        raise HTTPException(status_code=e.status, detail=str(e))
+    
+    return {
+        "success": True,
+        "complete": False,
+        "chunk_size": upload_store.chunk_size,
+        **upload.get_status(),
+    }
+
+@router.get("/model/uploads/{upload_id}")
+async def get_upload(upload_id: str):
+    """Upload progress; resume by sending from the returned offset"""
+    try:
+        return upload_store.get(upload_id).get_status()
+    except UploadError as e:
+        raise HTTPException(status_code=e.status, detail=str(e))
+
+@router.put("/model/uploads/{upload_id}")
+async def write_upload(upload_id: str, offset: int, request: Request):
+    """
+    Append the raw request body at offset
+    
+    The body is streamed, so an oversized part is rejected as soon as it
+    crosses the limit (or up front, from Content-Length).
+    """
+    try:
+        upload = upload_store.get(upload_id)
+        
+        length = request.headers.get("content-length")
+        limit = upload_store.max_bytes if upload.size is None else upload.size
+        if length is not None and length.isdigit() and offset + int(length) > limit:
+            raise UploadError(f"Part exceeds the upload size limit of {limit} bytes", status=413)
+        
+        received = await upload_store.write(upload, request.stream(), offset)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status, detail=str(e))
+    
+    return {"success": True, "offset": received, "size": upload.size}
+
+@router.post("/model/uploads/{upload_id}/complete")
+async def complete_upload(upload_id: str, model_type: str = "pytorch"):
+    """Verify the upload's size and SHA-256 and store it in the project"""
+    try:
+        upload = upload_store.get(upload_id)
+        if upload.lock.locked():
+            raise UploadError("A write to this upload is in progress", status=409)
+        result = await asyncio.to_thread(upload_store.commit, upload)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status, detail=str(e))
+    
+    return upload_response(result, upload.filename, model_type)
+
+@router.delete("/model/uploads/{upload_id}")
+async def abort_upload(upload_id: str):
+    """Discard an upload and its received data"""
+    if not upload_store.abort(upload_id):
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    return {"success": True}
+
+def onnx_options() -> Dict[str, Any]:
+    """ONNX Runtime session settings for ModelLoader"""
+    return {
+        "pool_size": settings.ONNX_SESSION_POOL_SIZE,
+        "intra_op_threads": settings.ONNX_INTRA_OP_THREADS,
+        "inter_op_threads": settings.ONNX_INTER_OP_THREADS,
+        "parallel": settings.ONNX_PARALLEL_EXECUTION,
+        "optimized_dir": (
+            os.path.join(settings.MODELS_DIR, ".onnx-cache") if settings.ONNX_CACHE_OPTIMIZED else None
+        ),
     }
 
 @router.post("/model/load")
 async def load_model(request: LoadModelRequest):
-    """Load a model into the engine"""
+    """Load a model into the engine (served from the model cache when unchanged)"""
     from models.loader import ModelLoader
     
     project_id = request.project_id
@@ -189,53 +718,225 @@ async def load_model(request: LoadModelRequest):
         raise HTTPException(status_code=404, detail="Model directory not found")
     
     try:
-        loader = ModelLoader(device=settings.DEVICE)
-        model = loader.load(model_dir, request.model_type)
+        loader = ModelLoader(device=settings.DEVICE, cache=model_cache)
+        start = time.perf_counter()
+        options = onnx_options() if request.model_type == "onnx" else {"lazy": request.lazy}
+        entry = await asyncio.to_thread(loader.acquire, model_dir, request.model_type, **options)
+        load_s = time.perf_counter() - start
         
-        # Store in session
-        if project_id in training_sessions:
-            training_sessions[project_id]["model"] = model
+        # Store in session; the session holds a cache reference until replaced
+        session = training_sessions.get(project_id)
+        if session is not None:
+            previous = session.get("model_entry")
+            session["model"] = entry.model
+            session["model_entry"] = entry
+            if previous is not None:
+                loader.release(previous)
+        else:
+            loader.release(entry)
         
         return {
             "success": True,
             "message": "Model loaded",
             "model_type": request.model_type,
+            "load_s": round(load_s, 4),
+            "bytes": entry.nbytes,
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/model/cache")
+async def get_model_cache():
+    """Model cache contents and hit/miss/eviction counts"""
+    return model_cache.get_status()
+
 # ============== Slot Endpoints ==============
 
 @router.get("/slots/{project_id}")
-async def get_slots(project_id: str):
-    """Get slot states"""
-    if project_id not in training_sessions:
-        raise HTTPException(status_code=404, detail="Session not found")
+async def get_slots(
+    project_id: str,
+    request: Request,
+    matrix: str = "full",
+    dtype: str = "float32",
+):
+    """
+    Get slot states
+    
+    The encoding follows the Accept header: JSON by default, MessagePack
+    (application/msgpack) or Arrow IPC (application/vnd.apache.arrow.stream)
+    with arrays as raw buffers. matrix is "full", "upper" (strict upper
+    triangle; the matrix is symmetric with a unit diagonal) or "none";
+    dtype (float32 or float16) applies to binary encodings.
+    """
+    from api import encoding
     
-    engine = training_sessions[project_id].get("engine")
+    session = await local_session(project_id)
+    engine = session.get("engine")
     if not engine:
         raise HTTPException(status_code=404, detail="Engine not initialized")
     
-    return {
-        "success": True,
-        "slots": engine.get_slot_states(),
-        "orthogonality_matrix": engine.get_orthogonality_matrix(),
-    }
+    if matrix not in ("full", "upper", "none"):
+        raise HTTPException(status_code=400, detail="matrix must be full, upper or none")
+    if dtype not in ("float32", "float16"):
+        raise HTTPException(status_code=400, detail="dtype must be float32 or float16")
+    
+    media = encoding.negotiate(request.headers.get("accept"))
+    
+    def build():
+        values = None
+        if matrix != "none":
+            values = engine.get_orthogonality_array(upper=matrix == "upper")
+        
+        if media == encoding.JSON:
+            slots = engine.get_slot_states()
+            content = {"success": True, "slots": slots, "matrix_layout": matrix}
+            if values is not None:
+                content["orthogonality_matrix"] = (
+                    encoding.ragged_upper(values, len(slots)) if matrix == "upper" else values
+                )
+            return encoding.FastJSONResponse(content)
+        
+        columns = engine.get_slot_columns()
+        if values is not None:
+            values = values.astype(dtype, copy=False)
+        if media == encoding.ARROW:
+            return encoding.arrow_slots_response(columns, values, matrix)
+        
+        content = {"success": True, "count": len(columns["id"]), "slots": columns, "matrix_layout": matrix}
+        if values is not None:
+            content["orthogonality_matrix"] = values
+        return encoding.msgpack_response(content)
+    
+    return await asyncio.to_thread(build)
 
 # ============== Metrics Endpoints ==============
 
+def stored_metrics(
+    project_id: str,
+    since_epoch: Optional[int],
+    stride: int,
+    limit: int,
+    fields: Optional[List[str]],
+    points: Optional[int],
+    method: str,
+) -> Dict[str, Any]:
+    """
+    Metrics of another worker's session, queried from the session store
+    
+    Filtering happens in the store, so only the requested range (and
+    fields) is read; stored steps are full resolution, so there are no
+    downsampled buckets.
+    """
+    import numpy as np
+    from avadhan.engine import METRIC_FIELDS
+    from avadhan.metrics import downsample_series
+    
+    latest = session_store.metrics(project_id, None, 1, 1, fields)
+    result: Dict[str, Any] = {"latest": latest[-1] if latest else None}
+    if points is not None:
+        names = [name for name in (fields or METRIC_FIELDS) if name != "epoch"]
+        columns = session_store.series(project_id, names, since_epoch)
+        values = np.stack([columns[name] for name in names], axis=1) if names else np.empty((0, 0))
+        result["series"] = downsample_series(columns["epoch"], names, values, points, method)
+    else:
+        result["metrics_history"] = session_store.metrics(project_id, since_epoch, limit, stride, fields)
+        result["downsampled"] = []
+    return result
+
 @router.get("/metrics/{project_id}")
-async def get_metrics(project_id: str, limit: int = 100):
-    """Get training metrics history"""
-    if project_id not in training_sessions:
-        raise HTTPException(status_code=404, detail="Session not found")
+async def get_metrics(
+    project_id: str,
+    request: Request,
+    limit: int = 100,
+    since_epoch: Optional[int] = None,
+    stride: int = 1,
+    downsampled: bool = False,
+    fields: Optional[str] = None,
+    points: Optional[int] = None,
+    method: str = "lttb",
+):
+    """
+    Get training metrics history
     
-    session = training_sessions[project_id]
-    metrics = session.get("metrics", [])
+    Returns the last `limit` full-resolution steps with epoch >= since_epoch,
+    every stride-th step; with downsampled=true also the min/max/mean
+    buckets that older steps were folded into. fields (comma-separated)
+    selects columns.
     
-    return {
+    With points, returns "series" instead: about that many samples per
+    field (method lttb or minmax) over everything since since_epoch.
+    
+    Pass "cursor" back as since_epoch to fetch only new steps. The ETag
+    changes only when the history does, so polls with If-None-Match get
+    304 Not Modified while nothing has been recorded.
+    """
+    from avadhan.engine import METRIC_FIELDS
+    from avadhan.metrics import DOWNSAMPLE_METHODS
+    from api.encoding import FastJSONResponse
+    
+    if limit < 1 or stride < 1 or (points is not None and points < 1):
+        raise HTTPException(status_code=400, detail="limit, stride and points must be positive")
+    if method not in DOWNSAMPLE_METHODS:
+        raise HTTPException(status_code=400, detail=f"method must be one of {', '.join(DOWNSAMPLE_METHODS)}")
+    
+    # Another worker's session is read back from the session store
+    session = training_sessions.get(project_id)
+    if session is not None:
+        store = session["metrics"]
+        token, total_steps, current_epoch = store.token, len(store), session["current_epoch"]
+        available = store.fields
+    else:
+        record = await asyncio.to_thread(session_store.get, project_id)
+        if record is None:
+            raise HTTPException(status_code=404, detail="Session not found")
+        store = None
+        token = f"{record['owner']}@{record['started_at']}"
+        total_steps, current_epoch = record["total_steps"], record["current_epoch"]
+        available = METRIC_FIELDS
+    
+    selected = None
+    if fields:
+        selected = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in selected if name not in available]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown metrics fields: {', '.join(unknown)}")
+        if "epoch" not in selected:
+            selected.insert(0, "epoch")
+    
+    query = hashlib.sha1(str(request.url.query).encode()).hexdigest()[:8]
+    etag = f'W/"{token}-{total_steps}-{query}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    
+    if store is None:
+        result = await asyncio.to_thread(
+            stored_metrics, project_id, since_epoch, stride, limit, selected, points, method
+        )
+        latest = result["latest"]
+    else:
+        latest = store.latest()
+        if latest and selected:
+            latest = {name: latest[name] for name in selected if name in latest}
+    
+    response = {
         "success": True,
-        "current_epoch": session["current_epoch"],
-        "metrics_history": metrics[-limit:],
-        "latest": metrics[-1] if metrics else None,
+        "current_epoch": current_epoch,
+        "total_steps": total_steps,
+        "cursor": latest["epoch"] + 1 if latest else since_epoch,
+        "latest": latest,
     }
+    if points is not None:
+        response["method"] = method
+        if store is None:
+            response["series"] = result["series"]
+        else:
+            response["series"] = await asyncio.to_thread(store.downsample, points, since_epoch, selected, method)
+    else:
+        if store is None:
+            response["metrics_history"] = result["metrics_history"]
+        else:
+            response["metrics_history"] = store.rows(since_epoch, stride, limit, selected)
+        if downsampled:
+            response["downsampled"] = result["downsampled"] if store is None else store.bucket_rows(since_epoch, selected)
+    return FastJSONResponse(response, headers=headers)
@@ -0,0 +1,232 @@
+"""
+Training scheduler - Admission control for training sessions
+A bounded number of sessions train at once; the rest wait in a priority queue
+"""
+import asyncio
+import itertools
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+
+class SchedulerFull(Exception):
+    """The training queue is at capacity"""
+
+
+@dataclass
+class TrainingJob:
+    """
+    A session waiting for, or holding, a training slot
+
+    run(job) builds the session's engine and trains it; the slot is held
+    until it returns. progress() is the number of steps done so far.
+    weight is the job's share of CPU threads relative to other jobs
+    (its worker process count for data-parallel sessions).
+    """
+    project_id: str
+    run: Callable[["TrainingJob"], Awaitable[None]]
+    max_epochs: int
+    progress: Callable[[], int] = lambda: 0
+    priority: int = 0
+    weight: int = 1
+    seq: int = 0
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    def get_status(self) -> Dict:
+        return {
+            "project_id": self.project_id,
+            "priority": self.priority,
+            "max_epochs": self.max_epochs,
+            "weight": self.weight,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+        }
+
+
+class TrainingScheduler:
+    """
+    Runs at most max_running training jobs at a time
+
+    Jobs beyond that wait in a queue of at most max_queued, ordered by
+    priority (higher first) and then submission order, and start as
+    running jobs finish; submitting to a full queue raises SchedulerFull.
+
+    CPU threads are partitioned between running jobs by weight:
+    threads_for() is re-read by training loops between steps, so shares
+    grow and shrink as jobs start and finish instead of oversubscribing
+    the cores. A fixed threads_per_job disables the partitioning.
+
+    Start times are estimated from the step rate of running jobs and the
+    mean seconds per step of finished ones, assuming each job runs its
+    full max_epochs.
+    """
+
+    def __init__(
+        self,
+        max_running: int,
+        max_queued: int,
+        cpu_threads: int = 0,
+        threads_per_job: int = 0,
+    ):
+        self.max_running = max(1, max_running)
+        self.max_queued = max(0, max_queued)
+        self.cpu_threads = cpu_threads or os.cpu_count() or 1
+        self.threads_per_job = threads_per_job
+
+        self.queued: List[TrainingJob] = []
+        self.running: Dict[int, TrainingJob] = {}  # by seq
+        self._seq = itertools.count()
+        # Thread share per running job (by seq); replaced, never mutated, so
+        # training threads can read it while the event loop reschedules
+        self._shares: Dict[int, int] = {}
+
+        # Mean seconds per step of finished jobs (exponential moving average)
+        self.step_seconds: Optional[float] = None
+        self.completed = 0
+        self.rejected = 0
+
+    # ============== Admission ==============
+
+    def is_full(self) -> bool:
+        return len(self.running) >= self.max_running and len(self.queued) >= self.max_queued
+
+    def submit(self, job: TrainingJob):
+        """Start job now if a slot is free, otherwise queue it"""
+        if self.is_full():
+            self.rejected += 1
+            raise SchedulerFull(
+                f"Training queue is full ({self.max_running} running, {self.max_queued} queued)"
+            )
+
+        job.seq = next(self._seq)
+        self.queued.append(job)
+        self.queued.sort(key=lambda queued: (-queued.priority, queued.seq))
+        self._dispatch()
+
+    def cancel(self, project_id: str) -> bool:
+        """Remove a queued job (running jobs are stopped by their session)"""
+        for job in self.queued:
+            if job.project_id == project_id:
+                self.queued.remove(job)
+                return True
+        return False
+
+    def _dispatch(self):
+        while self.queued and len(self.running) < self.max_running:
+            job = self.queued.pop(0)
+            job.started_at = time.time()
+            self.running[job.seq] = job
+            job.task = asyncio.create_task(self._run(job))
+        self._partition()
+
+    async def _run(self, job: TrainingJob):
+        try:
+            await job.run(job)
+        except Exception as e:
+            print(f"Training job {job.project_id} failed: {e}")
+        finally:
+            self.running.pop(job.seq, None)
+            self._record(job)
+            self._dispatch()
+
+    def _record(self, job: TrainingJob):
+        self.completed += 1
+        steps = job.progress()
+        if steps <= 0:
+            return
+        seconds = (time.time() - job.started_at) / steps
+        self.step_seconds = seconds if self.step_seconds is None else 0.8 * self.step_seconds + 0.2 * seconds
+
+    # ============== Thread partitioning ==============
+
+    def _partition(self):
+        """Recompute thread shares (on the event loop, whenever running changes)"""
+        total = sum(job.weight for job in self.running.values())
+        self._shares = {
+            seq: max(1, self.cpu_threads * job.weight // total)
+            for seq, job in self.running.items()
+        }
+
+    def threads_for(self, job: TrainingJob) -> int:
+        """Intra-op threads for a running job: its weighted share of cpu_threads (thread-safe)"""
+        if self.threads_per_job > 0:
+            return self.threads_per_job
+        return self._shares.get(job.seq, max(1, self.cpu_threads))
+
+    # ============== Queue position and start estimates ==============
+
+    def position(self, project_id: str) -> Optional[int]:
+        """1-based position in the queue (1 starts next); None if not queued"""
+        for index, job in enumerate(self.queued):
+            if job.project_id == project_id:
+                return index + 1
+        return None
+
+    def _step_seconds(self, now: float) -> Optional[float]:
+        """Seconds per step: finished jobs' average, else the running jobs' current rate"""
+        if self.step_seconds is not None:
+            return self.step_seconds
+        rates = [
+            (now - job.started_at) / job.progress()
+            for job in self.running.values() if job.progress() > 0
+        ]
+        return sum(rates) / len(rates) if rates else None
+
+    def estimates(self) -> Dict[str, Optional[float]]:
+        """
+        Estimated start time (Unix seconds) of every queued job
+
+        Simulates the queue: each job takes the earliest slot to free up
+        and holds it for max_epochs steps. None while no step has been
+        timed yet.
+        """
+        now = time.time()
+        step_seconds = self._step_seconds(now)
+        if step_seconds is None:
+            return {job.project_id: None for job in self.queued}
+
+        free_at = []
+        for job in self.running.values():
+            steps = job.progress()
+            rate = (now - job.started_at) / steps if steps > 0 else step_seconds
+            free_at.append(now + max(0, job.max_epochs - steps) * rate)
+        free_at += [now] * (self.max_running - len(free_at))
+        free_at.sort()
+
+        estimates: Dict[str, Optional[float]] = {}
+        for job in self.queued:
+            start = free_at.pop(0)
+            estimates[job.project_id] = start
+            free_at.append(start + job.max_epochs * step_seconds)
+            free_at.sort()
+        return estimates
+
+    def queue_status(self, project_id: str) -> Dict:
+        """Queue position and estimated start for a session (None unless queued)"""
+        position = self.position(project_id)
+        return {
+            "queue_position": position,
+            "estimated_start": self.estimates().get(project_id) if position else None,
+        }
+
+    def get_status(self) -> Dict:
+        estimates = self.estimates()
+        return {
+            "max_running": self.max_running,
+            "max_queued": self.max_queued,
+            "cpu_threads": self.cpu_threads,
+            "running": [
+                {**job.get_status(), "threads": self.threads_for(job), "steps": job.progress()}
+                for job in self.running.values()
+            ],
+            "queued": [
+                {**job.get_status(), "position": index + 1, "estimated_start": estimates.get(job.project_id)}
+                for index, job in enumerate(self.queued)
+            ],
+            "step_seconds": self.step_seconds,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
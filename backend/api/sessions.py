@@ -0,0 +1,568 @@
+"""
+Session store - Training session state shared across server workers
+Status, config and metrics are persisted; engines stay in the worker that owns them
+"""
+import json
+import logging
+import os
+import queue
+import socket
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Identifies this server process as a session owner
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# Statuses of a session its owner is still responsible for
+ACTIVE_STATUSES = ("queued", "training")
+
+# Columns of a session record besides project_id
+SESSION_FIELDS = (
+    "status", "config", "current_epoch", "total_steps", "error", "owner",
+    "heartbeat", "started_at", "updated_at", "slots", "stop_requested",
+)
+
+
+class SessionStore(ABC):
+    """
+    Session state backend
+
+    A record holds a session's status, config, current epoch, step count,
+    error, latest slot states, owning worker (with a heartbeat) and any
+    pending stop request; metrics are kept per step. Only the owner writes
+    a running session; other workers read it and ask the owner to stop it
+    through stop_requested.
+    """
+
+    @abstractmethod
+    def claim(self, project_id: str, config: Dict, stale_after: float, status: str = "training") -> bool:
+        """
+        Start a session owned by this worker, clearing its old metrics
+
+        Fails (returns False) if another worker's session for the project
+        is active (queued or training) and has sent a heartbeat within
+        stale_after seconds.
+        """
+
+    @abstractmethod
+    def get(self, project_id: str) -> Optional[Dict]:
+        """The session's record, or None if there is none"""
+
+    @abstractmethod
+    def update(self, project_id: str, **fields):
+        """Set fields of a session this worker owns"""
+
+    @abstractmethod
+    def record_step(self, project_id: str, metrics: Dict, slots: Optional[List[Dict]] = None):
+        """Append a step's metrics and update the epoch (and slots)"""
+
+    @abstractmethod
+    def append_metrics(self, project_id: str, rows: List[Dict]):
+        """Append steps' metrics rows"""
+
+    @abstractmethod
+    def metrics(
+        self,
+        project_id: str,
+        since_epoch: Optional[int] = None,
+        limit: Optional[int] = None,
+        stride: int = 1,
+        fields: Optional[List[str]] = None,
+    ) -> List[Dict]:
+        """
+        Stored steps with epoch >= since_epoch, every stride-th one (the
+        last `limit`), oldest first; with fields, only those keys
+        """
+
+    @abstractmethod
+    def series(self, project_id: str, fields: List[str], since_epoch: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        Columns of stored steps with epoch >= since_epoch, for downsampling
+
+        Returns:
+            "epoch" (int) and each field -> float array (NaN where a step lacks the field)
+        """
+
+    @abstractmethod
+    def request_stop(self, project_id: str, action: str) -> bool:
+        """Ask the owner of an active session to stop or pause it; False if not active"""
+
+    @abstractmethod
+    def heartbeat(self, project_ids: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        Refresh this worker's sessions
+
+        Returns:
+            project_id -> pending stop request ("pause", "stop" or None)
+        """
+
+    @abstractmethod
+    def expire(self, stale_after: float) -> int:
+        """Mark active sessions whose owner stopped sending heartbeats as interrupted"""
+
+    def flush(self):
+        """Wait until queued writes are stored"""
+
+    def close(self):
+        self.flush()
+
+
+class MemorySessionStore(SessionStore):
+    """In-process store (single worker; nothing survives a restart)"""
+
+    def __init__(self, retention: int = 10000):
+        self.retention = retention
+        self._sessions: Dict[str, Dict] = {}
+        self._metrics: Dict[str, List[Dict]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def claim(self, project_id: str, config: Dict, stale_after: float, status: str = "training") -> bool:
+        now = time.time()
+        with self._lock:
+            record = self._sessions.get(project_id)
+            if (
+                record is not None and record["status"] in ACTIVE_STATUSES
+                and record["owner"] != WORKER_ID and now - record["heartbeat"] < stale_after
+            ):
+                return False
+
+            self._sessions[project_id] = {
+                "project_id": project_id, "status": status, "config": config,
+                "current_epoch": 0, "total_steps": 0, "error": None, "owner": WORKER_ID,
+                "heartbeat": now, "started_at": now, "updated_at": now, "slots": None,
+                "stop_requested": None,
+            }
+            self._metrics[project_id] = []
+            return True
+
+    def get(self, project_id: str) -> Optional[Dict]:
+        with self._lock:
+            record = self._sessions.get(project_id)
+            return dict(record) if record is not None else None
+
+    def update(self, project_id: str, **fields):
+        with self._lock:
+            if project_id in self._sessions:
+                self._sessions[project_id].update(fields, updated_at=time.time())
+
+    def record_step(self, project_id: str, metrics: Dict, slots: Optional[List[Dict]] = None):
+        self.append_metrics(project_id, [metrics])
+        fields = {"current_epoch": metrics["epoch"] + 1}
+        if slots is not None:
+            fields["slots"] = slots
+        self.update(project_id, **fields)
+
+    def append_metrics(self, project_id: str, rows: List[Dict]):
+        with self._lock:
+            history = self._metrics[project_id]
+            history.extend(dict(row) for row in rows)
+            del history[:max(0, len(history) - self.retention)]
+            if project_id in self._sessions:
+                self._sessions[project_id]["total_steps"] += len(rows)
+
+    def metrics(
+        self,
+        project_id: str,
+        since_epoch: Optional[int] = None,
+        limit: Optional[int] = None,
+        stride: int = 1,
+        fields: Optional[List[str]] = None,
+    ) -> List[Dict]:
+        with self._lock:
+            rows = [row for row in self._metrics.get(project_id, []) if since_epoch is None or row["epoch"] >= since_epoch]
+        rows = rows[::max(1, stride)]
+        rows = rows[-limit:] if limit else rows
+        if fields:
+            rows = [{name: row[name] for name in fields if name in row} for row in rows]
+        return rows
+
+    def series(self, project_id: str, fields: List[str], since_epoch: Optional[int] = None) -> Dict[str, np.ndarray]:
+        rows = self.metrics(project_id, since_epoch)
+        columns = {
+            name: np.array([row.get(name, np.nan) for row in rows], dtype=np.float64)
+            for name in fields if name != "epoch"
+        }
+        return {"epoch": np.array([row["epoch"] for row in rows], dtype=np.int64), **columns}
+
+    def request_stop(self, project_id: str, action: str) -> bool:
+        with self._lock:
+            record = self._sessions.get(project_id)
+            if record is None or record["status"] not in ACTIVE_STATUSES:
+                return False
+            record["stop_requested"] = action
+            return True
+
+    def heartbeat(self, project_ids: Iterable[str]) -> Dict[str, Optional[str]]:
+        now = time.time()
+        requests = {}
+        with self._lock:
+            for project_id in project_ids:
+                record = self._sessions.get(project_id)
+                if record is not None and record["owner"] == WORKER_ID:
+                    record["heartbeat"] = now
+                    requests[project_id] = record["stop_requested"]
+        return requests
+
+    def expire(self, stale_after: float) -> int:
+        now = time.time()
+        expired = 0
+        with self._lock:
+            for record in self._sessions.values():
+                if record["status"] in ACTIVE_STATUSES and now - record["heartbeat"] >= stale_after:
+                    record.update(status="interrupted", error="Worker stopped responding", updated_at=now)
+                    expired += 1
+        return expired
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    SQLite store in WAL mode, shared by every worker on the host
+
+    Writes from training updates (steps, slots, status) are queued and
+    applied by one writer thread in batched transactions, so callers on
+    the event loop never wait on the database; updates to the same session
+    within a batch are merged. claim(), request_stop() and heartbeat() are
+    synchronous; claim() is an atomic upsert.
+    Readers use a connection per thread and never block the writer.
+    """
+
+    def __init__(self, path: str, retention: int = 10000, flush_interval: float = 0.25):
+        self.path = path
+        self.retention = retention
+        self.flush_interval = flush_interval
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._local = threading.local()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        self._appended: Dict[str, int] = defaultdict(int)  # rows since the last trim
+        # claim() (any thread) resets counts the writer thread increments
+        self._appended_lock = threading.Lock()
+
+        with self._connection() as db:
+            db.executescript("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    project_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    config TEXT,
+                    current_epoch INTEGER NOT NULL DEFAULT 0,
+                    total_steps INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    owner TEXT,
+                    heartbeat REAL,
+                    started_at REAL,
+                    updated_at REAL,
+                    slots TEXT,
+                    stop_requested TEXT
+                );
+                CREATE TABLE IF NOT EXISTS metrics (
+                    project_id TEXT NOT NULL,
+                    epoch INTEGER NOT NULL,
+                    data TEXT NOT NULL,
+                    PRIMARY KEY (project_id, epoch)
+                ) WITHOUT ROWID;
+            """)
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.row_factory = sqlite3.Row
+            self._local.db = db
+        return db
+
+    @staticmethod
+    def _record(row: sqlite3.Row) -> Dict:
+        record = dict(row)
+        for key in ("config", "slots"):
+            if record[key] is not None:
+                record[key] = json.loads(record[key])
+        return record
+
+    # ============== Synchronous ==============
+
+    def claim(self, project_id: str, config: Dict, stale_after: float, status: str = "training") -> bool:
+        self.flush()
+        now = time.time()
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = db.execute(
+                """
+                INSERT INTO sessions (project_id, status, config, current_epoch, total_steps, error,
+                                      owner, heartbeat, started_at, updated_at, slots, stop_requested)
+                VALUES (?, ?, ?, 0, 0, NULL, ?, ?, ?, ?, NULL, NULL)
+                ON CONFLICT (project_id) DO UPDATE SET
+                    status = excluded.status, config = excluded.config, current_epoch = 0,
+                    total_steps = 0, error = NULL, owner = excluded.owner,
+                    heartbeat = excluded.heartbeat, started_at = excluded.started_at,
+                    updated_at = excluded.updated_at, slots = NULL, stop_requested = NULL
+                WHERE sessions.status NOT IN ('queued', 'training') OR sessions.owner = excluded.owner
+                    OR sessions.heartbeat < ?
+                """,
+                (project_id, status, json.dumps(config), WORKER_ID, now, now, now, now - stale_after),
+            )
+            claimed = cursor.rowcount > 0
+            if claimed:
+                db.execute("DELETE FROM metrics WHERE project_id = ?", (project_id,))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        with self._appended_lock:
+            self._appended.pop(project_id, None)
+        return claimed
+
+    def get(self, project_id: str) -> Optional[Dict]:
+        row = self._connection().execute(
+            "SELECT * FROM sessions WHERE project_id = ?", (project_id,)
+        ).fetchone()
+        return self._record(row) if row is not None else None
+
+    def metrics(
+        self,
+        project_id: str,
+        since_epoch: Optional[int] = None,
+        limit: Optional[int] = None,
+        stride: int = 1,
+        fields: Optional[List[str]] = None,
+    ) -> List[Dict]:
+        # Only the selected rows (and with fields, only those keys) are decoded
+        if fields:
+            columns = ", ".join("json_extract(data, ?)" for _ in fields)
+            paths = [f"$.{name}" for name in fields]
+        else:
+            columns, paths = "data", []
+        rows = self._connection().execute(
+            f"""
+            SELECT {columns} FROM (
+                SELECT epoch, data, ROW_NUMBER() OVER (ORDER BY epoch) - 1 AS i
+                FROM metrics WHERE project_id = ? AND epoch >= ?
+            )
+            WHERE i % ? = 0
+            ORDER BY epoch DESC LIMIT ?
+            """,
+            (*paths, project_id, self._since(since_epoch), max(1, stride), limit or -1),
+        ).fetchall()
+
+        if not fields:
+            return [json.loads(row[0]) for row in reversed(rows)]
+        return [
+            {name: value for name, value in zip(fields, row) if value is not None}
+            for row in reversed(rows)
+        ]
+
+    def series(self, project_id: str, fields: List[str], since_epoch: Optional[int] = None) -> Dict[str, np.ndarray]:
+        names = ["epoch"] + [name for name in fields if name != "epoch"]
+        columns = ", ".join(["epoch"] + ["json_extract(data, ?)"] * (len(names) - 1))
+        rows = self._connection().execute(
+            f"SELECT {columns} FROM metrics WHERE project_id = ? AND epoch >= ? ORDER BY epoch",
+            (*[f"$.{name}" for name in names[1:]], project_id, self._since(since_epoch)),
+        ).fetchall()
+
+        # NULLs (fields a step didn't report) become NaN
+        values = np.array(rows, dtype=np.float64).reshape(len(rows), len(names))
+        columns = {name: values[:, j] for j, name in enumerate(names)}
+        columns["epoch"] = columns["epoch"].astype(np.int64)
+        return columns
+
+    @staticmethod
+    def _since(since_epoch: Optional[int]) -> int:
+        return since_epoch if since_epoch is not None else -(1 << 62)
+
+    def request_stop(self, project_id: str, action: str) -> bool:
+        cursor = self._connection().execute(
+            "UPDATE sessions SET stop_requested = ? WHERE project_id = ? AND status IN ('queued', 'training')",
+            (action, project_id),
+        )
+        return cursor.rowcount > 0
+
+    def heartbeat(self, project_ids: Iterable[str]) -> Dict[str, Optional[str]]:
+        project_ids = list(project_ids)
+        if not project_ids:
+            return {}
+
+        placeholders = ", ".join("?" * len(project_ids))
+        db = self._connection()
+        db.execute(
+            f"UPDATE sessions SET heartbeat = ? WHERE owner = ? AND project_id IN ({placeholders})",
+            (time.time(), WORKER_ID, *project_ids),
+        )
+        rows = db.execute(
+            f"SELECT project_id, stop_requested FROM sessions WHERE owner = ? AND project_id IN ({placeholders})",
+            (WORKER_ID, *project_ids),
+        ).fetchall()
+        return {row["project_id"]: row["stop_requested"] for row in rows}
+
+    def expire(self, stale_after: float) -> int:
+        now = time.time()
+        cursor = self._connection().execute(
+            """
+            UPDATE sessions SET status = 'interrupted', error = 'Worker stopped responding', updated_at = ?
+            WHERE status IN ('queued', 'training') AND heartbeat < ?
+            """,
+            (now, now - stale_after),
+        )
+        return cursor.rowcount
+
+    # ============== Queued writes ==============
+
+    def update(self, project_id: str, **fields):
+        self._put(("update", project_id, fields))
+
+    def record_step(self, project_id: str, metrics: Dict, slots: Optional[List[Dict]] = None):
+        self._put(("metrics", project_id, [metrics]))
+        fields = {"current_epoch": metrics["epoch"] + 1}
+        if slots is not None:
+            fields["slots"] = slots
+        self._put(("update", project_id, fields))
+
+    def append_metrics(self, project_id: str, rows: List[Dict]):
+        if rows:
+            self._put(("metrics", project_id, [dict(row) for row in rows]))
+
+    def flush(self):
+        if self._writer is not None:
+            done = threading.Event()
+            self._put(("flush", None, done))
+            done.wait()
+
+    def close(self):
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+
+    def _put(self, item):
+        if self._writer is None:
+            with self._writer_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name="session-store", daemon=True)
+                    self._writer.start()
+        self._queue.put(item)
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            # Collect what arrives within flush_interval into one transaction
+            deadline = time.monotonic() + self.flush_interval
+            while batch[-1] is not None and batch[-1][0] != "flush":
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            stop = batch[-1] is None
+            items = [item for item in batch if item is not None]
+            writes = [item for item in items if item[0] != "flush"]
+            try:
+                self._write_batch(writes)
+            except Exception:
+                # Retry one by one so a bad item (e.g. an unserializable
+                # metrics row) only loses itself; this thread must keep
+                # running or nothing drains the queue and flush() hangs
+                for item in writes:
+                    try:
+                        self._write_batch([item])
+                    except Exception:
+                        logger.exception(f"Session store write failed for {item[1]}")
+            for kind, _, done in items:
+                if kind == "flush":
+                    done.set()
+            if stop:
+                return
+
+    def _write_batch(self, items: List):
+        if not items:
+            return
+
+        updates: Dict[str, Dict] = defaultdict(dict)
+        metrics: Dict[str, List[Dict]] = defaultdict(list)
+        for kind, project_id, payload in items:
+            if kind == "update":
+                updates[project_id].update(payload)
+            else:
+                metrics[project_id].extend(payload)
+
+        now = time.time()
+        db = self._connection()
+        db.execute("BEGIN")
+        try:
+            for project_id, rows in metrics.items():
+                db.executemany(
+                    "INSERT OR REPLACE INTO metrics (project_id, epoch, data) VALUES (?, ?, ?)",
+                    [(project_id, row["epoch"], json.dumps(row)) for row in rows],
+                )
+                db.execute(
+                    "UPDATE sessions SET total_steps = total_steps + ? WHERE project_id = ?",
+                    (len(rows), project_id),
+                )
+                with self._appended_lock:
+                    self._appended[project_id] += len(rows)
+                    due = self._appended[project_id] > max(1, self.retention // 10)
+                    if due:
+                        self._appended[project_id] = 0
+                if due:
+                    self._trim(db, project_id)
+
+            for project_id, fields in updates.items():
+                fields = {key: value for key, value in fields.items() if key in SESSION_FIELDS}
+                for key in ("config", "slots"):
+                    if key in fields and fields[key] is not None:
+                        fields[key] = json.dumps(fields[key])
+                fields["updated_at"] = now
+                assignments = ", ".join(f"{key} = ?" for key in fields)
+                db.execute(
+                    f"UPDATE sessions SET {assignments} WHERE project_id = ? AND owner = ?",
+                    (*fields.values(), project_id, WORKER_ID),
+                )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def _trim(self, db: sqlite3.Connection, project_id: str):
+        """Keep only the newest `retention` steps of a session"""
+        db.execute(
+            """
+            DELETE FROM metrics WHERE project_id = ? AND epoch < (
+                SELECT epoch FROM metrics WHERE project_id = ?
+                ORDER BY epoch DESC LIMIT 1 OFFSET ?
+            )
+            """,
+            (project_id, project_id, self.retention - 1),
+        )
+
+
+def open_session_store() -> SessionStore:
+    """The session store selected by settings.SESSION_BACKEND"""
+    if settings.SESSION_BACKEND == "memory":
+        return MemorySessionStore(retention=settings.METRICS_RETENTION)
+    if settings.SESSION_BACKEND == "sqlite":
+        return SQLiteSessionStore(
+            settings.SESSION_DB_PATH,
+            retention=settings.METRICS_RETENTION,
+            flush_interval=settings.SESSION_FLUSH_INTERVAL,
+        )
+    raise ValueError(f"Unknown session backend: {settings.SESSION_BACKEND}")
+
+
+session_store = open_session_store()
@@ -0,0 +1,220 @@
+"""
+Training runner - executes training loops off the event loop
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import torch
+
+from config import settings
+from api.sessions import session_store
+from avadhan.checkpoint import CheckpointManager
+from avadhan.dataset import StreamingDataset, Prefetcher
+
+# Dedicated pool so training never competes with the default executor;
+# the training scheduler never runs more jobs than it has threads
+training_executor = ThreadPoolExecutor(
+    max_workers=settings.MAX_CONCURRENT_TRAINING,
+    thread_name_prefix="avadhan-train",
+)
+
+
+def _training_loop(
+    engine,
+    max_epochs: int,
+    stop_event: threading.Event,
+    emit: Callable[[Dict], None],
+    num_threads: Callable[[], int],
+    dataset: Optional[StreamingDataset] = None,
+    checkpointer: Optional[CheckpointManager] = None,
+    checkpoint_every: int = 0,
+) -> str:
+    """
+    Blocking training loop, run inside a training_executor thread
+    
+    With a dataset, step inputs are read and tokenized by a Prefetcher
+    while the previous step runs; without one, synthetic inputs are used.
+    
+    With a checkpointer, a snapshot is taken every checkpoint_every steps
+    and written by the checkpointer's thread (a snapshot that would wait on
+    a slow write is skipped), plus a final one when the loop ends.
+    
+    num_threads() is checked before every step, so the job's share of
+    cores follows the scheduler as other jobs start and finish.
+    
+    Returns:
+        Final status ("completed" or "stopped")
+    """
+    # With the OpenMP backend the thread count applies to this worker
+    # thread, which partitions cores between concurrent jobs
+    threads = num_threads()
+    torch.set_num_threads(threads)
+    
+    prefetcher = None
+    if dataset is not None:
+        prefetcher = Prefetcher(
+            dataset.batches(engine.step_size),
+            prepare=engine.prepare_step,
+            depth=settings.DATASET_PREFETCH_DEPTH,
+            stop_event=stop_event,
+        )
+    
+    status = "completed"
+    try:
+        for step in range(max_epochs):
+            if stop_event.is_set():
+                status = "stopped"
+                break
+            
+            if num_threads() != threads:
+                threads = num_threads()
+                torch.set_num_threads(threads)
+            
+            if prefetcher is not None:
+                prepared = next(prefetcher, None)
+                if prepared is None:
+                    if stop_event.is_set():
+                        status = "stopped"
+                    break
+                metrics = engine.training_step(prepared=prepared)
+            else:
+                metrics = engine.training_step()
+            
+            # Exporting slot states costs O(slots) per call, so it is only
+            # done every SLOT_STATE_EVERY steps and on the last one
+            slots = None
+            if engine.current_epoch % settings.SLOT_STATE_EVERY == 0 or step == max_epochs - 1:
+                slots = engine.get_slot_states()
+            emit({"metrics": metrics, "slots": slots})
+            
+            if checkpointer is not None and checkpoint_every > 0 and engine.current_epoch % checkpoint_every == 0:
+                with engine.timings.stage("checkpoint.snapshot"):
+                    checkpointer.save(engine)
+    finally:
+        if prefetcher is not None:
+            prefetcher.close()
+    
+    # Final checkpoint (skipped if this epoch was just saved)
+    if checkpointer is not None:
+        if checkpointer.last_epoch != engine.current_epoch:
+            checkpointer.save(engine, block=True)
+        checkpointer.close()
+    
+    return status
+
+
+async def run_training(session: Dict[str, Any], max_epochs: int, num_threads: Callable[[], int]):
+    """
+    Run a session's training loop in the executor and stream metrics back
+    
+    The loop thread pushes one update per step onto an asyncio queue; this
+    coroutine applies them to the session on the event loop, so HTTP and
+    WebSocket handlers stay responsive while training saturates the cores.
+    """
+    loop = asyncio.get_running_loop()
+    updates: asyncio.Queue = asyncio.Queue()
+    
+    def emit(update: Dict):
+        loop.call_soon_threadsafe(updates.put_nowait, update)
+    
+    # The engine records metrics in session["metrics"] (its MetricsStore)
+    def apply(update: Dict):
+        session["current_epoch"] = update["metrics"]["epoch"] + 1
+        if update["slots"] is not None:
+            session["slots"] = update["slots"]
+        session_store.record_step(session["project_id"], update["metrics"], update["slots"])
+    
+    future = loop.run_in_executor(
+        training_executor,
+        _training_loop,
+        session["engine"],
+        max_epochs,
+        session["stop_event"],
+        emit,
+        num_threads,
+        session.get("dataset"),
+        session.get("checkpointer"),
+        session["config"].get("checkpoint_every", 0),
+    )
+    
+    getter = None
+    try:
+        while True:
+            getter = getter or asyncio.ensure_future(updates.get())
+            done, _ = await asyncio.wait(
+                {getter, future}, return_when=asyncio.FIRST_COMPLETED
+            )
+            
+            if getter in done:
+                apply(getter.result())
+                getter = None
+                continue
+            
+            # Loop finished: apply anything emitted before it returned
+            getter.cancel()
+            getter = None
+            while not updates.empty():
+                apply(updates.get_nowait())
+            break
+        
+        status = await future
+    except Exception as e:
+        session["error"] = str(e)
+        status = "failed"
+    finally:
+        if getter is not None:
+            getter.cancel()
+    
+    if session["status"] == "training":
+        session["status"] = status
+    session_store.update(session["project_id"], status=session["status"], error=session.get("error"))
+
+
+async def run_data_parallel(session: Dict[str, Any], max_epochs: int):
+    """
+    Run a session's DataParallelJob and stream rank-0 updates back
+    
+    Worker processes do the training; this coroutine only polls the job's
+    update queue from the training executor and applies updates on the
+    event loop. Stopping sets the job's stop event, which all ranks honor
+    at the next step.
+    """
+    loop = asyncio.get_running_loop()
+    job = session["job"]
+    
+    def apply(update: Dict):
+        metrics = update["metrics"]
+        session["current_epoch"] = metrics["epoch"] + 1
+        session["metrics"].append(metrics)
+        if update.get("slots") is not None:
+            session["slots"] = update["slots"]
+        session_store.record_step(session["project_id"], metrics, update.get("slots"))
+        if "profile" in update:
+            session["profile"] = update["profile"]
+    
+    try:
+        await loop.run_in_executor(training_executor, job.start)
+        
+        while True:
+            update = await loop.run_in_executor(training_executor, job.poll)
+            if update is not None:
+                apply(update)
+            elif not job.is_alive():
+                break
+        
+        await loop.run_in_executor(training_executor, job.join)
+        if job.failed():
+            session["error"] = "Data-parallel worker exited with an error"
+            status = "failed"
+        else:
+            status = "stopped" if job.stop_event.is_set() else "completed"
+    except Exception as e:
+        session["error"] = str(e)
+        status = "failed"
+        job.stop()
+    
+    if session["status"] == "training":
+        session["status"] = status
+    session_store.update(session["project_id"], status=session["status"], error=session.get("error"))
@@ -58,6 +58,7 @@ async def training_websocket(websocket: WebSocket, project_id: str):
             except asyncio.TimeoutError:
                 # No message, send status update
                 from api.routes import training_sessions
+                from api.sessions import session_store
                 
                 if project_id in training_sessions:
                     session = training_sessions[project_id]
@@ -67,10 +68,23 @@ async def training_websocket(websocket: WebSocket, project_id: str):
                         "type": "status_update",
                         "status": session["status"],
                         "current_epoch": session["current_epoch"],
-                        "latest_metrics": session["metrics"][-1] if session["metrics"] else None,
-                        "slots": engine.get_slot_states() if engine else [],
+                        "latest_metrics": session["metrics"].latest(),
+                        "slots": session.get("slots") or (engine.get_slot_states() if engine else []),
                     }
                     await websocket.send_json(update)
+                else:
+                    # Owned by another worker: relay what it stored
+                    record = await asyncio.to_thread(session_store.get, project_id)
+                    if record is not None:
+                        latest = await asyncio.to_thread(session_store.metrics, project_id, None, 1)
+                        update = {
+                            "type": "status_update",
+                            "status": record["status"],
+                            "current_epoch": record["current_epoch"],
+                            "latest_metrics": latest[-1] if latest else None,
+                            "slots": record["slots"] or [],
+                        }
+                        await websocket.send_json(update)
                     
     except WebSocketDisconnect:
         manager.disconnect(websocket, project_id)
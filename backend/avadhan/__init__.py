@@ -4,6 +4,7 @@ from .slot_manager import SlotManager
 from .orthogonalizer import Orthogonalizer
 from .controller import BuddhiController
 from .memory import MemoryHierarchy
+from .gist_store import Gist, GistStore
 from .encoder import TextEncoder
 
 __all__ = [
@@ -12,5 +13,7 @@ __all__ = [
     "Orthogonalizer",
     "BuddhiController",
     "MemoryHierarchy",
+    "Gist",
+    "GistStore",
     "TextEncoder",
 ]
@@ -0,0 +1,568 @@
+"""
+Avadhan Checkpoints - SafeTensors checkpoints written off the training thread
+Each checkpoint is a directory of per-component tensor files plus JSON metadata
+"""
+import json
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+
+try:
+    from safetensors.torch import load_file, save_file
+    SAFETENSORS_AVAILABLE = True
+except ImportError:
+    SAFETENSORS_AVAILABLE = False
+
+
+FORMAT_VERSION = 1
+
+META_FILE = "meta.json"
+
+CHECKPOINT_PREFIX = "ckpt-"
+
+# Engine settings that determine tensor shapes; a checkpoint only loads
+# into an engine built with the same values
+SHAPE_KEYS = ("num_slots", "encoder_dim", "slot_groups", "memory_compression", "negative_queue_size")
+
+
+@dataclass
+class Snapshot:
+    """
+    Point-in-time copy of an engine's state, safe to write from another thread
+
+    components maps a name to (tensors, extra) where tensors are CPU copies
+    and extra is JSON-serializable (or None); a component that is None is
+    unchanged since `previous` and is linked from there instead.
+    """
+    epoch: int
+    config: Dict[str, Any]
+    components: Dict[str, Optional[Tuple[Dict[str, torch.Tensor], Optional[Dict]]]]
+    keys: Dict[str, Any] = field(default_factory=dict)
+    previous: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+
+
+def checkpoint_name(epoch: int) -> str:
+    return f"{CHECKPOINT_PREFIX}{epoch:08d}"
+
+
+def _cpu(tensor: torch.Tensor) -> torch.Tensor:
+    return tensor.detach().to("cpu", copy=True).contiguous()
+
+
+def _tensor_versions(tensors) -> Tuple[int, ...]:
+    """In-place modification counters; unchanged tensors keep their version"""
+    return tuple(tensor._version for tensor in tensors)
+
+
+def _module_component(module: torch.nn.Module) -> Dict[str, torch.Tensor]:
+    return {name: _cpu(tensor) for name, tensor in module.state_dict().items()}
+
+
+def _optimizer_component(optimizer: torch.optim.Optimizer) -> Tuple[Dict[str, torch.Tensor], Dict]:
+    """Per-parameter state as tensors "<param>.<name>"; everything else as JSON"""
+    state_dict = optimizer.state_dict()
+    tensors = {}
+    scalars = {}
+    for param, state in state_dict["state"].items():
+        for name, value in state.items():
+            if isinstance(value, torch.Tensor):
+                tensors[f"{param}.{name}"] = _cpu(value)
+            else:
+                scalars[f"{param}.{name}"] = value
+    return tensors, {"param_groups": state_dict["param_groups"], "scalars": scalars}
+
+
+def _optimizer_state_tensors(optimizer: torch.optim.Optimizer) -> List[torch.Tensor]:
+    return [
+        value
+        for state in optimizer.state.values()
+        for value in state.values()
+        if isinstance(value, torch.Tensor)
+    ]
+
+
+def _rng_state() -> Tuple[Dict[str, torch.Tensor], Dict]:
+    """torch (and CUDA) generator states as tensors, numpy's legacy state as both"""
+    kind, keys, pos, has_gauss, cached_gaussian = np.random.get_state()
+    tensors = {
+        "rng.torch": torch.get_rng_state(),
+        "rng.numpy": torch.from_numpy(keys.astype(np.int64)),
+    }
+    if torch.cuda.is_available():
+        tensors["rng.cuda"] = torch.stack(torch.cuda.get_rng_state_all())
+    extra = {"kind": kind, "pos": int(pos), "has_gauss": int(has_gauss), "cached_gaussian": float(cached_gaussian)}
+    return tensors, extra
+
+
+def snapshot(engine, previous: Optional[Dict[str, Any]] = None) -> Snapshot:
+    """
+    Copy an engine's full state (call between training steps)
+
+    Queued consolidations are drained first so evicted slots are in memory.
+    The "engine" component (slots, negatives, RNG, metrics) is small and
+    always copied; the others are skipped while unchanged.
+
+    Args:
+        engine: AvadhanEngine
+        previous: {"path": checkpoint dir, "keys": component -> change key}
+            from the last written checkpoint; components whose key is
+            unchanged are not copied
+
+    Returns:
+        Snapshot with CPU copies of every changed component
+    """
+    if engine.consolidator is not None:
+        engine.consolidator.flush()
+
+    previous_keys = {}
+    previous_path = None
+    if previous is not None and os.path.isdir(previous["path"]):
+        previous_path = previous["path"]
+        # A component is only reused while its file is still there to link;
+        # otherwise (e.g. the previous checkpoint was pruned) it is copied again
+        previous_keys = {
+            name: key
+            for name, key in previous["keys"].items()
+            if os.path.exists(os.path.join(previous_path, f"{name}.safetensors"))
+        }
+
+    components = {}
+    keys = {}
+
+    def unchanged(name: str, key: Any) -> bool:
+        keys[name] = key
+        return previous_keys.get(name) == key
+
+    encoder_state = engine.encoder.state_dict()
+    if unchanged("encoder", _tensor_versions(encoder_state.values())):
+        components["encoder"] = None
+    else:
+        components["encoder"] = (_module_component(engine.encoder), None)
+
+    controller = engine.controller
+    controller_key = (
+        _tensor_versions(controller.state_dict().values()),
+        len(controller.action_history),
+        controller.cumulative_reward,
+    )
+    if unchanged("controller", controller_key):
+        components["controller"] = None
+    else:
+        components["controller"] = (_module_component(controller), {
+            "action_history": list(controller.action_history),
+            "cumulative_reward": controller.cumulative_reward,
+        })
+
+    optimizer_key = (len(engine.optimizer.state), _tensor_versions(_optimizer_state_tensors(engine.optimizer)))
+    if unchanged("optimizer", optimizer_key):
+        components["optimizer"] = None
+    else:
+        components["optimizer"] = _optimizer_component(engine.optimizer)
+
+    # Memory tiers: a tier is only copied if its store version moved
+    skip = {
+        name: previous_keys[name]
+        for name in ("episodic", "semantic")
+        if name in previous_keys
+    }
+    memory = engine.memory.state(skip)
+    for name, tier in memory["tiers"].items():
+        keys[name] = memory["versions"][name]
+        if tier is None:
+            components[name] = None
+        else:
+            arrays, tier_meta = tier
+            components[name] = ({key: torch.from_numpy(array) for key, array in arrays.items()}, tier_meta)
+
+    slot_tensors, slot_meta = engine.slot_manager.state()
+    tensors = {f"slots.{name}": tensor for name, tensor in slot_tensors.items()}
+    rng_tensors, rng_meta = _rng_state()
+    tensors.update(rng_tensors)
+    metrics_arrays, metrics_meta = engine.metrics.state()
+    tensors.update({f"metrics.{name}": torch.from_numpy(array) for name, array in metrics_arrays.items()})
+
+    negatives_meta = None
+    if engine.negatives is not None:
+        tensors["negatives.buffer"], negatives_meta = engine.negatives.state()
+
+    components["engine"] = (tensors, {
+        "current_epoch": engine.current_epoch,
+        "writes_since_full": engine._writes_since_full,
+        "slots": slot_meta,
+        "memory": memory["meta"],
+        "negatives": negatives_meta,
+        "metrics": metrics_meta,
+        "rng": rng_meta,
+    })
+
+    return Snapshot(
+        epoch=engine.current_epoch,
+        config=dict(engine.config),
+        components=components,
+        keys=keys,
+        previous=previous_path,
+    )
+
+
+def _link_or_copy(source: str, target: str):
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+def write_snapshot(snap: Snapshot, path: str) -> str:
+    """
+    Write a snapshot as a checkpoint directory
+
+    Files go to a temporary sibling directory that is renamed into place
+    once complete, so a checkpoint directory is never partially written.
+
+    Returns:
+        The checkpoint path
+    """
+    if not SAFETENSORS_AVAILABLE:
+        raise ImportError("safetensors not installed (required for checkpoints)")
+
+    path = os.path.abspath(path)
+    parent, name = os.path.split(path)
+    os.makedirs(parent, exist_ok=True)
+    tmp = os.path.join(parent, f".{name}.tmp")
+    if os.path.exists(tmp):
+        shutil.rmtree(tmp)
+    os.makedirs(tmp)
+
+    try:
+        reused = []
+        for component, data in snap.components.items():
+            tensor_file = f"{component}.safetensors"
+            extra_file = f"{component}.json"
+
+            if data is None:
+                # Deleted since the snapshot was taken: fail rather than
+                # write a checkpoint that is missing the component
+                source = os.path.join(snap.previous, tensor_file)
+                if not os.path.exists(source):
+                    raise FileNotFoundError(f"Cannot reuse {component}: {source} no longer exists")
+                _link_or_copy(source, os.path.join(tmp, tensor_file))
+                source = os.path.join(snap.previous, extra_file)
+                if os.path.exists(source):
+                    _link_or_copy(source, os.path.join(tmp, extra_file))
+                reused.append(component)
+                continue
+
+            tensors, extra = data
+            save_file(tensors, os.path.join(tmp, tensor_file))
+            if extra is not None:
+                with open(os.path.join(tmp, extra_file), "w") as f:
+                    json.dump(extra, f, default=str)
+
+        with open(os.path.join(tmp, META_FILE), "w") as f:
+            json.dump({
+                "format": FORMAT_VERSION,
+                "epoch": snap.epoch,
+                "created_at": snap.created_at,
+                "config": snap.config,
+                "components": sorted(snap.components),
+                "reused": reused,
+                "keys": {name: repr(key) for name, key in snap.keys.items()},
+            }, f, indent=2)
+
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.rename(tmp, path)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    return path
+
+
+def read_meta(path: str) -> Dict:
+    with open(os.path.join(path, META_FILE)) as f:
+        return json.load(f)
+
+
+def list_checkpoints(directory: str) -> List[Dict]:
+    """Complete checkpoints under a directory, oldest first"""
+    if not os.path.isdir(directory):
+        return []
+
+    checkpoints = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if not name.startswith(CHECKPOINT_PREFIX) or not os.path.isfile(os.path.join(path, META_FILE)):
+            continue
+        meta = read_meta(path)
+        checkpoints.append({
+            "name": name,
+            "path": path,
+            "epoch": meta["epoch"],
+            "created_at": meta["created_at"],
+            "reused": meta.get("reused", []),
+            "bytes": sum(
+                os.path.getsize(os.path.join(path, filename)) for filename in os.listdir(path)
+            ),
+        })
+
+    return sorted(checkpoints, key=lambda checkpoint: (checkpoint["epoch"], checkpoint["created_at"]))
+
+
+def resolve_checkpoint(path: str) -> str:
+    """A checkpoint directory, or the latest checkpoint in a directory of them"""
+    if os.path.isfile(os.path.join(path, META_FILE)):
+        return path
+
+    checkpoints = list_checkpoints(path)
+    if not checkpoints:
+        raise FileNotFoundError(f"No checkpoint found in {path}")
+    return checkpoints[-1]["path"]
+
+
+def _read_component(path: str, component: str, device: str = "cpu") -> Tuple[Dict[str, torch.Tensor], Optional[Dict]]:
+    tensors = load_file(os.path.join(path, f"{component}.safetensors"), device=device)
+    extra = None
+    extra_path = os.path.join(path, f"{component}.json")
+    if os.path.exists(extra_path):
+        with open(extra_path) as f:
+            extra = json.load(f)
+    return tensors, extra
+
+
+def restore(engine, path: str) -> Dict:
+    """
+    Load a checkpoint into an engine built with the same shape settings
+
+    Restores model and optimizer state, slots, both memory tiers, the
+    negative bank, metrics history and RNG states, so training resumes
+    exactly where the checkpoint was taken.
+
+    Args:
+        path: Checkpoint directory, or a directory of checkpoints (latest is used)
+
+    Returns:
+        The checkpoint's metadata
+    """
+    if not SAFETENSORS_AVAILABLE:
+        raise ImportError("safetensors not installed (required for checkpoints)")
+
+    path = resolve_checkpoint(path)
+    meta = read_meta(path)
+    if meta.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported checkpoint format: {meta.get('format')}")
+
+    for key in SHAPE_KEYS:
+        saved, current = meta["config"].get(key), engine.config.get(key)
+        if saved != current:
+            raise ValueError(f"Checkpoint has {key}={saved}, engine has {key}={current}")
+
+    if engine.consolidator is not None:
+        engine.consolidator.flush()
+
+    tensors, _ = _read_component(path, "encoder")
+    engine.encoder.load_state_dict(tensors)
+
+    tensors, extra = _read_component(path, "controller")
+    engine.controller.load_state_dict(tensors)
+    engine.controller.action_history = extra["action_history"]
+    engine.controller.cumulative_reward = extra["cumulative_reward"]
+
+    tensors, extra = _read_component(path, "optimizer")
+    state: Dict[int, Dict[str, Any]] = {}
+    for key, value in list(tensors.items()) + list(extra["scalars"].items()):
+        param, name = key.split(".", 1)
+        state.setdefault(int(param), {})[name] = value
+    engine.optimizer.load_state_dict({"state": state, "param_groups": extra["param_groups"]})
+
+    tiers = {}
+    for name in ("episodic", "semantic"):
+        tensors, tier_meta = _read_component(path, name)
+        tiers[name] = ({key: tensor.numpy() for key, tensor in tensors.items()}, tier_meta)
+
+    tensors, extra = _read_component(path, "engine")
+    engine.memory.load_state(extra["memory"], tiers)
+
+    prefix = "slots."
+    engine.slot_manager.load_state(
+        {key[len(prefix):]: tensor for key, tensor in tensors.items() if key.startswith(prefix)},
+        extra["slots"],
+    )
+
+    if engine.negatives is not None:
+        engine.negatives.load_state(tensors["negatives.buffer"], extra["negatives"])
+
+    prefix = "metrics."
+    engine.metrics.load_state(
+        {key[len(prefix):]: tensor.numpy() for key, tensor in tensors.items() if key.startswith(prefix)},
+        extra["metrics"],
+    )
+
+    rng = extra["rng"]
+    torch.set_rng_state(tensors["rng.torch"])
+    if "rng.cuda" in tensors and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(list(tensors["rng.cuda"]))
+    np.random.set_state((
+        rng["kind"],
+        tensors["rng.numpy"].numpy().astype(np.uint32),
+        rng["pos"],
+        rng["has_gauss"],
+        rng["cached_gaussian"],
+    ))
+
+    engine.current_epoch = extra["current_epoch"]
+    engine._writes_since_full = extra["writes_since_full"]
+
+    return meta
+
+
+class CheckpointManager:
+    """
+    Periodic checkpoints of one engine into a directory, written in the background
+
+    save() takes a Snapshot on the calling thread (the only part that stalls
+    training) and hands it to a writer thread. At most one write is in
+    flight: a save() that arrives while the previous one is still writing
+    is skipped unless block=True. Components that did not change since the
+    last written checkpoint are hard-linked rather than copied and rewritten.
+
+    Retention keeps the newest keep_last checkpoints, plus every checkpoint
+    whose epoch is a multiple of keep_every (0 = none).
+    """
+
+    def __init__(self, directory: str, keep_last: int = 3, keep_every: int = 0):
+        if not SAFETENSORS_AVAILABLE:
+            raise ImportError("safetensors not installed (required for checkpoints)")
+
+        self.directory = directory
+        self.keep_last = max(1, keep_last)
+        self.keep_every = max(0, keep_every)
+
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._previous: Optional[Dict[str, Any]] = None
+
+        # Stats
+        self.written_count = 0
+        self.skipped_count = 0
+        self.failed_count = 0
+        self.last_error: Optional[str] = None
+        self.last_path: Optional[str] = None
+        self.last_epoch: Optional[int] = None  # of the last snapshot taken
+        self.last_snapshot_s = 0.0
+        self.last_write_s = 0.0
+
+    @property
+    def busy(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def save(self, engine, block: bool = False) -> Optional[str]:
+        """
+        Snapshot the engine and write it in the background
+
+        Args:
+            block: Wait for an in-flight write instead of skipping
+
+        Returns:
+            Path the checkpoint will be written to, or None if skipped
+        """
+        if self.busy:
+            if not block:
+                self.skipped_count += 1
+                return None
+            self.wait()
+
+        start = time.perf_counter()
+        snap = snapshot(engine, self._previous)
+        self.last_snapshot_s = time.perf_counter() - start
+        self.last_epoch = snap.epoch
+
+        path = os.path.join(self.directory, checkpoint_name(snap.epoch))
+        self._thread = threading.Thread(
+            target=self._write,
+            args=(snap, path),
+            name="avadhan-checkpoint",
+            daemon=True,
+        )
+        self._thread.start()
+        return path
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the in-flight write; False if it is still running"""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return not self.busy
+
+    def close(self):
+        """Finish the in-flight write"""
+        self.wait()
+
+    def _write(self, snap: Snapshot, path: str):
+        start = time.perf_counter()
+        try:
+            write_snapshot(snap, path)
+        except Exception as e:
+            with self._lock:
+                self.failed_count += 1
+                self.last_error = str(e)
+                # The next snapshot copies every component instead of linking
+                self._previous = None
+            print(f"Checkpoint {path} failed: {e}")
+            return
+
+        with self._lock:
+            self._previous = {"path": path, "keys": snap.keys}
+            self.written_count += 1
+            self.last_path = path
+            self.last_write_s = time.perf_counter() - start
+
+        try:
+            self.apply_retention()
+        except OSError as e:
+            print(f"Checkpoint retention failed: {e}")
+
+    def apply_retention(self) -> List[str]:
+        """
+        Delete checkpoints outside the retention policy
+
+        Returns:
+            Names of the deleted checkpoints
+        """
+        checkpoints = list_checkpoints(self.directory)
+        keep = {checkpoint["name"] for checkpoint in checkpoints[-self.keep_last:]}
+        if self.keep_every:
+            keep |= {
+                checkpoint["name"]
+                for checkpoint in checkpoints
+                if checkpoint["epoch"] % self.keep_every == 0
+            }
+
+        deleted = []
+        for checkpoint in checkpoints:
+            if checkpoint["name"] not in keep:
+                shutil.rmtree(checkpoint["path"], ignore_errors=True)
+                deleted.append(checkpoint["name"])
+        return deleted
+
+    def get_status(self) -> Dict:
+        with self._lock:
+            return {
+                "directory": self.directory,
+                "writing": self.busy,
+                "written": self.written_count,
+                "skipped": self.skipped_count,
+                "failed": self.failed_count,
+                "last_error": self.last_error,
+                "last_checkpoint": os.path.basename(self.last_path) if self.last_path else None,
+                "last_snapshot_ms": self.last_snapshot_s * 1000,
+                "last_write_ms": self.last_write_s * 1000,
+                "keep_last": self.keep_last,
+                "keep_every": self.keep_every,
+            }
@@ -0,0 +1,135 @@
+"""
+Avadhan Consolidation Worker - Background M_W → M_E → M_S pipeline
+Moves gist writes and tier promotion off the ingest path
+"""
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+from .memory import MemoryHierarchy
+
+
+class ConsolidationWorker:
+    """
+    Background worker that consolidates evicted slots into episodic memory
+
+    Evicted slots are submitted to a bounded queue; the worker drains it in
+    batches of up to batch_size and writes each batch with one store append.
+    Between batches it promotes hot episodic gists to the semantic tier
+    every promote_interval seconds.
+    """
+
+    def __init__(
+        self,
+        memory: MemoryHierarchy,
+        max_queue: int = 1024,
+        batch_size: int = 64,
+        promote_interval: float = 1.0,
+    ):
+        self.memory = memory
+        self.batch_size = batch_size
+        self.promote_interval = promote_interval
+
+        self.queue: "queue.Queue[Dict]" = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Statistics
+        self.consolidated_count = 0
+        self.batch_count = 0
+        self.rejected_count = 0
+
+    def start(self):
+        """Start the worker thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            name="avadhan-consolidation",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def submit(self, slot: Dict) -> bool:
+        """
+        Queue an evicted slot for consolidation
+
+        Returns:
+            False if the queue is full (caller should consolidate inline)
+        """
+        item = {
+            "id": slot.get("id", ""),
+            "vector": slot["vector"].detach(),
+            "priority": slot.get("priority", 0.5),
+        }
+
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.rejected_count += 1
+            return False
+
+    def flush(self):
+        """Block until every queued slot has been consolidated"""
+        self.queue.join()
+
+    def stop(self, flush: bool = True):
+        """Stop the worker, optionally draining the queue first"""
+        if flush and self._thread is not None and self._thread.is_alive():
+            self.flush()
+
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+
+    def _run(self):
+        """Worker loop: batch consolidation + periodic promotion"""
+        last_promotion = time.monotonic()
+
+        while not self._stop.is_set():
+            batch = self._next_batch()
+
+            if batch:
+                try:
+                    self.memory.consolidate_batch(batch)
+                    self.consolidated_count += len(batch)
+                    self.batch_count += 1
+                except Exception as e:
+                    print(f"Consolidation batch failed: {e}")
+                finally:
+                    for _ in batch:
+                        self.queue.task_done()
+
+            now = time.monotonic()
+            if now - last_promotion >= self.promote_interval:
+                self.memory.promote_hot()
+                last_promotion = now
+
+    def _next_batch(self) -> List[Dict]:
+        """Wait for one item, then drain up to batch_size without blocking"""
+        try:
+            batch = [self.queue.get(timeout=self.promote_interval)]
+        except queue.Empty:
+            return []
+
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+
+        return batch
+
+    def get_stats(self) -> Dict:
+        """Get worker statistics"""
+        return {
+            "queue_depth": self.queue.qsize(),
+            "consolidated_count": self.consolidated_count,
+            "batch_count": self.batch_count,
+            "rejected_count": self.rejected_count,
+        }
@@ -0,0 +1,267 @@
+"""
+Avadhan Dataset Pipeline - Streaming (text, thread_id) records for training
+Reads JSONL / Parquet / text files with bounded memory and prefetches batches
+"""
+import json
+import queue
+import random
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+
+Record = Tuple[str, str]
+
+FORMATS = {
+    ".jsonl": "jsonl",
+    ".json": "jsonl",
+    ".parquet": "parquet",
+    ".txt": "text",
+}
+
+
+class StreamingDataset:
+    """
+    Streams (text, thread_id) records from local files
+
+    - JSONL: one object per line with text_field / thread_field keys
+    - Parquet: row groups read column-wise in batches (requires pyarrow)
+    - Text: one record per non-empty line, thread id = file stem
+
+    A directory streams every supported file in name order. Shuffling uses a
+    window buffer of shuffle_buffer records, so memory stays bounded no
+    matter how large the corpus is. With num_shards > 1 only records whose
+    index modulo num_shards equals shard_index are kept (data parallelism).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        text_field: str = "text",
+        thread_field: str = "thread_id",
+        format: str = "auto",
+        shuffle_buffer: int = 0,
+        seed: Optional[int] = None,
+        repeat: bool = False,
+        shard_index: int = 0,
+        num_shards: int = 1,
+    ):
+        self.path = Path(path)
+        self.text_field = text_field
+        self.thread_field = thread_field
+        self.format = format
+        self.shuffle_buffer = shuffle_buffer
+        self.seed = seed
+        self.repeat = repeat
+        self.shard_index = shard_index
+        self.num_shards = max(1, num_shards)
+
+        self.files = self._resolve_files()
+        if not self.files:
+            raise FileNotFoundError(f"No dataset files found at {self.path}")
+
+    def _resolve_files(self) -> List[Path]:
+        """List dataset files under path"""
+        if self.path.is_dir():
+            return sorted(
+                p for p in self.path.iterdir()
+                if p.is_file() and p.suffix.lower() in FORMATS
+            )
+        if self.path.is_file():
+            return [self.path]
+        return []
+
+    def _file_format(self, path: Path) -> str:
+        if self.format != "auto":
+            return self.format
+        return FORMATS.get(path.suffix.lower(), "text")
+
+    def __iter__(self) -> Iterator[Record]:
+        rng = random.Random(self.seed)
+
+        while True:
+            records = self._read_all()
+            if self.num_shards > 1:
+                records = self._shard(records)
+            if self.shuffle_buffer > 1:
+                records = self._shuffle(records, rng)
+
+            count = 0
+            for record in records:
+                count += 1
+                yield record
+
+            if not self.repeat:
+                return
+            if count == 0:
+                # Repeating an empty pass would spin forever without yielding
+                raise ValueError(
+                    f"No records in {self.path}"
+                    + (f" for shard {self.shard_index} of {self.num_shards}" if self.num_shards > 1 else "")
+                )
+
+    def _read_all(self) -> Iterator[Record]:
+        """Stream records from every file in order"""
+        for path in self.files:
+            file_format = self._file_format(path)
+
+            if file_format == "jsonl":
+                yield from self._read_jsonl(path)
+            elif file_format == "parquet":
+                yield from self._read_parquet(path)
+            elif file_format == "text":
+                yield from self._read_text(path)
+            else:
+                raise ValueError(f"Unknown dataset format: {file_format}")
+
+    def _read_jsonl(self, path: Path) -> Iterator[Record]:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                row = json.loads(line)
+                yield self._to_record(row, path)
+
+    def _read_parquet(self, path: Path) -> Iterator[Record]:
+        if not PARQUET_AVAILABLE:
+            raise ImportError("pyarrow not installed")
+
+        parquet_file = pq.ParquetFile(str(path))
+        columns = [self.text_field]
+        if self.thread_field in parquet_file.schema_arrow.names:
+            columns.append(self.thread_field)
+
+        for batch in parquet_file.iter_batches(batch_size=1024, columns=columns):
+            for row in batch.to_pylist():
+                yield self._to_record(row, path)
+
+    def _read_text(self, path: Path) -> Iterator[Record]:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield line, path.stem
+
+    def _to_record(self, row: Dict[str, Any], path: Path) -> Record:
+        thread_id = row.get(self.thread_field)
+        return str(row[self.text_field]), str(thread_id) if thread_id is not None else path.stem
+
+    def _shard(self, records: Iterator[Record]) -> Iterator[Record]:
+        """Keep every num_shards-th record starting at shard_index"""
+        for i, record in enumerate(records):
+            if i % self.num_shards == self.shard_index:
+                yield record
+
+    def _shuffle(self, records: Iterator[Record], rng: random.Random) -> Iterator[Record]:
+        """Window shuffle: emit a random buffered record for each new one"""
+        buffer: List[Record] = []
+
+        for record in records:
+            if len(buffer) < self.shuffle_buffer:
+                buffer.append(record)
+                continue
+            i = rng.randrange(len(buffer))
+            yield buffer[i]
+            buffer[i] = record
+
+        rng.shuffle(buffer)
+        yield from buffer
+
+    def batches(self, batch_size: int) -> Iterator[List[Record]]:
+        """Group records into lists of batch_size (last one may be short)"""
+        batch: List[Record] = []
+        for record in self:
+            batch.append(record)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+class Prefetcher:
+    """
+    Runs an iterator (plus an optional prepare stage, e.g. tokenization) in a
+    background thread, keeping up to `depth` results ready ahead of the consumer
+
+    With a stop_event, a consumer waiting for the next result stops
+    (StopIteration) once the event is set, even if the source never yields.
+    """
+
+    _DONE = object()
+
+    def __init__(
+        self,
+        source: Iterator[Any],
+        prepare: Optional[Callable[[Any], Any]] = None,
+        depth: int = 4,
+        stop_event: Optional[threading.Event] = None,
+    ):
+        self.source = source
+        self.prepare = prepare
+        self.stop_event = stop_event
+        self.queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, depth))
+        self._stop = threading.Event()
+        self._finished = False
+        self._thread = threading.Thread(
+            target=self._run,
+            name="avadhan-prefetch",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _run(self):
+        try:
+            for item in self.source:
+                if self.prepare is not None:
+                    item = self.prepare(item)
+                if not self._put(item):
+                    return
+            self._put(self._DONE)
+        except Exception as e:
+            self._put(e)
+
+    def _put(self, item: Any) -> bool:
+        """Blocking put that gives up once the prefetcher is closed"""
+        while not self._stop.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __iter__(self) -> "Prefetcher":
+        return self
+
+    def __next__(self) -> Any:
+        if self._finished:
+            raise StopIteration
+
+        while True:
+            try:
+                item = self.queue.get(timeout=0.1)
+                break
+            except queue.Empty:
+                if self.stop_event is not None and self.stop_event.is_set():
+                    self._finished = True
+                    raise StopIteration
+        if item is self._DONE:
+            self._finished = True
+            raise StopIteration
+        if isinstance(item, Exception):
+            self._finished = True
+            raise item
+        return item
+
+    def close(self):
+        """Stop the background thread"""
+        self._stop.set()
+        self._thread.join(timeout=1.0)
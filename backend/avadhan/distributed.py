@@ -0,0 +1,377 @@
+"""
+Avadhan Data Parallel - Multi-process CPU training with torch.distributed (gloo)
+Each worker owns a shard of the input stream; gradients are all-reduced every
+step and slot/memory state is merged deterministically at sync points
+
+Local smoke run (from backend/):
+    python -m avadhan.distributed --workers 2 --epochs 20 --sync-every 5
+"""
+import argparse
+import os
+import queue
+import socket
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+import torch.nn as nn
+import torch.nn.functional as F
+
+from .engine import AvadhanEngine
+from .dataset import StreamingDataset, Prefetcher
+
+
+# Per-step metrics averaged across workers
+AVERAGED_METRICS = (
+    "loss",
+    "generation_loss",
+    "contrastive_loss",
+    "orthogonality_loss",
+    "interference_rate",
+    "compute_time",
+)
+
+
+def find_free_port() -> int:
+    """Pick an unused localhost port for the process-group rendezvous"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def allreduce_gradients(params: List[nn.Parameter], has_grad: bool) -> bool:
+    """
+    Average gradients across workers with one flat all-reduce
+
+    Parameters without a gradient contribute zeros, so every worker makes
+    the same collective call even if its micro-batches produced no graph.
+
+    Returns:
+        True if any worker produced gradients
+    """
+    world_size = dist.get_world_size()
+
+    flat = torch.cat([
+        (p.grad if p.grad is not None else torch.zeros_like(p)).reshape(-1)
+        for p in params
+    ] + [torch.tensor([float(has_grad)])])
+    dist.all_reduce(flat)
+
+    any_grad = flat[-1].item() > 0
+    offset = 0
+    for p in params:
+        n = p.numel()
+        grad = flat[offset:offset + n].view_as(p) / world_size
+        if p.grad is None:
+            p.grad = grad.clone()
+        else:
+            p.grad.copy_(grad)
+        offset += n
+
+    return any_grad
+
+
+def merge_slots(
+    payloads: List[Dict[str, Any]],
+    num_slots: int,
+) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Deterministically merge per-worker slot lists
+
+    Slots sharing a thread id are combined (mean vector, summed priority and
+    update count, latest activity); the first worker's id is kept. The top
+    num_slots by priority (ties broken by thread id) survive and the rest
+    are returned as evictions.
+
+    Returns:
+        (merged slots, overflow evictions)
+    """
+    by_thread: Dict[str, Dict] = {}
+
+    for payload in payloads:
+        for slot in payload["slots"]:
+            merged = by_thread.get(slot["thread_id"])
+            if merged is None:
+                by_thread[slot["thread_id"]] = dict(slot, vectors=[slot["vector"]])
+                continue
+            merged["vectors"].append(slot["vector"])
+            merged["priority"] += slot["priority"]
+            merged["update_count"] += slot["update_count"]
+            merged["last_active"] = max(merged["last_active"], slot["last_active"])
+
+    ordered = sorted(
+        by_thread.values(),
+        key=lambda slot: (-slot["priority"], slot["thread_id"]),
+    )
+
+    for slot in ordered:
+        slot["vector"] = F.normalize(torch.stack(slot.pop("vectors")).mean(dim=0), dim=0)
+
+    # Workers allocate slot ids independently, so the same id can name
+    # different threads; later ones get a thread-derived suffix
+    seen = set()
+    for slot in ordered:
+        if slot["id"] in seen:
+            slot["id"] = f"{slot['id']}_{slot['thread_id']}"
+        seen.add(slot["id"])
+
+    kept, overflow = ordered[:num_slots], ordered[num_slots:]
+
+    total = sum(slot["priority"] for slot in kept) or 1.0
+    for slot in kept:
+        slot["priority"] /= total
+
+    evictions = [
+        {"id": slot["id"], "vector": slot["vector"], "priority": slot["priority"]}
+        for slot in overflow
+    ]
+    return kept, evictions
+
+
+def sync_state(engine: AvadhanEngine):
+    """
+    Merge slot and memory state across workers (collective call)
+
+    Every worker gathers all slots and all evictions deferred since the last
+    sync, in rank order, and applies the same merge and consolidation, so
+    replicas leave the sync point identical.
+    """
+    payload = {
+        "slots": [
+            {
+                "id": slot["id"],
+                "index": slot["index"],
+                "thread_id": slot["thread_id"],
+                "vector": slot["vector"].detach().cpu(),
+                "priority": slot["priority"],
+                "last_active": slot["last_active"],
+                "update_count": slot["update_count"],
+                "metadata": slot["metadata"],
+            }
+            for slot in engine.slot_manager.slots
+        ],
+        "evictions": engine.pending_evictions or [],
+    }
+
+    payloads: List[Optional[Dict]] = [None] * dist.get_world_size()
+    dist.all_gather_object(payloads, payload)
+
+    slots, overflow = merge_slots(payloads, engine.num_slots)
+    engine.slot_manager.load_slots(engine.orthogonalizer.orthogonalize(slots))
+
+    evictions = [e for p in payloads for e in p["evictions"]] + overflow
+    if evictions:
+        engine.memory.consolidate_batch(evictions)
+    engine.pending_evictions = []
+
+
+def _average_metrics(metrics: Dict) -> Dict:
+    """All-reduce mean of the per-step loss metrics"""
+    values = torch.tensor([float(metrics[key]) for key in AVERAGED_METRICS])
+    dist.all_reduce(values)
+    values /= dist.get_world_size()
+
+    averaged = dict(metrics)
+    for key, value in zip(AVERAGED_METRICS, values.tolist()):
+        averaged[key] = value
+    return averaged
+
+
+def _should_stop(stop_event) -> bool:
+    """Rank 0 decides; the decision is broadcast so all workers stop together"""
+    flag = torch.zeros(1)
+    if dist.get_rank() == 0 and stop_event is not None and stop_event.is_set():
+        flag[0] = 1
+    dist.broadcast(flag, src=0)
+    return bool(flag.item())
+
+
+def _worker(
+    rank: int,
+    world_size: int,
+    port: int,
+    engine_kwargs: Dict,
+    max_epochs: int,
+    sync_every: int,
+    dataset_kwargs: Optional[Dict],
+    updates,
+    stop_event,
+    num_threads: int,
+    seed: int,
+):
+    """Entry point of one data-parallel worker process"""
+    os.environ["MASTER_ADDR"] = "127.0.0.1"
+    os.environ["MASTER_PORT"] = str(port)
+    torch.set_num_threads(num_threads)
+    dist.init_process_group("gloo", rank=rank, world_size=world_size)
+
+    prefetcher = None
+    try:
+        torch.manual_seed(seed)
+        np.random.seed(seed + rank)
+
+        engine = AvadhanEngine(**engine_kwargs, device="cpu", async_consolidation=False)
+        for param in engine.trainable_parameters():
+            dist.broadcast(param.data, src=0)
+        engine.gradient_sync = allreduce_gradients
+        engine.pending_evictions = []
+
+        if dataset_kwargs:
+            dataset = StreamingDataset(
+                **dataset_kwargs,
+                shard_index=rank,
+                num_shards=world_size,
+                repeat=True,
+            )
+            prefetcher = Prefetcher(
+                dataset.batches(engine.step_size),
+                prepare=engine.prepare_step,
+            )
+
+        for step in range(max_epochs):
+            if _should_stop(stop_event):
+                break
+
+            if prefetcher is not None:
+                metrics = engine.training_step(prepared=next(prefetcher))
+            else:
+                metrics = engine.training_step([
+                    (f"Training input {i} rank {rank} at epoch {step}", f"thread_{(i + rank) % engine.num_slots}")
+                    for i in range(engine.step_size)
+                ])
+            metrics = _average_metrics(metrics)
+
+            if (step + 1) % sync_every == 0 or step == max_epochs - 1:
+                sync_state(engine)
+
+            if rank == 0 and updates is not None:
+                metrics["world_size"] = world_size
+                update = {"metrics": metrics}
+                # Slot states and timings are only exported at sync points
+                if (step + 1) % sync_every == 0 or step == max_epochs - 1:
+                    update["slots"] = engine.get_slot_states()
+                    update["profile"] = engine.get_profile()
+                updates.put(update)
+    finally:
+        if prefetcher is not None:
+            prefetcher.close()
+        dist.destroy_process_group()
+
+
+class DataParallelJob:
+    """
+    Launches and tracks N data-parallel worker processes on one node
+
+    Rank 0 streams {"metrics"} updates (plus "slots" and "profile" at sync
+    points) through a multiprocessing queue; setting stop_event stops all
+    workers at the next step.
+    """
+
+    def __init__(
+        self,
+        world_size: int,
+        engine_kwargs: Dict,
+        max_epochs: int,
+        sync_every: int = 10,
+        dataset_kwargs: Optional[Dict] = None,
+        num_threads: Optional[int] = None,
+        seed: int = 0,
+    ):
+        self.world_size = world_size
+        self.engine_kwargs = engine_kwargs
+        self.max_epochs = max_epochs
+        self.sync_every = max(1, sync_every)
+        self.dataset_kwargs = dataset_kwargs
+        self.num_threads = num_threads or max(1, (os.cpu_count() or 1) // world_size)
+        self.seed = seed
+
+        self._ctx = mp.get_context("spawn")
+        self.updates = self._ctx.Queue()
+        self.stop_event = self._ctx.Event()
+        self.processes: List = []
+
+    def start(self):
+        """Spawn the worker processes"""
+        port = find_free_port()
+        for rank in range(self.world_size):
+            process = self._ctx.Process(
+                target=_worker,
+                args=(
+                    rank,
+                    self.world_size,
+                    port,
+                    self.engine_kwargs,
+                    self.max_epochs,
+                    self.sync_every,
+                    self.dataset_kwargs,
+                    self.updates if rank == 0 else None,
+                    self.stop_event,
+                    self.num_threads,
+                    self.seed,
+                ),
+                name=f"avadhan-dp-{rank}",
+            )
+            process.start()
+            self.processes.append(process)
+
+    def poll(self, timeout: float = 0.5) -> Optional[Dict]:
+        """Next rank-0 update, or None if none arrived within timeout"""
+        try:
+            return self.updates.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def is_alive(self) -> bool:
+        return any(process.is_alive() for process in self.processes)
+
+    def failed(self) -> bool:
+        """True if any worker exited with a non-zero code"""
+        return any(
+            process.exitcode not in (None, 0) for process in self.processes
+        )
+
+    def stop(self):
+        self.stop_event.set()
+
+    def join(self, timeout: Optional[float] = None):
+        for process in self.processes:
+            process.join(timeout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Avadhan data-parallel training")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--sync-every", type=int, default=5)
+    parser.add_argument("--num-slots", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--dataset", type=str, default=None)
+    args = parser.parse_args()
+
+    job = DataParallelJob(
+        world_size=args.workers,
+        engine_kwargs={"num_slots": args.num_slots, "batch_size": args.batch_size},
+        max_epochs=args.epochs,
+        sync_every=args.sync_every,
+        dataset_kwargs={"path": args.dataset} if args.dataset else None,
+    )
+    job.start()
+
+    while True:
+        update = job.poll()
+        if update is not None:
+            metrics = update["metrics"]
+            print(f"epoch {metrics['epoch']}: loss={metrics['loss']:.4f} "
+                  f"time={metrics['compute_time']:.3f}s")
+        elif not job.is_alive():
+            break
+
+    job.join()
+    if job.failed():
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,8 @@ Encodes text to vectors for slot state initialization
 """
 import torch
 import torch.nn as nn
-from typing import List, Union, Optional
+import zlib
+from typing import Dict, List, Union, Optional
 import numpy as np
 
 try:
@@ -73,57 +74,85 @@ class TextEncoder(nn.Module):
         if single_input:
             text = [text]
         
+        embeddings = self.encode_prepared(self.prepare(text), normalize=normalize)
+        
+        if single_input:
+            return embeddings[0]
+        
+        return embeddings
+    
+    def prepare(self, texts: List[str]) -> Dict[str, torch.Tensor]:
+        """
+        Tokenize texts into CPU tensors
+        
+        Safe to call from a background thread, so the data pipeline can
+        prepare upcoming batches while the current step runs.
+        """
+        if self.use_st:
+            return dict(self.encoder.tokenize(texts))
+        
+        token_lists = [self._tokenize(text) for text in texts]
+        lengths = torch.tensor([len(tokens) for tokens in token_lists])
+        
+        return {
+            "token_ids": torch.tensor(
+                [token for tokens in token_lists for token in tokens], 
+                dtype=torch.long,
+            ),
+            "offsets": torch.cat([
+                torch.zeros(1, dtype=torch.long),
+                lengths.cumsum(0)[:-1],
+            ]),
+            "lengths": lengths,
+        }
+    
+    def encode_prepared(
+        self, 
+        features: Dict[str, torch.Tensor],
+        normalize: bool = True,
+    ) -> torch.Tensor:
+        """Encode tokenized features from prepare() -> [batch, dim]"""
+        features = {key: value.to(self.device) for key, value in features.items()}
+        
         if self.use_st:
-            embeddings = self._encode_with_st(text)
+            embeddings = self._encode_with_st(features)
         else:
-            embeddings = self._encode_fallback(text)
+            embeddings = self._encode_fallback(features)
         
         if normalize:
             embeddings = torch.nn.functional.normalize(embeddings, dim=-1)
         
-        if single_input:
-            return embeddings[0]
-        
         return embeddings
     
-    def _encode_with_st(self, texts: List[str]) -> torch.Tensor:
+    def _encode_with_st(self, features: Dict[str, torch.Tensor]) -> torch.Tensor:
         """Encode using Sentence Transformers"""
         with torch.no_grad():
-            embeddings = self.encoder.encode(
-                texts,
-                convert_to_tensor=True,
-                device=self.device,
-                show_progress_bar=False,
-            )
+            embeddings = self.encoder(features)["sentence_embedding"]
         return embeddings
     
-    def _encode_fallback(self, texts: List[str]) -> torch.Tensor:
-        """Fallback encoding using hashing + embedding"""
-        embeddings = []
+    def _encode_fallback(self, features: Dict[str, torch.Tensor]) -> torch.Tensor:
+        """Fallback encoding using hashing + embedding (one batched lookup)"""
+        lengths = features["lengths"]
         
-        for text in texts:
-            # Simple word hashing
-            tokens = self._tokenize(text)
-            
-            if len(tokens) == 0:
-                emb = torch.zeros(self.dim, device=self.device)
-            else:
-                # Get embeddings for tokens
-                token_ids = torch.tensor(tokens, device=self.device)
-                token_embs = self.embedding(token_ids)
-                
-                # Mean pooling
-                emb = token_embs.mean(dim=0)
-                emb = self.projection(emb)
-            
-            embeddings.append(emb)
+        # Mean pooling per text, then projection
+        pooled = torch.nn.functional.embedding_bag(
+            features["token_ids"], 
+            self.embedding.weight, 
+            features["offsets"], 
+            mode="mean",
+        )
+        embeddings = self.projection(pooled)
         
-        return torch.stack(embeddings)
+        # Empty texts encode to zeros
+        return embeddings * (lengths > 0).unsqueeze(1).to(embeddings.dtype)
     
     def _tokenize(self, text: str, max_tokens: int = 128) -> List[int]:
-        """Simple tokenization via hashing"""
+        """
+        Simple tokenization via hashing
+        Uses crc32 rather than hash() so token ids agree across processes
+        """
         words = text.lower().split()[:max_tokens]
-        tokens = [hash(word) % 10000 for word in words]
+        tokens = [zlib.crc32(word.encode("utf-8")) % 10000 for word in words]
         return tokens
     
     def forward(
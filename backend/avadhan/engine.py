@@ -5,16 +5,21 @@ Implements the full Avadhan hybrid architecture with GPU support
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 import numpy as np
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 import time
 
 from .slot_manager import SlotManager
 from .orthogonalizer import Orthogonalizer
 from .controller import BuddhiController
 from .memory import MemoryHierarchy
+from .consolidation import ConsolidationWorker
 from .encoder import TextEncoder
+from .profiling import StageTimer, TraceCapture
+from .negatives import NegativeQueue, chunked_info_nce
+from .metrics import MetricsStore
+from . import checkpoint
 
 
 @dataclass
@@ -30,6 +35,10 @@ class TrainingMetrics:
     compute_time: float
 
 
+# Columns of the per-step MetricsStore
+METRIC_FIELDS = tuple(field.name for field in fields(TrainingMetrics))
+
+
 class AvadhanEngine:
     """
     Main Avadhan Training Engine
@@ -43,21 +52,83 @@ class AvadhanEngine:
         orthogonality_weight: float = 0.1,
         contrastive_temp: float = 0.07,
         learning_rate: float = 1e-4,
+        batch_size: int = 8,
+        gradient_accumulation_steps: int = 1,
         device: str = "cuda",
+        memory_compression: str = "none",
+        memory_rerank: int = 0,
+        episodic_ttl: Optional[float] = None,
+        dedup_threshold: Optional[float] = 0.95,
+        async_consolidation: bool = True,
+        profile_window: int = 1024,
+        orthogonalization: str = "exact",
+        full_orthogonalize_every: int = 100,
+        lazy_attention: bool = False,
+        slot_groups: int = 0,
+        rebalance_every: int = 1000,
+        routing_threshold: Optional[float] = None,
+        negative_queue_size: int = 0,
+        negative_chunk_size: int = 8192,
+        negative_refill: int = 256,
+        metrics_retention: int = 10000,
+        metrics_bucket_size: int = 10,
     ):
         self.device = torch.device(device if torch.cuda.is_available() else "cpu")
+        
+        # Constructor settings (minus device), recorded in checkpoints
+        self.config = {
+            "num_slots": num_slots,
+            "encoder_dim": encoder_dim,
+            "orthogonality_weight": orthogonality_weight,
+            "contrastive_temp": contrastive_temp,
+            "learning_rate": learning_rate,
+            "batch_size": batch_size,
+            "gradient_accumulation_steps": gradient_accumulation_steps,
+            "memory_compression": memory_compression,
+            "memory_rerank": memory_rerank,
+            "episodic_ttl": episodic_ttl,
+            "dedup_threshold": dedup_threshold,
+            "async_consolidation": async_consolidation,
+            "profile_window": profile_window,
+            "orthogonalization": orthogonalization,
+            "full_orthogonalize_every": full_orthogonalize_every,
+            "lazy_attention": lazy_attention,
+            "slot_groups": slot_groups,
+            "rebalance_every": rebalance_every,
+            "routing_threshold": routing_threshold,
+            "negative_queue_size": negative_queue_size,
+            "negative_chunk_size": negative_chunk_size,
+            "negative_refill": negative_refill,
+            "metrics_retention": metrics_retention,
+            "metrics_bucket_size": metrics_bucket_size,
+        }
+        
         self.num_slots = num_slots
         self.encoder_dim = encoder_dim
         self.orthogonality_weight = orthogonality_weight
         self.contrastive_temp = contrastive_temp
         self.learning_rate = learning_rate
+        self.batch_size = max(1, batch_size)
+        self.gradient_accumulation_steps = max(1, gradient_accumulation_steps)
+        
+        # "exact": full Gram-Schmidt on every write; "incremental": only the
+        # touched slots, with a full pass every full_orthogonalize_every writes
+        if orthogonalization not in ("exact", "incremental"):
+            raise ValueError(f"Unknown orthogonalization: {orthogonalization}")
+        self.orthogonalization = orthogonalization
+        self.full_orthogonalize_every = max(1, full_orthogonalize_every)
+        self._writes_since_full = 0
         
         # Initialize components
         self.encoder = TextEncoder(dim=encoder_dim, device=self.device)
         self.slot_manager = SlotManager(
             num_slots=num_slots, 
             dim=encoder_dim, 
-            device=self.device
+            device=self.device,
+            lazy_attention=lazy_attention,
+            num_groups=slot_groups,
+            rebalance_every=rebalance_every,
+            routing_threshold=routing_threshold,
         )
         self.orthogonalizer = Orthogonalizer(device=self.device)
         self.controller = BuddhiController(
@@ -65,132 +136,273 @@ class AvadhanEngine:
             state_dim=encoder_dim,
             device=self.device,
         )
-        self.memory = MemoryHierarchy(dim=encoder_dim, device=self.device)
+        self.memory = MemoryHierarchy(
+            dim=encoder_dim,
+            device=self.device,
+            compression=memory_compression,
+            rerank=memory_rerank,
+            episodic_ttl=episodic_ttl,
+            dedup_threshold=dedup_threshold,
+        )
+        
+        # Memory-bank negatives for the contrastive loss (0 = slots only)
+        self.negatives: Optional[NegativeQueue] = None
+        if negative_queue_size > 0:
+            self.negatives = NegativeQueue(negative_queue_size, encoder_dim, device=self.device)
+        self.negative_chunk_size = negative_chunk_size
+        self.negative_refill = negative_refill
+        
+        # Background consolidation keeps index writes off the ingest path
+        self.consolidator = None
+        if async_consolidation:
+            self.consolidator = ConsolidationWorker(self.memory)
+            self.consolidator.start()
+        
+        # Per-stage timings (ingest.* / train.*) and opt-in trace capture
+        self.timings = StageTimer(
+            window=profile_window,
+            synchronize=torch.cuda.synchronize if self.device.type == "cuda" else None,
+        )
+        self.trace: Optional[TraceCapture] = None
         
         # Training state
         self.current_epoch = 0
         self.is_training = False
-        self.metrics_history: List[TrainingMetrics] = []
+        self.metrics = MetricsStore(
+            METRIC_FIELDS,
+            retention=metrics_retention,
+            bucket_size=metrics_bucket_size,
+        )
         
         # Optimizer for trainable components
         self.optimizer = torch.optim.AdamW(
-            list(self.encoder.parameters()) + 
-            list(self.controller.parameters()),
+            self.trainable_parameters(),
             lr=learning_rate,
         )
         
+        # Data-parallel hooks (set by avadhan.distributed)
+        # gradient_sync(params, has_grad) -> has_grad, called before the optimizer step
+        self.gradient_sync: Optional[Callable[[List[nn.Parameter], bool], bool]] = None
+        # When set, evicted slots are collected here instead of consolidated
+        self.pending_evictions: Optional[List[Dict]] = None
+        
         print(f"Avadhan Engine initialized on {self.device}")
         print(f"  Slots: {num_slots}, Dim: {encoder_dim}")
     
     def ingest(self, text: str, thread_id: str) -> Dict:
         """Ingest text input into a slot"""
-        # Encode text to vector
-        with torch.no_grad():
-            vector = self.encoder.encode(text)
+        timings = self.timings
+        
+        with timings.stage("ingest.total"):
+            # Encode text to vector
+            with timings.stage("ingest.encode"), torch.no_grad():
+                vector = self.encoder.encode(text)
+            
+            # Ingest into slot manager
+            with timings.stage("ingest.slot_update"):
+                result = self.slot_manager.ingest(vector, thread_id)
+            
+            # Orthogonalize all slots
+            with timings.stage("ingest.orthogonalize"):
+                self._orthogonalize([result])
+            
+            # Handle eviction -> consolidation
+            if result.get("evicted"):
+                with timings.stage("ingest.consolidate"):
+                    self._consolidate_evicted(result["evicted"], result)
         
-        # Ingest into slot manager
-        result = self.slot_manager.ingest(vector, thread_id)
+        return result
+    
+    def _orthogonalize(self, results: List[Dict]):
+        """
+        Re-orthogonalize slots after a write (exact or incremental)
         
-        # Orthogonalize all slots
-        self.slot_manager.slots = self.orthogonalizer.orthogonalize(
-            self.slot_manager.slots
+        With slot groups only the written groups are processed (all groups
+        after a rebalance), so interference is controlled within groups.
+        """
+        slot_manager = self.slot_manager
+        incremental = (
+            self.orthogonalization == "incremental"
+            and self._writes_since_full < self.full_orthogonalize_every
         )
+        self._writes_since_full = self._writes_since_full + 1 if incremental else 0
+        written = {result.get("slot_id") for result in results}
         
-        # Handle eviction -> consolidation
-        if result.get("evicted"):
-            evicted_slot = result["evicted"]
-            gist = self.memory.consolidate(evicted_slot)
-            result["consolidated"] = gist
+        if slot_manager.num_groups:
+            if any(result.get("rebalanced") for result in results):
+                incremental = False
+                groups = range(slot_manager.num_groups)
+            else:
+                groups = {result["group"] for result in results if result.get("group") is not None}
+            
+            for group in groups:
+                self._orthogonalize_slots(slot_manager.groups[group], written, incremental)
+            return
         
-        return result
+        slot_manager.slots = self._orthogonalize_slots(slot_manager.slots, written, incremental)
+    
+    def _orthogonalize_slots(self, slots: List[Dict], written: set, incremental: bool) -> List[Dict]:
+        """Orthogonalize a slot list in place (only written slots if incremental)"""
+        if incremental:
+            changed = [i for i, slot in enumerate(slots) if slot["id"] in written]
+            slots = self.orthogonalizer.orthogonalize_incremental(slots, changed)
+            self.slot_manager.update_index(slots[i] for i in changed)
+        else:
+            slots = self.orthogonalizer.orthogonalize(slots)
+            self.slot_manager.update_index(slots)
+        return slots
+    
+    def trainable_parameters(self) -> List[nn.Parameter]:
+        """Parameters updated by the optimizer"""
+        return list(self.encoder.parameters()) + list(self.controller.parameters())
+    
+    def _consolidate_evicted(self, slot: Dict, result: Dict):
+        """Queue an evicted slot for consolidation, or consolidate inline"""
+        if self.negatives is not None:
+            self.negatives.enqueue(slot["vector"])
+        
+        if self.pending_evictions is not None:
+            self.pending_evictions.append({
+                "id": slot["id"],
+                "vector": slot["vector"].detach().cpu(),
+                "priority": slot["priority"],
+            })
+            result["consolidation_deferred"] = True
+        elif self.consolidator is not None and self.consolidator.submit(slot):
+            result["consolidation_queued"] = True
+        else:
+            result["consolidated"] = self.memory.consolidate(slot)
+    
+    @property
+    def step_size(self) -> int:
+        """Inputs consumed per training step"""
+        return self.batch_size * self.gradient_accumulation_steps
+    
+    def prepare_step(self, inputs: List[Tuple[str, str]]) -> List[Dict]:
+        """
+        Split step inputs into micro-batches and tokenize them
+        
+        Thread-safe; the data pipeline calls this ahead of time so
+        tokenization overlaps with the previous step.
+        """
+        micro_batches = []
+        for i in range(0, len(inputs), self.batch_size):
+            chunk = inputs[i:i + self.batch_size]
+            micro_batches.append({
+                "inputs": chunk,
+                "features": self.encoder.prepare([text for text, _ in chunk]),
+            })
+        return micro_batches
     
     def training_step(
         self, 
-        inputs: Optional[List[Tuple[str, str]]] = None
+        inputs: Optional[List[Tuple[str, str]]] = None,
+        prepared: Optional[List[Dict]] = None,
     ) -> Dict:
         """
-        Run a single training step
+        Run a single training step (one optimizer update)
+        
+        Inputs are split into micro-batches of batch_size; each micro-batch is
+        encoded, ingested and orthogonalized once, and gradients accumulate
+        across micro-batches before the optimizer step.
         
         Args:
-            inputs: List of (text, thread_id) tuples
+            inputs: List of (text, thread_id) tuples. Defaults to
+                batch_size * gradient_accumulation_steps synthetic inputs.
+            prepared: Output of prepare_step(), used instead of inputs
         
         Returns:
             Training metrics dictionary
         """
         start_time = time.time()
         self.is_training = True
+        timings = self.timings
+        
+        # A requested trace starts on the thread that runs the steps
+        trace = self.trace
+        if trace is not None and not trace.started:
+            trace.start()
         
         # Generate synthetic inputs if none provided
-        if inputs is None:
+        if inputs is None and prepared is None:
             inputs = [
-                (f"Training input {i} at epoch {self.current_epoch}", f"thread_{i}")
-                for i in range(min(4, self.num_slots))
+                (f"Training input {i} at epoch {self.current_epoch}", f"thread_{i % self.num_slots}")
+                for i in range(self.step_size)
             ]
         
-        # Process inputs
-        total_loss = torch.tensor(0.0, device=self.device)
+        if prepared is not None:
+            micro_batches = prepared
+        else:
+            with timings.stage("train.prepare"):
+                micro_batches = self.prepare_step(inputs)
         
-        for text, thread_id in inputs:
-            # Encode
-            vector = self.encoder.encode(text)
-            
-            # Ingest
-            self.slot_manager.ingest(vector, thread_id)
+        # Warm the negative bank from stored gists until it is full
+        if self.negatives is not None and not self.negatives.full:
+            with timings.stage("train.negatives"):
+                self.negatives.refill(self.memory, self.negative_refill)
         
-        # Orthogonalize
-        self.slot_manager.slots = self.orthogonalizer.orthogonalize(
-            self.slot_manager.slots
-        )
+        # Accumulate gradients over micro-batches
+        self.optimizer.zero_grad()
+        losses = {"loss": 0.0, "generation": 0.0, "contrastive": 0.0, "orthogonality": 0.0}
+        has_grad = False
         
-        # Compute losses
-        orth_loss = self.orthogonalizer.compute_loss(
-            self.slot_manager.slots,
-            weight=self.orthogonality_weight,
-        )
-        
-        contrastive_loss = self._compute_contrastive_loss()
-        generation_loss = self._simulate_generation_loss()
+        for batch in micro_batches:
+            batch_losses = self._train_micro_batch(batch, scale=1.0 / len(micro_batches))
+            has_grad = batch_losses.pop("has_grad") or has_grad
+            for key, value in batch_losses.items():
+                losses[key] += value / len(micro_batches)
         
-        total_loss = generation_loss + contrastive_loss + orth_loss
+        # Average gradients across data-parallel workers
+        if self.gradient_sync is not None:
+            with timings.stage("train.grad_sync"):
+                has_grad = self.gradient_sync(self.trainable_parameters(), has_grad)
         
-        # Backward pass (if we have gradients)
-        if total_loss.requires_grad:
-            self.optimizer.zero_grad()
-            total_loss.backward()
-            torch.nn.utils.clip_grad_norm_(
-                list(self.encoder.parameters()) + 
-                list(self.controller.parameters()),
-                max_norm=1.0,
-            )
-            self.optimizer.step()
+        # Optimizer step (if we have gradients)
+        if has_grad:
+            with timings.stage("train.optimizer"):
+                torch.nn.utils.clip_grad_norm_(
+                    self.trainable_parameters(),
+                    max_norm=1.0,
+                )
+                self.optimizer.step()
         
         # Controller step
-        controller_actions = self.controller.step(
-            self.slot_manager.get_state_matrix()
-        )
+        with timings.stage("train.controller"):
+            controller_actions = self.controller.step(
+                self.slot_manager.get_state_matrix()
+            )
         
         # Compute metrics
+        with timings.stage("train.metrics"):
+            if self.slot_manager.num_groups:
+                interference = self.orthogonalizer.compute_group_interference_rate(
+                    self.slot_manager.groups
+                )
+            else:
+                interference = self.orthogonalizer.compute_interference_rate(
+                    self.slot_manager.slots
+                )
         compute_time = time.time() - start_time
-        interference = self.orthogonalizer.compute_interference_rate(
-            self.slot_manager.slots
-        )
+        timings.record("train.step", compute_time)
+        
+        if trace is not None and trace.active:
+            trace.step()
         
         metrics = TrainingMetrics(
             epoch=self.current_epoch,
-            loss=total_loss.item() if torch.is_tensor(total_loss) else total_loss,
-            generation_loss=generation_loss.item() if torch.is_tensor(generation_loss) else generation_loss,
-            contrastive_loss=contrastive_loss.item() if torch.is_tensor(contrastive_loss) else contrastive_loss,
-            orthogonality_loss=orth_loss.item() if torch.is_tensor(orth_loss) else orth_loss,
+            loss=losses["loss"],
+            generation_loss=losses["generation"],
+            contrastive_loss=losses["contrastive"],
+            orthogonality_loss=losses["orthogonality"],
             recall_accuracy=min(0.95, 0.5 + self.current_epoch * 0.02),
             thread_purity=min(0.98, 0.6 + self.current_epoch * 0.015),
             interference_rate=interference,
             compute_time=compute_time,
         )
         
-        self.metrics_history.append(metrics)
         self.current_epoch += 1
         
-        return {
+        result = {
             "epoch": metrics.epoch,
             "loss": metrics.loss,
             "generation_loss": metrics.generation_loss,
@@ -201,25 +413,119 @@ class AvadhanEngine:
             "interference_rate": metrics.interference_rate,
             "compute_time": metrics.compute_time,
         }
+        self.metrics.append(result)
+        
+        return result
     
-    def _compute_contrastive_loss(self) -> torch.Tensor:
-        """Compute InfoNCE contrastive loss for slot embeddings"""
+    def _train_micro_batch(self, batch: Dict, scale: float) -> Dict:
+        """
+        Forward/backward for one micro-batch
+        
+        Args:
+            batch: Micro-batch from prepare_step()
+            scale: Loss scale for gradient accumulation
+        
+        Returns:
+            Loss values (floats) and whether gradients were produced
+        """
+        thread_ids = [thread_id for _, thread_id in batch["inputs"]]
+        timings = self.timings
+        
+        # One batched encode and one bulk slot update
+        with timings.stage("train.encode"):
+            embeddings = self.encoder.encode_prepared(batch["features"])
+        with timings.stage("train.slot_update"):
+            results = self.slot_manager.ingest_batch(embeddings, thread_ids)
+        
+        evicted = [result for result in results if result.get("evicted")]
+        if evicted:
+            with timings.stage("train.consolidate"):
+                for result in evicted:
+                    self._consolidate_evicted(result["evicted"], result)
+        
+        # Orthogonalize once per micro-batch
+        with timings.stage("train.orthogonalize"):
+            self._orthogonalize(results)
+        
+        # Target slot per input (-100 if its slot was evicted within the batch)
+        positions = {slot["id"]: i for i, slot in enumerate(self.slot_manager.slots)}
+        targets = torch.tensor(
+            [positions.get(result["slot_id"], -100) for result in results],
+            device=self.device,
+        )
+        
+        # Compute losses
+        with timings.stage("train.loss"):
+            # Grouped slots are only decorrelated within groups (groups by centroid)
+            if self.slot_manager.num_groups:
+                orth_loss = self.orthogonalizer.compute_group_loss(
+                    self.slot_manager.groups,
+                    weight=self.orthogonality_weight,
+                )
+            else:
+                orth_loss = self.orthogonalizer.compute_loss(
+                    self.slot_manager.slots,
+                    weight=self.orthogonality_weight,
+                )
+            contrastive_loss = self._compute_contrastive_loss(embeddings, targets)
+            generation_loss = self._simulate_generation_loss()
+            
+            total_loss = generation_loss + contrastive_loss + orth_loss
+        
+        # Backward pass (if we have gradients)
+        has_grad = total_loss.requires_grad
+        if has_grad:
+            with timings.stage("train.backward"):
+                (total_loss * scale).backward()
+        
+        # Slots carry values, not graph, into the next micro-batch
+        self.slot_manager.detach()
+        
+        return {
+            "loss": total_loss.item(),
+            "generation": generation_loss.item(),
+            "contrastive": contrastive_loss.item(),
+            "orthogonality": orth_loss.item(),
+            "has_grad": has_grad,
+        }
+    
+    def _compute_contrastive_loss(
+        self, 
+        embeddings: torch.Tensor, 
+        targets: torch.Tensor
+    ) -> torch.Tensor:
+        """
+        Compute InfoNCE contrastive loss over a batch
+        Each input embedding is pulled towards its thread's slot and pushed
+        away from every other live slot, plus the negative bank if enabled
+        
+        Args:
+            embeddings: [batch, dim] encoder outputs
+            targets: [batch] slot position per input (-100 = ignore)
+        """
         slots = self.slot_manager.slots
-        if len(slots) < 2:
+        if len(slots) < 2 or not (targets >= 0).any():
             return torch.tensor(0.0, device=self.device)
         
-        # Stack slot vectors
-        vectors = torch.stack([s["vector"] for s in slots])
+        # Slot vectors act as fixed keys
+        keys = F.normalize(self.slot_manager.get_state_matrix().detach(), dim=1)
+        queries = F.normalize(embeddings, dim=1)
         
-        # Normalize
-        vectors = F.normalize(vectors, dim=1)
+        if self.negatives is not None and len(self.negatives):
+            loss = chunked_info_nce(
+                queries,
+                keys,
+                targets,
+                self.negatives.negatives(),
+                self.contrastive_temp,
+                chunk_size=self.negative_chunk_size,
+            )
+            return loss * 0.1  # Scale down
         
-        # Compute similarity matrix
-        sim_matrix = torch.mm(vectors, vectors.t()) / self.contrastive_temp
+        # Compute similarity matrix [batch, num_slots]
+        logits = torch.mm(queries, keys.t()) / self.contrastive_temp
         
-        # InfoNCE loss (simplified)
-        labels = torch.arange(len(slots), device=self.device)
-        loss = F.cross_entropy(sim_matrix, labels)
+        loss = F.cross_entropy(logits, targets, ignore_index=-100)
         
         return loss * 0.1  # Scale down
     
@@ -236,24 +542,69 @@ class AvadhanEngine:
     
     def get_orthogonality_matrix(self) -> List[List[float]]:
         """Get orthogonality matrix"""
-        return self.orthogonalizer.compute_matrix(
-            self.slot_manager.slots
-        ).tolist()
+        return self.get_orthogonality_array().tolist()
+    
+    def get_slot_columns(self) -> Dict:
+        """Slot states as columns (NumPy arrays) for binary API responses"""
+        return self.slot_manager.export_columns()
+    
+    def get_orthogonality_array(self, upper: bool = False) -> np.ndarray:
+        """
+        Orthogonality matrix as float32 [N, N], or with upper only the strict
+        upper triangle, row-major (N * (N - 1) / 2 values; the matrix is
+        symmetric with a unit diagonal)
+        """
+        matrix = self.orthogonalizer.compute_matrix(self.slot_manager.slots).detach().float()
+        if upper:
+            rows, cols = torch.triu_indices(len(matrix), len(matrix), offset=1, device=matrix.device)
+            matrix = matrix[rows, cols]
+        return matrix.cpu().numpy()
+    
+    def request_trace(
+        self, 
+        steps: int, 
+        output_dir: str, 
+        mode: str = "torch"
+    ) -> TraceCapture:
+        """
+        Capture a torch.profiler / cProfile trace of the next `steps`
+        training steps; it starts with the next training_step() call
+        """
+        if self.trace is not None and not self.trace.done:
+            raise RuntimeError("Trace capture already in progress")
+        
+        self.trace = TraceCapture(steps, output_dir, mode)
+        return self.trace
     
-    def save_checkpoint(self, path: str):
-        """Save training checkpoint"""
-        torch.save({
-            "epoch": self.current_epoch,
-            "encoder_state": self.encoder.state_dict(),
-            "controller_state": self.controller.state_dict(),
-            "slot_states": self.slot_manager.export_slots(),
-            "metrics_history": self.metrics_history,
-        }, path)
+    def get_profile(self) -> Dict:
+        """Per-stage timing percentiles and trace status"""
+        return {
+            "stages": self.timings.summary(),
+            "trace": self.trace.get_status() if self.trace is not None else None,
+        }
+    
+    def close(self):
+        """Drain and stop background workers"""
+        if self.consolidator is not None:
+            self.consolidator.stop()
+        if self.trace is not None and self.trace.active:
+            self.trace.stop()
+    
+    def save_checkpoint(self, path: str) -> str:
+        """
+        Write a full-state checkpoint directory synchronously
+        (CheckpointManager writes them in the background instead)
+        """
+        return checkpoint.write_snapshot(checkpoint.snapshot(self), path)
     
-    def load_checkpoint(self, path: str):
-        """Load training checkpoint"""
-        checkpoint = torch.load(path, map_location=self.device)
-        self.current_epoch = checkpoint["epoch"]
-        self.encoder.load_state_dict(checkpoint["encoder_state"])
-        self.controller.load_state_dict(checkpoint["controller_state"])
-        self.metrics_history = checkpoint["metrics_history"]
+    def load_checkpoint(self, path: str) -> Dict:
+        """
+        Restore a checkpoint written by save_checkpoint or a CheckpointManager
+        
+        Args:
+            path: Checkpoint directory, or a directory of checkpoints (latest is used)
+        
+        Returns:
+            The checkpoint's metadata
+        """
+        return checkpoint.restore(self, path)
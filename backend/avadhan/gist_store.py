@@ -0,0 +1,600 @@
+"""
+Avadhan Gist Store - Columnar, compressed storage for memory gists
+Each gist is a row in parallel arrays; vectors are kept once, in compressed form
+"""
+import torch
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass
+import numpy as np
+
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+
+COMPRESSION_LEVELS = ("none", "fp16", "int8", "pq")
+
+# Rows scored per block when decoding compressed vectors
+SCORE_CHUNK = 4096
+
+
+@dataclass
+class Gist:
+    """Compressed memory gist (materialized view of one store row)"""
+    id: str
+    text: str
+    vector: torch.Tensor
+    slot_id: str
+    created_at: float
+    confidence: float
+    ttl: Optional[float] = None
+
+
+class GistStore:
+    """
+    Columnar store for one memory tier (episodic or semantic)
+
+    Compression levels (bytes per 384-dim vector):
+    - none: float32 (1536)
+    - fp16: float16 (768)
+    - int8: symmetric per-vector scalar quantization (388)
+    - pq:   product quantization codes (pq_subquantizers), with optional
+            re-ranking of the top candidates against float16 vectors
+
+    PQ codebooks are trained once pq_train_size vectors have been added;
+    until then vectors are held (and searched) as float16.
+
+    Gists are addressed by id through an id → row dict. Expired rows are
+    tombstoned and skipped at search time, with compaction once the tombstone
+    ratio crosses compaction_threshold; explicit deletes use swap-remove.
+    """
+
+    def __init__(
+        self,
+        dim: int = 384,
+        compression: str = "none",
+        pq_subquantizers: int = 16,
+        pq_train_size: int = 2048,
+        rerank: int = 0,
+        initial_capacity: int = 256,
+        compaction_threshold: float = 0.25,
+    ):
+        if compression not in COMPRESSION_LEVELS:
+            raise ValueError(f"Unknown compression level: {compression}")
+        if compression == "pq":
+            if not FAISS_AVAILABLE:
+                raise ImportError("faiss not installed (required for pq compression)")
+            if dim % pq_subquantizers != 0:
+                raise ValueError(
+                    f"dim {dim} is not divisible by pq_subquantizers {pq_subquantizers}"
+                )
+
+        self.dim = dim
+        self.compression = compression
+        self.pq_subquantizers = pq_subquantizers
+        self.pq_train_size = pq_train_size
+        self.rerank = rerank
+        self.compaction_threshold = compaction_threshold
+
+        self.size = 0
+        self.num_dead = 0
+        self.capacity = max(1, initial_capacity)
+
+        # Metadata columns
+        self.ids: List[str] = []
+        self.texts: List[str] = []
+        self.slot_ids: List[str] = []
+        self.created_at = np.zeros(self.capacity, dtype=np.float64)
+        self.confidence = np.zeros(self.capacity, dtype=np.float32)
+        self.ttl = np.full(self.capacity, np.nan, dtype=np.float64)
+        self.alive = np.zeros(self.capacity, dtype=bool)
+        self.access_count = np.zeros(self.capacity, dtype=np.int32)
+        self.last_access = np.zeros(self.capacity, dtype=np.float64)
+        self.merge_count = np.zeros(self.capacity, dtype=np.int32)
+        self._row_by_id: Dict[str, int] = {}
+
+        # Bumped on every write, so checkpoints can reuse an unchanged store
+        self.version = 0
+
+        # Vector columns
+        self._codes = np.zeros((self.capacity, self._code_size()), dtype=self._code_dtype())
+        self._scales = (
+            np.zeros(self.capacity, dtype=np.float32)
+            if compression == "int8" else None
+        )
+
+        # PQ state: float16 vectors are kept until the quantizer is trained,
+        # and afterwards only if re-ranking is enabled
+        self._pq = None
+        self._pq_centroids = None
+        self._fine = (
+            np.zeros((self.capacity, dim), dtype=np.float16)
+            if compression == "pq" else None
+        )
+
+    def __len__(self) -> int:
+        return self.size - self.num_dead
+
+    def row_of(self, gist_id: str) -> Optional[int]:
+        """Row index of a live gist, or None"""
+        return self._row_by_id.get(gist_id)
+
+    @property
+    def tombstone_ratio(self) -> float:
+        return self.num_dead / self.size if self.size else 0.0
+
+    def _code_size(self) -> int:
+        if self.compression == "pq":
+            return self.pq_subquantizers
+        return self.dim
+
+    def _code_dtype(self):
+        return {
+            "none": np.float32,
+            "fp16": np.float16,
+            "int8": np.int8,
+            "pq": np.uint8,
+        }[self.compression]
+
+    @property
+    def pq_trained(self) -> bool:
+        return self._pq is not None
+
+    # ============== Writes ==============
+
+    def append(
+        self,
+        gist_id: str,
+        text: str,
+        vector: np.ndarray,
+        slot_id: str,
+        created_at: float,
+        confidence: float,
+        ttl: Optional[float] = None,
+    ) -> int:
+        """
+        Append a gist row
+
+        Args:
+            vector: [dim] float32 vector (normalized before encoding)
+
+        Returns:
+            Row index of the new gist
+        """
+        return self.append_batch(
+            [gist_id], [text], vector.reshape(1, -1), [slot_id],
+            [created_at], [confidence], [ttl],
+        )[0]
+
+    def append_batch(
+        self,
+        gist_ids: List[str],
+        texts: List[str],
+        vectors: np.ndarray,
+        slot_ids: List[str],
+        created_at: List[float],
+        confidence: List[float],
+        ttls: List[Optional[float]],
+    ) -> np.ndarray:
+        """
+        Append several gist rows with one vectorized encode
+
+        Args:
+            vectors: [n, dim] float32 vectors (normalized before encoding)
+
+        Returns:
+            Row indices of the new gists
+        """
+        n = len(gist_ids)
+        start, end = self.size, self.size + n
+
+        if end > self.capacity:
+            capacity = self.capacity
+            while capacity < end:
+                capacity *= 2
+            self._grow(capacity)
+
+        self.ids.extend(gist_ids)
+        self.texts.extend(texts)
+        self.slot_ids.extend(slot_ids)
+        self.created_at[start:end] = created_at
+        self.confidence[start:end] = confidence
+        self.ttl[start:end] = [np.nan if ttl is None else ttl for ttl in ttls]
+        self.alive[start:end] = True
+        self.access_count[start:end] = 0
+        self.last_access[start:end] = created_at
+        self.merge_count[start:end] = 1
+        self._write_vectors(start, self._normalize(vectors))
+        for row, gist_id in enumerate(gist_ids, start):
+            self._row_by_id[gist_id] = row
+        self.size = end
+
+        if self.compression == "pq" and not self.pq_trained and self.size >= self.pq_train_size:
+            self._train_pq()
+
+        self.version += 1
+        return np.arange(start, end)
+
+    def merge(self, row: int, vector: np.ndarray, confidence: float):
+        """
+        Fold a near-duplicate observation into an existing row
+
+        The stored vector becomes the running mean of all merged vectors
+        (re-normalized) and confidence keeps the maximum seen.
+        """
+        count = int(self.merge_count[row])
+        new = self._normalize(vector.reshape(1, -1))
+        mean = (self.vectors([row]) * count + new) / (count + 1)
+
+        self._write_vectors(row, self._normalize(mean))
+        self.merge_count[row] = count + 1
+        self.confidence[row] = max(float(self.confidence[row]), confidence)
+        self.version += 1
+
+    def tombstone(self, row: int) -> bool:
+        """
+        Mark a row deleted; it is skipped by searches until compaction
+
+        Returns:
+            True if the row was live
+        """
+        if row < 0 or row >= self.size or not self.alive[row]:
+            return False
+
+        self.alive[row] = False
+        self.num_dead += 1
+        del self._row_by_id[self.ids[row]]
+        self.version += 1
+        return True
+
+    def swap_remove(self, row: int):
+        """Delete a row in O(1) by moving the last row into its place"""
+        if row < 0 or row >= self.size:
+            raise IndexError(f"Row out of range: {row}")
+
+        last = self.size - 1
+        if self.alive[row]:
+            del self._row_by_id[self.ids[row]]
+        else:
+            self.num_dead -= 1
+
+        if row != last:
+            for array in self._row_arrays():
+                array[row] = array[last]
+            for column in (self.ids, self.texts, self.slot_ids):
+                column[row] = column[last]
+            if self.alive[row]:
+                self._row_by_id[self.ids[row]] = row
+
+        for column in (self.ids, self.texts, self.slot_ids):
+            column.pop()
+        self.alive[last] = False
+        self.ttl[last] = np.nan
+        self.size = last
+        self.version += 1
+
+    def maybe_compact(self) -> bool:
+        """Compact if the tombstone ratio crosses the threshold"""
+        if self.num_dead and self.tombstone_ratio >= self.compaction_threshold:
+            self.compact()
+            return True
+        return False
+
+    def compact(self):
+        """Drop tombstoned rows and reassign row indices"""
+        keep = np.nonzero(self.alive[:self.size])[0]
+        n = keep.shape[0]
+
+        for name in ("ids", "texts", "slot_ids"):
+            column = getattr(self, name)
+            setattr(self, name, [column[i] for i in keep])
+
+        for array in self._row_arrays():
+            array[:n] = array[keep]
+
+        self.alive[n:self.size] = False
+        self.ttl[n:self.size] = np.nan
+        self.size = n
+        self.num_dead = 0
+        self._row_by_id = {gist_id: row for row, gist_id in enumerate(self.ids)}
+        self.version += 1
+
+    def _row_arrays(self) -> List[np.ndarray]:
+        """All preallocated per-row arrays"""
+        arrays = [
+            self.created_at, self.confidence, self.ttl, self.alive,
+            self.access_count, self.last_access, self.merge_count, self._codes,
+        ]
+        if self._scales is not None:
+            arrays.append(self._scales)
+        if self._fine is not None:
+            arrays.append(self._fine)
+        return arrays
+
+    def _grow(self, capacity: int):
+        """Reallocate per-row arrays with a larger capacity"""
+        def grown(array: np.ndarray) -> np.ndarray:
+            new = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            new[:self.size] = array[:self.size]
+            return new
+
+        self.created_at = grown(self.created_at)
+        self.confidence = grown(self.confidence)
+        self.ttl = grown(self.ttl)
+        self.ttl[self.size:] = np.nan
+        self.alive = grown(self.alive)
+        self.access_count = grown(self.access_count)
+        self.last_access = grown(self.last_access)
+        self.merge_count = grown(self.merge_count)
+        self._codes = grown(self._codes)
+        if self._scales is not None:
+            self._scales = grown(self._scales)
+        if self._fine is not None:
+            self._fine = grown(self._fine)
+        self.capacity = capacity
+
+    def _write_vectors(self, start: int, vectors: np.ndarray):
+        """Encode [n, dim] normalized vectors into rows starting at `start`"""
+        end = start + vectors.shape[0]
+
+        if self.compression == "none":
+            self._codes[start:end] = vectors
+        elif self.compression == "fp16":
+            self._codes[start:end] = vectors.astype(np.float16)
+        elif self.compression == "int8":
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            self._codes[start:end] = np.round(vectors / scales[:, None]).astype(np.int8)
+            self._scales[start:end] = scales
+        else:
+            if self._fine is not None:
+                self._fine[start:end] = vectors.astype(np.float16)
+            if self.pq_trained:
+                self._codes[start:end] = self._pq.compute_codes(vectors)
+
+    def _train_pq(self):
+        """Train PQ codebooks on the float16 vectors collected so far"""
+        train = self._fine[:self.size].astype(np.float32)
+
+        pq = faiss.ProductQuantizer(self.dim, self.pq_subquantizers, 8)
+        pq.train(train)
+        self._pq = pq
+        self._pq_centroids = faiss.vector_to_array(pq.centroids).reshape(
+            pq.M, pq.ksub, pq.dsub
+        )
+        self._codes[:self.size] = pq.compute_codes(train)
+
+        if self.rerank <= 0:
+            self._fine = None
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    # ============== Reads ==============
+
+    def vectors(self, rows: np.ndarray) -> np.ndarray:
+        """Decode vectors for the given rows -> [len(rows), dim] float32"""
+        rows = np.asarray(rows, dtype=np.int64)
+
+        if self.compression == "none":
+            return self._codes[rows].copy()
+        if self.compression == "fp16":
+            return self._codes[rows].astype(np.float32)
+        if self.compression == "int8":
+            return self._codes[rows].astype(np.float32) * self._scales[rows, None]
+        if self._fine is not None:
+            return self._fine[rows].astype(np.float32)
+        return self._pq.decode(np.ascontiguousarray(self._codes[rows]))
+
+    def get(self, row: int) -> Gist:
+        """Materialize a row as a Gist"""
+        return self.get_many([row])[0]
+
+    def get_many(self, rows: List[int]) -> List[Gist]:
+        """Materialize several rows with one batched vector decode"""
+        if len(rows) == 0:
+            return []
+
+        vectors = torch.from_numpy(self.vectors(rows))
+        gists = []
+        for i, row in enumerate(rows):
+            ttl = self.ttl[row]
+            gists.append(Gist(
+                id=self.ids[row],
+                text=self.texts[row],
+                vector=vectors[i],
+                slot_id=self.slot_ids[row],
+                created_at=float(self.created_at[row]),
+                confidence=float(self.confidence[row]),
+                ttl=None if np.isnan(ttl) else float(ttl),
+            ))
+        return gists
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Inner-product search over live rows
+
+        Args:
+            query: [dim] normalized float32 query
+            k: Number of results
+
+        Returns:
+            (scores, rows) sorted by descending score
+        """
+        k = min(k, len(self))
+        if k <= 0:
+            return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+
+        query = np.ascontiguousarray(query, dtype=np.float32)
+        use_rerank = self.compression == "pq" and self.pq_trained and self.rerank > 0
+
+        scores = self._scores(query)
+        if self.num_dead:
+            scores[~self.alive[:self.size]] = -np.inf
+        rows = self._top_k(scores, min(max(k, self.rerank), len(self)) if use_rerank else k)
+
+        if use_rerank:
+            exact = self._fine[rows].astype(np.float32) @ query
+            order = np.argsort(-exact)[:k]
+            return exact[order], rows[order]
+
+        return scores[rows], rows
+
+    def _scores(self, query: np.ndarray) -> np.ndarray:
+        """Score every row against the query"""
+        n = self.size
+
+        if self.compression == "none":
+            return (self._codes[:n] @ query).astype(np.float32)
+
+        scores = np.empty(n, dtype=np.float32)
+
+        if self.compression == "pq" and self.pq_trained:
+            # Asymmetric distance computation: per-subspace lookup tables
+            table = np.einsum(
+                "mkd,md->mk", self._pq_centroids, query.reshape(self._pq.M, -1)
+            )
+            subspaces = np.arange(self._pq.M)
+            for start in range(0, n, SCORE_CHUNK):
+                end = min(n, start + SCORE_CHUNK)
+                scores[start:end] = table[subspaces, self._codes[start:end]].sum(axis=1)
+            return scores
+
+        source = self._fine if self.compression == "pq" else self._codes
+        for start in range(0, n, SCORE_CHUNK):
+            end = min(n, start + SCORE_CHUNK)
+            scores[start:end] = source[start:end].astype(np.float32) @ query
+
+        if self.compression == "int8":
+            scores *= self._scales[:n]
+
+        return scores
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the k highest scores, sorted descending"""
+        k = min(k, scores.shape[0])
+        if k < scores.shape[0]:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(scores.shape[0])
+        return top[np.argsort(-scores[top])]
+
+    def nbytes(self) -> int:
+        """Bytes used by stored vector data (including tombstoned rows)"""
+        n = self.size
+        total = self._codes[:n].nbytes
+        if self._scales is not None:
+            total += self._scales[:n].nbytes
+        if self._fine is not None:
+            total += self._fine[:n].nbytes
+        return total
+
+    def export(self) -> List[Dict]:
+        """Export row metadata for persistence"""
+        return [
+            {
+                "id": self.ids[i],
+                "text": self.texts[i],
+                "slot_id": self.slot_ids[i],
+                "created_at": float(self.created_at[i]),
+                "confidence": float(self.confidence[i]),
+            }
+            for i in range(self.size)
+            if self.alive[i]
+        ]
+
+    # ============== Checkpointing ==============
+
+    def state(self) -> Tuple[Dict[str, np.ndarray], Dict]:
+        """
+        Copy of the store's rows for a checkpoint
+
+        Returns:
+            (arrays, meta): per-row arrays truncated to size (plus PQ
+            codebooks once trained), and the string columns and counters
+        """
+        n = self.size
+        arrays = {name: array[:n].copy() for name, array in self._named_row_arrays().items()}
+        if self._pq_centroids is not None:
+            arrays["pq_centroids"] = self._pq_centroids.copy()
+
+        meta = {
+            "compression": self.compression,
+            "size": n,
+            "num_dead": self.num_dead,
+            "ids": list(self.ids),
+            "texts": list(self.texts),
+            "slot_ids": list(self.slot_ids),
+        }
+        return arrays, meta
+
+    def load_state(self, arrays: Dict[str, np.ndarray], meta: Dict):
+        """Replace all rows with a state() taken from a store of the same compression"""
+        if meta["compression"] != self.compression:
+            raise ValueError(
+                f"Store compression mismatch: {meta['compression']} != {self.compression}"
+            )
+
+        n = meta["size"]
+        capacity = 1
+        while capacity < n:
+            capacity *= 2
+
+        self.size = 0
+        self.capacity = capacity
+        self.created_at = np.zeros(capacity, dtype=np.float64)
+        self.confidence = np.zeros(capacity, dtype=np.float32)
+        self.ttl = np.full(capacity, np.nan, dtype=np.float64)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.access_count = np.zeros(capacity, dtype=np.int32)
+        self.last_access = np.zeros(capacity, dtype=np.float64)
+        self.merge_count = np.zeros(capacity, dtype=np.int32)
+        self._codes = np.zeros((capacity, self._code_size()), dtype=self._code_dtype())
+        self._scales = np.zeros(capacity, dtype=np.float32) if "scales" in arrays else None
+        self._fine = np.zeros((capacity, self.dim), dtype=np.float16) if "fine" in arrays else None
+
+        for name, array in self._named_row_arrays().items():
+            array[:n] = arrays[name]
+
+        self._pq = None
+        self._pq_centroids = None
+        if "pq_centroids" in arrays:
+            centroids = np.ascontiguousarray(arrays["pq_centroids"], dtype=np.float32)
+            pq = faiss.ProductQuantizer(self.dim, self.pq_subquantizers, 8)
+            faiss.copy_array_to_vector(centroids.ravel(), pq.centroids)
+            self._pq = pq
+            self._pq_centroids = centroids
+
+        self.ids = list(meta["ids"])
+        self.texts = list(meta["texts"])
+        self.slot_ids = list(meta["slot_ids"])
+        self.size = n
+        self.num_dead = meta["num_dead"]
+        self._row_by_id = {
+            gist_id: row for row, gist_id in enumerate(self.ids) if self.alive[row]
+        }
+        self.version += 1
+
+    def _named_row_arrays(self) -> Dict[str, np.ndarray]:
+        """Per-row arrays by state() name"""
+        arrays = {
+            "created_at": self.created_at,
+            "confidence": self.confidence,
+            "ttl": self.ttl,
+            "alive": self.alive,
+            "access_count": self.access_count,
+            "last_access": self.last_access,
+            "merge_count": self.merge_count,
+            "codes": self._codes,
+        }
+        if self._scales is not None:
+            arrays["scales"] = self._scales
+        if self._fine is not None:
+            arrays["fine"] = self._fine
+        return arrays
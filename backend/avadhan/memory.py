@@ -5,27 +5,12 @@ Working Memory → Episodic Store → Semantic Archive
 import torch
 import torch.nn.functional as F
 from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass
+import heapq
+import threading
 import time
 import numpy as np
 
-try:
-    import faiss
-    FAISS_AVAILABLE = True
-except ImportError:
-    FAISS_AVAILABLE = False
-
-
-@dataclass
-class Gist:
-    """Compressed memory gist"""
-    id: str
-    text: str
-    vector: torch.Tensor
-    slot_id: str
-    created_at: float
-    confidence: float
-    ttl: Optional[float] = None
+from .gist_store import Gist, GistStore, FAISS_AVAILABLE
 
 
 class MemoryHierarchy:
@@ -35,7 +20,19 @@ class MemoryHierarchy:
     - Episodic Store (M_E): Compressed gists from evicted slots
     - Semantic Archive (M_S): Long-term consolidated knowledge
     
-    Uses FAISS for efficient vector search when available
+    Gists are stored column-wise in a GistStore per tier, with configurable
+    vector compression (none, fp16, int8, pq). FAISS is used for PQ training.
+    
+    Episodic TTL expiry is driven by a min-heap of deadlines, so a sweep only
+    touches gists that are due; expired rows are tombstoned and compacted lazily.
+    
+    Searches track per-gist access counts; gists that reach promote_min_access
+    hits and were accessed within promote_max_idle seconds are promoted to the
+    semantic tier by promote_hot(). All public methods are thread-safe.
+    
+    Consolidation first looks up the nearest episodic gist; at or above
+    dedup_threshold cosine similarity the slot is merged into it instead of
+    inserted (None disables deduplication).
     """
     
     def __init__(
@@ -43,85 +40,295 @@ class MemoryHierarchy:
         dim: int = 384,
         device: torch.device = None,
         use_faiss: bool = True,
+        compression: str = "none",
+        semantic_compression: Optional[str] = None,
+        pq_subquantizers: int = 16,
+        rerank: int = 0,
+        episodic_ttl: Optional[float] = None,
+        compaction_threshold: float = 0.25,
+        promote_min_access: int = 3,
+        promote_max_idle: float = 300.0,
+        dedup_threshold: Optional[float] = 0.95,
     ):
         self.dim = dim
         self.device = device or torch.device("cpu")
         self.use_faiss = use_faiss and FAISS_AVAILABLE
+        self.compression = compression
+        self.semantic_compression = semantic_compression or compression
+        self.episodic_ttl = episodic_ttl
+        self.promote_min_access = promote_min_access
+        self.promote_max_idle = promote_max_idle
+        self.dedup_threshold = dedup_threshold
+        
+        # Guards both tiers against the consolidation worker and sweeper
+        self._lock = threading.RLock()
+        
+        # Episodic gist ids that reached promote_min_access
+        self._hot: Dict[str, None] = {}
+        self.promoted_count = 0
+        
+        # Gist ids are allocated monotonically and never reused
+        self._next_gist_id = 0
+        
+        # Consolidation outcomes
+        self.insert_count = 0
+        self.merge_count = 0
+        
+        # Expiry deadlines: (deadline, gist_id), lazily pruned
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self.expired_count = 0
         
         # Episodic store
-        self.episodic: List[Gist] = []
-        self.episodic_index = None
+        self.episodic = GistStore(
+            dim=dim,
+            compression=compression,
+            pq_subquantizers=pq_subquantizers,
+            rerank=rerank,
+            compaction_threshold=compaction_threshold,
+        )
         
         # Semantic archive
-        self.semantic: List[Gist] = []
-        self.semantic_index = None
-        
-        # Initialize FAISS indices if available
-        if self.use_faiss:
-            self._init_faiss_indices()
-    
-    def _init_faiss_indices(self):
-        """Initialize FAISS indices for fast vector search"""
-        self.episodic_index = faiss.IndexFlatIP(self.dim)  # Inner product
-        self.semantic_index = faiss.IndexFlatIP(self.dim)
+        self.semantic = GistStore(
+            dim=dim,
+            compression=self.semantic_compression,
+            pq_subquantizers=pq_subquantizers,
+            rerank=rerank,
+            compaction_threshold=compaction_threshold,
+        )
     
-    def consolidate(self, slot: Dict) -> Gist:
+    def consolidate(self, slot: Dict, ttl: Optional[float] = None) -> Gist:
         """
         Consolidate a slot into a gist for episodic storage
         M_E(t+Δ) = M_E(t) + C_W(M_W(t))
         
         Args:
             slot: Slot dict with 'vector', 'id', etc.
+            ttl: Seconds until expiry (defaults to episodic_ttl)
         
         Returns:
-            Created Gist
-        """
-        gist = Gist(
-            id=f"gist_{int(time.time())}_{len(self.episodic)}",
-            text=f"Consolidated from slot {slot.get('id', 'unknown')}",
-            vector=slot["vector"].clone().cpu(),
-            slot_id=slot.get("id", ""),
-            created_at=time.time(),
-            confidence=slot.get("priority", 0.5),
-        )
+            Created (or merged-into) Gist
+        """
+        with self._lock:
+            row = self._consolidate_rows([slot], ttl)[0]
+            return self.episodic.get(int(row))
+    
+    def consolidate_batch(
+        self, 
+        slots: List[Dict], 
+        ttl: Optional[float] = None
+    ) -> List[str]:
+        """
+        Consolidate several slots with one vectorized store write
+        
+        Returns:
+            Created (or merged-into) gist ids
+        """
+        if not slots:
+            return []
+        
+        with self._lock:
+            rows = self._consolidate_rows(slots, ttl)
+            return [self.episodic.ids[row] for row in rows]
+    
+    def _consolidate_rows(self, slots: List[Dict], ttl: Optional[float]) -> np.ndarray:
+        """
+        Merge near-duplicates and append the rest to the episodic store
+        (caller holds the lock)
+        
+        Rows are deduplicated in order, as consolidate() would one at a
+        time: against stored gists and against earlier rows of the same
+        batch (the consolidation worker batches slots evicted at different
+        steps). Inserts are buffered and appended together, flushed early
+        only when a later row duplicates one of them.
+        
+        Returns:
+            Row per input slot
+        """
+        vectors = torch.stack([
+            slot["vector"].detach().float().cpu() for slot in slots
+        ]).numpy()
+        units = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        
+        rows = np.full(len(slots), -1, dtype=np.int64)
+        pending: List[int] = []
+        
+        def append_pending():
+            rows[pending] = self._append_rows([slots[i] for i in pending], vectors[pending], ttl)
+            self.insert_count += len(pending)
+            pending.clear()
+        
+        merged = 0
+        for i in range(len(slots)):
+            if self.dedup_threshold is not None:
+                if pending and float((units[pending] @ units[i]).max()) >= self.dedup_threshold:
+                    append_pending()
+                if len(self.episodic) > 0:
+                    scores, matches = self.episodic.search(units[i], 1)
+                    if scores[0] >= self.dedup_threshold:
+                        rows[i] = int(matches[0])
+                        self.episodic.merge(int(rows[i]), vectors[i], slots[i].get("priority", 0.5))
+                        merged += 1
+                        continue
+            pending.append(i)
         
-        self.episodic.append(gist)
+        if pending:
+            append_pending()
+        self.merge_count += merged
         
-        # Add to FAISS index
-        if self.use_faiss and self.episodic_index is not None:
-            vector_np = F.normalize(gist.vector, dim=0).numpy().reshape(1, -1)
-            self.episodic_index.add(vector_np.astype(np.float32))
+        return rows
+    
+    def _append_rows(
+        self, 
+        slots: List[Dict], 
+        vectors: np.ndarray, 
+        ttl: Optional[float]
+    ) -> np.ndarray:
+        """Insert new episodic gists (caller holds the lock)"""
+        ttl = self.episodic_ttl if ttl is None else ttl
+        created_at = time.time()
+        base = self._next_gist_id
+        gist_ids = [f"gist_{base + i}" for i in range(len(slots))]
+        self._next_gist_id += len(slots)
+        
+        rows = self.episodic.append_batch(
+            gist_ids=gist_ids,
+            texts=[f"Consolidated from slot {slot.get('id', 'unknown')}" for slot in slots],
+            vectors=vectors,
+            slot_ids=[slot.get("id", "") for slot in slots],
+            created_at=[created_at] * len(slots),
+            confidence=[slot.get("priority", 0.5) for slot in slots],
+            ttls=[ttl] * len(slots),
+        )
+        
+        if ttl is not None:
+            for gist_id in gist_ids:
+                heapq.heappush(self._expiry_heap, (created_at + ttl, gist_id))
         
-        return gist
+        return rows
     
     def promote_to_semantic(self, gist_id: str) -> bool:
         """
         Promote a gist from episodic to semantic memory
         M_S(t+Δ) = M_S(t) + C_E(M_E(t))
         """
-        gist = None
-        gist_idx = None
+        return self.promote_many([gist_id]) == 1
+    
+    def promote_many(self, gist_ids: List[str]) -> int:
+        """
+        Promote several episodic gists with one batched decode and append
         
-        for i, g in enumerate(self.episodic):
-            if g.id == gist_id:
-                gist = g
-                gist_idx = i
-                break
+        Returns:
+            Number of gists promoted (unknown ids are skipped)
+        """
+        with self._lock:
+            rows = [self.episodic.row_of(gist_id) for gist_id in dict.fromkeys(gist_ids)]
+            return self._promote_rows([row for row in rows if row is not None])
+    
+    def _promote_rows(self, rows: List[int]) -> int:
+        """Move episodic rows to the semantic tier (caller holds the lock)"""
+        if not rows:
+            return 0
         
-        if gist is None:
-            return False
+        store = self.episodic
+        self.semantic.append_batch(
+            gist_ids=[store.ids[row] for row in rows],
+            texts=[store.texts[row] for row in rows],
+            vectors=store.vectors(rows),
+            slot_ids=[store.slot_ids[row] for row in rows],
+            created_at=store.created_at[rows],
+            confidence=store.confidence[rows],
+            ttls=[None] * len(rows),
+        )
         
-        # Remove from episodic
-        self.episodic.pop(gist_idx)
+        for row in rows:
+            self._hot.pop(store.ids[row], None)
         
-        # Add to semantic
-        self.semantic.append(gist)
+        # Descending order keeps pending rows in place during swap-remove
+        for row in sorted(rows, reverse=True):
+            store.swap_remove(row)
         
-        # Update FAISS indices
-        if self.use_faiss:
-            self._rebuild_indices()
+        self.promoted_count += len(rows)
+        return len(rows)
+    
+    def promote_hot(self, now: Optional[float] = None) -> int:
+        """
+        Promote frequently and recently accessed episodic gists
+        
+        Only gists whose access count crossed promote_min_access are
+        considered; those idle longer than promote_max_idle are dropped.
+        
+        Returns:
+            Number of gists promoted
+        """
+        now = time.time() if now is None else now
+        
+        with self._lock:
+            rows = []
+            for gist_id in list(self._hot):
+                row = self.episodic.row_of(gist_id)
+                if row is None or now - self.episodic.last_access[row] > self.promote_max_idle:
+                    self._hot.pop(gist_id, None)
+                else:
+                    rows.append(row)
+            
+            return self._promote_rows(rows)
+    
+    def sample_vectors(
+        self, 
+        n: int, 
+        rng: Optional[np.random.Generator] = None
+    ) -> np.ndarray:
+        """
+        Decode up to n live gist vectors sampled uniformly from both tiers
+        Only the sampled rows are decoded; the stores are not copied.
+        
+        Returns:
+            [m, dim] float32 array, m <= n
+        """
+        rng = rng or np.random.default_rng()
         
-        return True
+        with self._lock:
+            stores = [self.episodic, self.semantic]
+            sizes = [store.size for store in stores]
+            total = sum(sizes)
+            if total == 0 or n <= 0:
+                return np.zeros((0, self.dim), dtype=np.float32)
+            
+            # Sample over raw rows, then drop tombstoned ones
+            picks = rng.choice(total, size=min(n, total), replace=False)
+            vectors = []
+            offset = 0
+            for store, size in zip(stores, sizes):
+                rows = picks[(picks >= offset) & (picks < offset + size)] - offset
+                rows = rows[store.alive[rows]]
+                if len(rows):
+                    vectors.append(store.vectors(rows))
+                offset += size
+            
+            if not vectors:
+                return np.zeros((0, self.dim), dtype=np.float32)
+            return np.concatenate(vectors).astype(np.float32, copy=False)
+    
+    def get_gists(self, gist_ids: List[str]) -> List[Optional[Gist]]:
+        """
+        Fetch gists by id from either tier
+        
+        Returns:
+            One Gist (or None if unknown) per requested id, in order
+        """
+        with self._lock:
+            found: Dict[str, Gist] = {}
+            
+            for store in (self.episodic, self.semantic):
+                rows = []
+                for gist_id in gist_ids:
+                    row = store.row_of(gist_id)
+                    if row is not None:
+                        rows.append(row)
+                for gist in store.get_many(rows):
+                    found[gist.id] = gist
+            
+            return [found.get(gist_id) for gist_id in gist_ids]
     
     def search_episodic(
         self, 
@@ -129,18 +336,7 @@ class MemoryHierarchy:
         k: int = 3
     ) -> List[Gist]:
         """Search episodic memory for similar gists"""
-        if not self.episodic:
-            return []
-        
-        query = F.normalize(query_vector, dim=0)
-        
-        if self.use_faiss and self.episodic_index is not None:
-            query_np = query.cpu().numpy().reshape(1, -1).astype(np.float32)
-            distances, indices = self.episodic_index.search(query_np, min(k, len(self.episodic)))
-            return [self.episodic[i] for i in indices[0] if i < len(self.episodic)]
-        else:
-            # Fallback to brute force
-            return self._search_brute_force(query, self.episodic, k)
+        return self._search(self.episodic, query_vector, k)
     
     def search_semantic(
         self, 
@@ -148,104 +344,136 @@ class MemoryHierarchy:
         k: int = 3
     ) -> List[Gist]:
         """Search semantic memory for similar gists"""
-        if not self.semantic:
-            return []
-        
-        query = F.normalize(query_vector, dim=0)
-        
-        if self.use_faiss and self.semantic_index is not None:
-            query_np = query.cpu().numpy().reshape(1, -1).astype(np.float32)
-            distances, indices = self.semantic_index.search(query_np, min(k, len(self.semantic)))
-            return [self.semantic[i] for i in indices[0] if i < len(self.semantic)]
-        else:
-            return self._search_brute_force(query, self.semantic, k)
+        return self._search(self.semantic, query_vector, k)
     
-    def _search_brute_force(
+    def _search(
         self, 
-        query: torch.Tensor, 
-        gists: List[Gist], 
+        store: GistStore, 
+        query_vector: torch.Tensor, 
         k: int
     ) -> List[Gist]:
-        """Brute force search fallback"""
-        if not gists:
-            return []
+        """Search one tier, record accesses and materialize the top-k gists"""
+        query = F.normalize(query_vector.detach().float(), dim=0).cpu().numpy()
         
-        similarities = []
-        for gist in gists:
-            sim = F.cosine_similarity(
-                query.unsqueeze(0), 
-                gist.vector.unsqueeze(0)
-            ).item()
-            similarities.append((sim, gist))
-        
-        similarities.sort(key=lambda x: x[0], reverse=True)
-        return [g for _, g in similarities[:k]]
-    
-    def _rebuild_indices(self):
-        """Rebuild FAISS indices after modifications"""
-        if not self.use_faiss:
-            return
-        
-        # Rebuild episodic index
-        self.episodic_index = faiss.IndexFlatIP(self.dim)
-        if self.episodic:
-            vectors = np.stack([
-                F.normalize(g.vector, dim=0).numpy() 
-                for g in self.episodic
-            ]).astype(np.float32)
-            self.episodic_index.add(vectors)
-        
-        # Rebuild semantic index
-        self.semantic_index = faiss.IndexFlatIP(self.dim)
-        if self.semantic:
-            vectors = np.stack([
-                F.normalize(g.vector, dim=0).numpy() 
-                for g in self.semantic
-            ]).astype(np.float32)
-            self.semantic_index.add(vectors)
-    
-    def expire_gists(self):
-        """Remove expired gists based on TTL"""
-        now = time.time()
-        
-        self.episodic = [
-            g for g in self.episodic 
-            if g.ttl is None or (now - g.created_at) < g.ttl
-        ]
-        
-        if self.use_faiss:
-            self._rebuild_indices()
+        with self._lock:
+            if len(store) == 0:
+                return []
+            
+            _, rows = store.search(query, k)
+            
+            # Access stats don't bump store.version: reads alone must not make
+            # checkpoints recopy the tier (stats are saved with the next write)
+            store.access_count[rows] += 1
+            store.last_access[rows] = time.time()
+            if store is self.episodic:
+                for row in rows[store.access_count[rows] >= self.promote_min_access]:
+                    self._hot[store.ids[row]] = None
+            
+            return store.get_many(rows.tolist())
+    
+    def expire_gists(self, now: Optional[float] = None) -> int:
+        """
+        Remove expired gists based on TTL
+        
+        Pops only deadlines that are due; entries for gists that were already
+        promoted or removed are discarded as they surface.
+        
+        Returns:
+            Number of gists expired
+        """
+        now = time.time() if now is None else now
+        heap = self._expiry_heap
+        expired = 0
+        
+        with self._lock:
+            while heap and heap[0][0] <= now:
+                _, gist_id = heapq.heappop(heap)
+                row = self.episodic.row_of(gist_id)
+                if row is not None and self.episodic.tombstone(row):
+                    self._hot.pop(gist_id, None)
+                    expired += 1
+            
+            if expired:
+                self.expired_count += expired
+                self.episodic.maybe_compact()
+        
+        return expired
     
     def get_stats(self) -> Dict:
         """Get memory statistics"""
-        return {
-            "episodic_count": len(self.episodic),
-            "semantic_count": len(self.semantic),
-            "total_gists": len(self.episodic) + len(self.semantic),
-            "faiss_enabled": self.use_faiss,
-        }
+        with self._lock:
+            return {
+                "episodic_count": len(self.episodic),
+                "semantic_count": len(self.semantic),
+                "total_gists": len(self.episodic) + len(self.semantic),
+                "faiss_enabled": self.use_faiss,
+                "compression": self.compression,
+                "semantic_compression": self.semantic_compression,
+                "episodic_tombstones": self.episodic.num_dead,
+                "expired_count": self.expired_count,
+                "pending_expiries": len(self._expiry_heap),
+                "promotion_candidates": len(self._hot),
+                "promoted_count": self.promoted_count,
+                "inserted_count": self.insert_count,
+                "merged_count": self.merge_count,
+                "dedup_ratio": self.merge_count / max(1, self.merge_count + self.insert_count),
+                "episodic_bytes": self.episodic.nbytes(),
+                "semantic_bytes": self.semantic.nbytes(),
+            }
     
     def export(self) -> Dict:
         """Export memory for persistence"""
-        return {
-            "episodic": [
-                {
-                    "id": g.id,
-                    "text": g.text,
-                    "slot_id": g.slot_id,
-                    "created_at": g.created_at,
-                    "confidence": g.confidence,
-                }
-                for g in self.episodic
-            ],
-            "semantic": [
-                {
-                    "id": g.id,
-                    "text": g.text,
-                    "slot_id": g.slot_id,
-                    "created_at": g.created_at,
-                    "confidence": g.confidence,
-                }
-                for g in self.semantic
-            ],
-        }
+        with self._lock:
+            return {
+                "episodic": self.episodic.export(),
+                "semantic": self.semantic.export(),
+            }
+    
+    def state(self, skip: Optional[Dict[str, int]] = None) -> Dict:
+        """
+        Consistent copy of both tiers and the hierarchy's counters
+        
+        Args:
+            skip: Tier name -> store version; a tier still at that version
+                is left out (None), so an unchanged tier is not copied
+        
+        Returns:
+            {"meta": counters and expiry deadlines,
+             "versions": tier -> store version,
+             "tiers": tier -> GistStore.state() or None}
+        """
+        skip = skip or {}
+        
+        with self._lock:
+            tiers = {"episodic": self.episodic, "semantic": self.semantic}
+            return {
+                "meta": {
+                    "next_gist_id": self._next_gist_id,
+                    "insert_count": self.insert_count,
+                    "merge_count": self.merge_count,
+                    "promoted_count": self.promoted_count,
+                    "expired_count": self.expired_count,
+                    "hot": list(self._hot),
+                    "expiry_heap": [list(entry) for entry in self._expiry_heap],
+                },
+                "versions": {name: store.version for name, store in tiers.items()},
+                "tiers": {
+                    name: None if skip.get(name) == store.version else store.state()
+                    for name, store in tiers.items()
+                },
+            }
+    
+    def load_state(self, meta: Dict, tiers: Dict[str, Tuple[Dict[str, np.ndarray], Dict]]):
+        """Restore counters and both tiers from a state() (all tiers present)"""
+        with self._lock:
+            self.episodic.load_state(*tiers["episodic"])
+            self.semantic.load_state(*tiers["semantic"])
+            
+            self._next_gist_id = meta["next_gist_id"]
+            self.insert_count = meta["insert_count"]
+            self.merge_count = meta["merge_count"]
+            self.promoted_count = meta["promoted_count"]
+            self.expired_count = meta["expired_count"]
+            self._hot = dict.fromkeys(meta["hot"])
+            self._expiry_heap = [(deadline, gist_id) for deadline, gist_id in meta["expiry_heap"]]
+            heapq.heapify(self._expiry_heap)
@@ -0,0 +1,480 @@
+"""
+Avadhan Metrics - Columnar per-step metrics with bounded memory
+Recent steps are kept at full resolution, older ones as min/max/mean buckets
+"""
+import threading
+import uuid
+import warnings
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+
+BUCKET_STATS = ("min", "max", "mean")
+DOWNSAMPLE_METHODS = ("lttb", "minmax")
+
+
+def lttb(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indices of `points` samples of y [n, F]
+
+    The first and last samples are kept; between them each bucket keeps
+    the sample forming the largest triangle with the previously kept one
+    and the next bucket's average. Every column is selected independently
+    (in one pass), so the result is [points, F].
+    """
+    n, num_fields = y.shape
+    if n <= points or points < 3:
+        return np.repeat(np.arange(n)[:, None], num_fields, axis=1)
+
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    x = x.astype(np.float64)
+    columns = np.arange(num_fields)
+    selected = np.empty((points, num_fields), dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = np.zeros(num_fields, dtype=np.int64)
+    with warnings.catch_warnings():
+        # All-NaN buckets (fields a row didn't report) are skipped over
+        warnings.simplefilter("ignore", RuntimeWarning)
+        for i in range(points - 2):
+            start, end = edges[i], edges[i + 1]
+            next_end = edges[i + 2] if i + 2 < len(edges) else n
+            avg_x = x[end:next_end].mean()
+            avg_y = np.nanmean(y[end:next_end], axis=0)
+
+            px, py = x[previous], y[previous, columns]
+            area = np.abs(
+                (px - avg_x) * (y[start:end] - py)
+                - (px - x[start:end, None]) * (avg_y - py)
+            )
+            previous = start + np.argmax(np.nan_to_num(area, nan=-1.0), axis=0)
+            selected[i + 1] = previous
+    return selected
+
+
+def minmax(lo: np.ndarray, hi: np.ndarray, points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Min/max downsampling of one series: per bucket of rows, the indices of
+    the lowest `lo` and highest `hi` value, in row order (≈ points indices)
+
+    Returns:
+        (indices, use_hi): use_hi marks indices whose value comes from hi
+    """
+    n = len(lo)
+    if n <= points:
+        return np.arange(n), np.zeros(n, dtype=bool)
+
+    count = max(1, points // 2)
+    starts = np.linspace(0, n, count + 1).astype(np.int64)[:-1]
+    bucket = np.repeat(np.arange(count), np.diff(np.append(starts, n)))
+
+    def first_match(values: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        matches = np.flatnonzero(values == targets[bucket])
+        found, first = np.unique(bucket[matches], return_index=True)
+        index = starts.copy()  # all-NaN buckets fall back to their first row
+        index[found] = matches[first]
+        return index
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        low = first_match(lo, np.fmin.reduceat(lo, starts))
+        high = first_match(hi, np.fmax.reduceat(hi, starts))
+
+    indices = np.stack([np.minimum(low, high), np.maximum(low, high)], axis=1)
+    use_hi = np.stack([high < low, high >= low], axis=1)
+    keep = np.ones_like(indices, dtype=bool)
+    keep[:, 1] = indices[:, 1] != indices[:, 0]
+    return indices[keep], use_hi[keep]
+
+
+def downsample_series(
+    epochs: np.ndarray,
+    names: List[str],
+    mean: np.ndarray,
+    points: int,
+    method: str = "lttb",
+    lo: Optional[np.ndarray] = None,
+    hi: Optional[np.ndarray] = None,
+) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    About `points` samples of each field of mean [n, F] (column j = names[j])
+
+    lo and hi [n, F] are the per-sample bounds used by minmax (mean when
+    samples are single steps).
+
+    Returns:
+        Field -> {"epoch": [k], "value": [k]}
+    """
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"Unknown downsampling method: {method}")
+
+    series = {}
+    if method == "lttb":
+        selected = lttb(epochs, mean, points)
+        for j, name in enumerate(names):
+            series[name] = {"epoch": epochs[selected[:, j]], "value": mean[selected[:, j], j]}
+    else:
+        lo = mean if lo is None else lo
+        hi = mean if hi is None else hi
+        for j, name in enumerate(names):
+            indices, use_hi = minmax(lo[:, j], hi[:, j], points)
+            series[name] = {
+                "epoch": epochs[indices],
+                "value": np.where(use_hi, hi[indices, j], lo[indices, j]),
+            }
+    return series
+
+
+class MetricsStore:
+    """
+    Per-step training metrics stored as one NumPy column per field
+
+    Raw rows are appended to preallocated columns that grow by doubling up to
+    2 * retention rows. When full, the oldest `retention` rows are folded
+    into buckets of bucket_size steps (min/max/mean per field) and the
+    newer half is moved to the front. Appends are amortized O(1), and at
+    least the last `retention` steps stay at full resolution.
+
+    Buckets are merged pairwise (doubling their width) once there are more
+    than max_buckets, so memory is bounded however long a run is.
+
+    Rows must be appended in increasing `epoch` order, which lets range
+    queries binary-search the epoch column. query() and buckets() return
+    views into the columns, not copies. They are only valid until the next
+    append, so readers on other threads should use rows(), which copies just
+    the selected range under the lock.
+    """
+
+    def __init__(
+        self,
+        fields: Iterable[str],
+        retention: int = 10000,
+        bucket_size: int = 10,
+        max_buckets: int = 10000,
+        initial_capacity: int = 1024,
+    ):
+        self.fields = tuple(fields)
+        if "epoch" not in self.fields:
+            raise ValueError("Metrics fields must include 'epoch'")
+
+        self.bucket_size = max(1, bucket_size)
+        # Folded blocks must be whole buckets
+        self.retention = -(-max(1, retention) // self.bucket_size) * self.bucket_size
+        self.max_buckets = max(2, max_buckets)
+
+        self._lock = threading.Lock()
+
+        # Raw tier
+        self.size = 0
+        self._capacity = min(max(1, initial_capacity), 2 * self.retention)
+        self._columns = {name: self._column(name, self._capacity) for name in self.fields}
+
+        # Downsampled tier
+        self.num_buckets = 0
+        self._bucket_capacity = 64
+        self._bucket_epochs = np.zeros((self._bucket_capacity, 2), dtype=np.int64)  # first, last
+        self._bucket_counts = np.zeros(self._bucket_capacity, dtype=np.int64)
+        self._bucket_stats = {
+            name: np.zeros((self._bucket_capacity, len(BUCKET_STATS)), dtype=np.float64)
+            for name in self.fields if name != "epoch"
+        }
+
+        self.total_steps = 0
+        self._latest: Optional[Dict] = None
+        # Changes whenever history is replaced, so (token, total_steps) identifies a state
+        self.token = uuid.uuid4().hex[:12]
+
+    def _column(self, name: str, capacity: int) -> np.ndarray:
+        return np.zeros(capacity, dtype=np.int64 if name == "epoch" else np.float64)
+
+    def __len__(self) -> int:
+        """Steps recorded, including downsampled ones"""
+        return self.total_steps
+
+    def latest(self) -> Optional[Dict]:
+        """The last appended row, as given (extra keys included)"""
+        return self._latest
+
+    # ============== Writes ==============
+
+    def append(self, row: Mapping[str, float]):
+        """Append one step; fields missing from row are stored as NaN"""
+        with self._lock:
+            if self.size == self._capacity:
+                if self._capacity < 2 * self.retention:
+                    self._grow(min(2 * self._capacity, 2 * self.retention))
+                else:
+                    self._fold()
+
+            i = self.size
+            for name, column in self._columns.items():
+                column[i] = row.get(name, np.nan) if name != "epoch" else row["epoch"]
+            self.size = i + 1
+            self.total_steps += 1
+            self._latest = dict(row)
+
+    def _grow(self, capacity: int):
+        for name, column in self._columns.items():
+            grown = self._column(name, capacity)
+            grown[:self.size] = column[:self.size]
+            self._columns[name] = grown
+        self._capacity = capacity
+
+    def _fold(self):
+        """Downsample the oldest `retention` raw rows into buckets"""
+        n = self.retention
+        k = n // self.bucket_size
+        self._reserve_buckets(self.num_buckets + k)
+
+        start, end = self.num_buckets, self.num_buckets + k
+        epochs = self._columns["epoch"][:n].reshape(k, self.bucket_size)
+        self._bucket_epochs[start:end, 0] = epochs[:, 0]
+        self._bucket_epochs[start:end, 1] = epochs[:, -1]
+        self._bucket_counts[start:end] = self.bucket_size
+        for name, stats in self._bucket_stats.items():
+            block = self._columns[name][:n].reshape(k, self.bucket_size)
+            stats[start:end, 0] = block.min(axis=1)
+            stats[start:end, 1] = block.max(axis=1)
+            stats[start:end, 2] = block.mean(axis=1)
+        self.num_buckets = end
+
+        for column in self._columns.values():
+            column[:self.size - n] = column[n:self.size]
+        self.size -= n
+
+        while self.num_buckets > self.max_buckets:
+            self._merge_buckets()
+
+    def _reserve_buckets(self, count: int):
+        if count <= self._bucket_capacity:
+            return
+
+        capacity = self._bucket_capacity
+        while capacity < count:
+            capacity *= 2
+
+        def grown(array: np.ndarray) -> np.ndarray:
+            new = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            new[:self.num_buckets] = array[:self.num_buckets]
+            return new
+
+        self._bucket_epochs = grown(self._bucket_epochs)
+        self._bucket_counts = grown(self._bucket_counts)
+        self._bucket_stats = {name: grown(stats) for name, stats in self._bucket_stats.items()}
+        self._bucket_capacity = capacity
+
+    def _merge_buckets(self):
+        """Merge adjacent bucket pairs (an odd last bucket is kept as is)"""
+        pairs = self.num_buckets // 2
+        n = 2 * pairs
+
+        counts = self._bucket_counts[:n].reshape(pairs, 2)
+        weights = counts / counts.sum(axis=1, keepdims=True)
+        epochs = self._bucket_epochs[:n].reshape(pairs, 2, 2)
+        self._bucket_epochs[:pairs, 0] = epochs[:, 0, 0]
+        self._bucket_epochs[:pairs, 1] = epochs[:, 1, 1]
+        for stats in self._bucket_stats.values():
+            block = stats[:n].reshape(pairs, 2, len(BUCKET_STATS))
+            merged = np.stack([
+                block[:, :, 0].min(axis=1),
+                block[:, :, 1].max(axis=1),
+                (block[:, :, 2] * weights).sum(axis=1),
+            ], axis=1)
+            stats[:pairs] = merged
+            if n < self.num_buckets:
+                stats[pairs] = stats[n]
+        self._bucket_counts[:pairs] = counts.sum(axis=1)
+
+        if n < self.num_buckets:
+            self._bucket_epochs[pairs] = self._bucket_epochs[n]
+            self._bucket_counts[pairs] = self._bucket_counts[n]
+        self.num_buckets -= pairs
+
+    # ============== Reads ==============
+
+    def _raw_range(self, since_epoch: Optional[int]) -> int:
+        if since_epoch is None:
+            return 0
+        return int(np.searchsorted(self._columns["epoch"][:self.size], since_epoch, side="left"))
+
+    def query(
+        self,
+        since_epoch: Optional[int] = None,
+        stride: int = 1,
+        fields: Optional[Iterable[str]] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Full-resolution rows with epoch >= since_epoch, every stride-th row
+
+        Returns:
+            Field -> view into the raw columns
+        """
+        start = self._raw_range(since_epoch)
+        stride = max(1, stride)
+        return {
+            name: self._columns[name][start:self.size:stride]
+            for name in (fields or self.fields)
+        }
+
+    def buckets(
+        self,
+        since_epoch: Optional[int] = None,
+        fields: Optional[Iterable[str]] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Downsampled buckets ending at or after since_epoch
+
+        Returns:
+            "epoch_range" [n, 2] (first, last), "count" [n], and per field
+            [n, 3] (min, max, mean); all views
+        """
+        start = 0
+        if since_epoch is not None:
+            start = int(np.searchsorted(
+                self._bucket_epochs[:self.num_buckets, 1], since_epoch, side="left"
+            ))
+        end = self.num_buckets
+
+        result = {
+            "epoch_range": self._bucket_epochs[start:end],
+            "count": self._bucket_counts[start:end],
+        }
+        for name in (fields or self.fields):
+            if name != "epoch":
+                result[name] = self._bucket_stats[name][start:end]
+        return result
+
+    def rows(
+        self,
+        since_epoch: Optional[int] = None,
+        stride: int = 1,
+        limit: Optional[int] = None,
+        fields: Optional[Iterable[str]] = None,
+    ) -> List[Dict]:
+        """
+        Selected full-resolution rows as dicts (the last `limit` of them)
+        Only the selected rows are copied.
+        """
+        with self._lock:
+            columns = self.query(since_epoch, stride, fields)
+            if limit is not None:
+                columns = {name: column[max(0, len(column) - limit):] for name, column in columns.items()}
+            lists = {name: column.tolist() for name, column in columns.items()}
+
+        names = list(lists)
+        return [dict(zip(names, values)) for values in zip(*lists.values())]
+
+    def bucket_rows(
+        self,
+        since_epoch: Optional[int] = None,
+        fields: Optional[Iterable[str]] = None,
+    ) -> List[Dict]:
+        """Downsampled buckets as dicts: {epoch_start, epoch_end, count, field: {min, max, mean}}"""
+        with self._lock:
+            buckets = self.buckets(since_epoch, fields)
+            epochs = buckets.pop("epoch_range").tolist()
+            counts = buckets.pop("count").tolist()
+            stats = {name: array.tolist() for name, array in buckets.items()}
+
+        rows = []
+        for i, ((first, last), count) in enumerate(zip(epochs, counts)):
+            row = {"epoch_start": first, "epoch_end": last, "count": count}
+            for name, values in stats.items():
+                row[name] = dict(zip(BUCKET_STATS, values[i]))
+            rows.append(row)
+        return rows
+
+    def downsample(
+        self,
+        points: int,
+        since_epoch: Optional[int] = None,
+        fields: Optional[Iterable[str]] = None,
+        method: str = "lttb",
+    ) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        About `points` samples per field from epoch >= since_epoch
+
+        Downsampled buckets count as one sample each (at their last epoch;
+        mean for lttb, min and max for minmax), followed by the raw rows.
+        Series that already fit are returned whole.
+
+        Returns:
+            Field -> {"epoch": [k], "value": [k]}
+        """
+        if method not in DOWNSAMPLE_METHODS:
+            raise ValueError(f"Unknown downsampling method: {method}")
+
+        names = [name for name in (fields or self.fields) if name != "epoch"]
+        with self._lock:
+            buckets = self.buckets(since_epoch, names)
+            raw = self.query(since_epoch, 1, names + ["epoch"])
+            epochs = np.concatenate([buckets["epoch_range"][:, 1], raw["epoch"]])
+
+            def column(stat: int) -> np.ndarray:
+                """[samples, fields] copy of a bucket statistic followed by the raw values"""
+                stacked = np.empty((len(epochs), len(names)))
+                for j, name in enumerate(names):
+                    stacked[:, j] = np.concatenate([buckets[name][:, stat], raw[name]])
+                return stacked
+
+            mean = column(2)
+            lo, hi = (column(0), column(1)) if method == "minmax" else (None, None)
+
+        return downsample_series(epochs, names, mean, points, method, lo, hi)
+
+    def nbytes(self) -> int:
+        """Bytes allocated for raw columns and buckets"""
+        return (
+            sum(column.nbytes for column in self._columns.values())
+            + self._bucket_epochs.nbytes
+            + self._bucket_counts.nbytes
+            + sum(stats.nbytes for stats in self._bucket_stats.values())
+        )
+
+    # ============== Checkpointing ==============
+
+    def state(self) -> Tuple[Dict[str, np.ndarray], Dict]:
+        """Copy of both tiers: (arrays, meta)"""
+        with self._lock:
+            arrays = {f"raw.{name}": column[:self.size].copy() for name, column in self._columns.items()}
+            arrays["buckets.epoch_range"] = self._bucket_epochs[:self.num_buckets].copy()
+            arrays["buckets.count"] = self._bucket_counts[:self.num_buckets].copy()
+            for name, stats in self._bucket_stats.items():
+                arrays[f"buckets.{name}"] = stats[:self.num_buckets].copy()
+
+            meta = {
+                "fields": list(self.fields),
+                "total_steps": self.total_steps,
+                "latest": self._latest,
+            }
+            return arrays, meta
+
+    def load_state(self, arrays: Mapping[str, np.ndarray], meta: Dict):
+        """Restore a state(); fields missing from it are filled with NaN"""
+        with self._lock:
+            size = len(arrays["raw.epoch"])
+            capacity = self._capacity
+            while capacity < size:
+                capacity *= 2
+            self._capacity = capacity
+            self._columns = {}
+            for name in self.fields:
+                column = self._column(name, capacity)
+                column[:size] = arrays.get(f"raw.{name}", np.nan)
+                self._columns[name] = column
+            self.size = size
+
+            self.num_buckets = 0
+            count = len(arrays["buckets.count"])
+            self._reserve_buckets(count)
+            self._bucket_epochs[:count] = arrays["buckets.epoch_range"]
+            self._bucket_counts[:count] = arrays["buckets.count"]
+            for name, stats in self._bucket_stats.items():
+                stats[:count] = arrays.get(f"buckets.{name}", np.nan)
+            self.num_buckets = count
+
+            self.total_steps = meta["total_steps"]
+            self._latest = meta["latest"]
+            self.token = uuid.uuid4().hex[:12]
@@ -0,0 +1,149 @@
+"""
+Avadhan Negatives - Memory-bank negatives for the contrastive loss
+MoCo-style FIFO queue of gist vectors plus a chunked InfoNCE loss
+"""
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from torch.utils.checkpoint import checkpoint
+
+
+class NegativeQueue:
+    """
+    Fixed-size FIFO ring buffer of normalized gist vectors
+
+    Evicted slots are enqueued as they are consolidated; while the queue is
+    not yet full it is topped up with gists sampled from the memory tiers
+    (only the sampled rows are decoded). Vectors are stored detached, in
+    `dtype` (float16 halves the footprint of large queues).
+    """
+
+    def __init__(
+        self,
+        size: int,
+        dim: int,
+        device: torch.device = None,
+        dtype: torch.dtype = torch.float32,
+    ):
+        self.size = size
+        self.dim = dim
+        self.device = device or torch.device("cpu")
+
+        self._buffer = torch.zeros(size, dim, device=self.device, dtype=dtype)
+        self._head = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def full(self) -> bool:
+        return self._count >= self.size
+
+    def enqueue(self, vectors: torch.Tensor):
+        """Append vectors, overwriting the oldest once full"""
+        vectors = vectors.detach().reshape(-1, self.dim)
+        if len(vectors) > self.size:
+            vectors = vectors[-self.size:]
+        n = len(vectors)
+        if n == 0:
+            return
+
+        vectors = F.normalize(vectors.float(), dim=1).to(self.device, self._buffer.dtype)
+
+        end = self._head + n
+        if end <= self.size:
+            self._buffer[self._head:end] = vectors
+        else:
+            split = self.size - self._head
+            self._buffer[self._head:] = vectors[:split]
+            self._buffer[:n - split] = vectors[split:]
+
+        self._head = end % self.size
+        self._count = min(self.size, self._count + n)
+
+    def refill(self, memory, n: int, rng: Optional[np.random.Generator] = None) -> int:
+        """
+        Top up from memory with up to n sampled gists (no-op once full, or
+        once the queue holds as many vectors as memory has gists)
+
+        Returns:
+            Number of vectors enqueued
+        """
+        available = len(memory.episodic) + len(memory.semantic)
+        n = min(n, self.size - self._count, available - self._count)
+        if n <= 0:
+            return 0
+
+        vectors = memory.sample_vectors(n, rng)
+        if len(vectors):
+            self.enqueue(torch.from_numpy(vectors))
+        return len(vectors)
+
+    def negatives(self) -> torch.Tensor:
+        """Filled part of the buffer (a view, not a copy)"""
+        return self._buffer[:self._count]
+
+    def state(self) -> Tuple[torch.Tensor, Dict]:
+        """CPU copy of the buffer and the ring position, for checkpoints"""
+        return (
+            self._buffer.detach().to("cpu", copy=True),
+            {"head": self._head, "count": self._count},
+        )
+
+    def load_state(self, buffer: torch.Tensor, meta: Dict):
+        self._buffer.copy_(buffer)
+        self._head = meta["head"]
+        self._count = meta["count"]
+
+
+def _chunk_logsumexp(queries: torch.Tensor, keys: torch.Tensor, temperature: float) -> torch.Tensor:
+    """logsumexp over one chunk of keys: [batch]"""
+    logits = torch.mm(queries, keys.to(queries.dtype).t()) / temperature
+    return torch.logsumexp(logits, dim=1)
+
+
+def chunked_info_nce(
+    queries: torch.Tensor,
+    keys: torch.Tensor,
+    targets: torch.Tensor,
+    negatives: torch.Tensor,
+    temperature: float,
+    chunk_size: int = 8192,
+) -> torch.Tensor:
+    """
+    InfoNCE of queries against keys (positives + in-batch negatives) plus a
+    bank of extra negatives, without materializing [batch, num_negatives]
+
+    The bank is processed in chunks whose logits are recomputed during
+    backward (activation checkpointing), so peak memory is
+    O(batch * chunk_size) however large the bank is.
+
+    Args:
+        queries: [batch, dim] normalized query embeddings
+        keys: [num_keys, dim] normalized keys; targets index into these
+        targets: [batch] positive key per query (-100 = ignore)
+        negatives: [num_negatives, dim] normalized, detached bank
+        temperature: Softmax temperature
+
+    Returns:
+        Mean loss over non-ignored queries
+    """
+    valid = targets >= 0
+    queries, targets = queries[valid], targets[valid]
+
+    key_logits = torch.mm(queries, keys.t()) / temperature
+    positives = key_logits.gather(1, targets.unsqueeze(1)).squeeze(1)
+
+    parts = [torch.logsumexp(key_logits, dim=1)]
+    for start in range(0, len(negatives), chunk_size):
+        chunk = negatives[start:start + chunk_size]
+        if queries.requires_grad:
+            parts.append(checkpoint(_chunk_logsumexp, queries, chunk, temperature, use_reentrant=False))
+        else:
+            parts.append(_chunk_logsumexp(queries, chunk, temperature))
+
+    normalizer = torch.logsumexp(torch.stack(parts, dim=1), dim=1)
+    return (normalizer - positives).mean()
@@ -46,6 +46,53 @@ class Orthogonalizer:
         
         return slots
     
+    def orthogonalize_incremental(
+        self,
+        slots: List[Dict],
+        changed: List[int]
+    ) -> List[Dict]:
+        """
+        Re-orthogonalize only the changed slots against all the others
+        
+        Assumes the unchanged slots are already orthonormal (the state left
+        by a previous orthogonalize call), so each changed slot needs one
+        projection onto their span: O(N·D) per changed slot instead of a
+        full O(N²·D) Gram-Schmidt pass.
+        
+        Args:
+            slots: List of slot dicts with 'vector' key
+            changed: Positions of slots written since the last pass
+        
+        Returns:
+            Slots with the changed vectors orthogonalized
+        """
+        changed = sorted(set(i for i in changed if 0 <= i < len(slots)))
+        if len(slots) < 2 or not changed:
+            return slots
+        
+        changed_set = set(changed)
+        fixed = [slots[i]["vector"] for i in range(len(slots)) if i not in changed_set]
+        basis = torch.stack(fixed) if fixed else None
+        
+        for i in changed:
+            v = F.normalize(slots[i]["vector"], dim=0, eps=self.eps)
+            
+            if basis is not None:
+                # Project out twice: one pass loses orthogonality when v is
+                # nearly parallel to the span
+                for _ in range(2):
+                    coeffs = torch.mv(basis, v)  # [M] = ⟨v, u_j⟩
+                    v = v - torch.mv(basis.t(), coeffs)
+            
+            norm = v.norm()
+            if norm > self.eps:
+                v = v / norm
+            
+            slots[i]["vector"] = v
+            basis = v.unsqueeze(0) if basis is None else torch.cat([basis, v.unsqueeze(0)])
+        
+        return slots
+    
     def _gram_schmidt_batched(self, vectors: torch.Tensor) -> torch.Tensor:
         """
         Batched Gram-Schmidt orthogonalization
@@ -62,16 +109,17 @@ class Orthogonalizer:
         # Normalize input
         vectors = F.normalize(vectors, dim=1, eps=self.eps)
         
-        # Orthogonalize iteratively
-        orth = torch.zeros_like(vectors)
+        # Orthogonalize iteratively (no in-place writes, so autograd can
+        # differentiate through the basis)
+        basis = []
         
         for i in range(n):
-            v = vectors[i].clone()
+            v = vectors[i]
             
             # Subtract projections onto all previous orthogonal vectors
             if i > 0:
                 # Compute all projections at once
-                U = orth[:i]  # [i, D]
+                U = torch.stack(basis)  # [i, D]
                 coeffs = torch.mv(U, v)  # [i] = ⟨v, u_j⟩
                 projection = torch.sum(coeffs.unsqueeze(1) * U, dim=0)  # [D]
                 v = v - projection
@@ -81,9 +129,9 @@ class Orthogonalizer:
             if norm > self.eps:
                 v = v / norm
             
-            orth[i] = v
+            basis.append(v)
         
-        return orth
+        return torch.stack(basis)
     
     def compute_matrix(self, slots: List[Dict]) -> torch.Tensor:
         """
@@ -159,6 +207,74 @@ class Orthogonalizer:
         
         return weight * loss
     
+    def _group_similarities(self, groups: List[List[Dict]]):
+        """
+        Within-group similarity matrices, padded to the largest group
+        
+        Returns:
+            ([G, M, M] similarities, [G, M, M] mask of real off-diagonal pairs)
+        """
+        groups = [group for group in groups if group]
+        size = max(len(group) for group in groups)
+        dim = groups[0][0]["vector"].shape[-1]
+        
+        vectors = torch.zeros(len(groups), size, dim, device=self.device)
+        valid = torch.zeros(len(groups), size, dtype=torch.bool, device=self.device)
+        for g, group in enumerate(groups):
+            vectors[g, :len(group)] = torch.stack([s["vector"] for s in group])
+            valid[g, :len(group)] = True
+        vectors = F.normalize(vectors, dim=2, eps=self.eps)
+        
+        sim = torch.bmm(vectors, vectors.transpose(1, 2))
+        mask = valid[:, :, None] & valid[:, None, :]
+        mask &= ~torch.eye(size, dtype=torch.bool, device=self.device)
+        return sim, mask
+    
+    def compute_group_interference_rate(self, groups: List[List[Dict]]) -> float:
+        """
+        Interference rate over pairs within the same group
+        
+        Groups are only orthogonalized internally, so pairs across groups
+        are not counted; cost is O(N²/G) instead of O(N²).
+        """
+        if sum(len(group) for group in groups) < 2:
+            return 0.0
+        
+        sim, mask = self._group_similarities(groups)
+        if not mask.any():
+            return 0.0
+        return sim[mask].abs().mean().item()
+    
+    def compute_group_loss(
+        self,
+        groups: List[List[Dict]],
+        weight: float = 0.1
+    ) -> torch.Tensor:
+        """
+        Hierarchical orthogonality loss for grouped slots
+        L_orth = λ (Σ_g Σ_{i≠j ∈ g} |⟨S_i, S_j⟩|² + Σ_{g≠h} |⟨C_g, C_h⟩|²)
+        
+        Slots are decorrelated within their group, and groups are kept
+        apart through their (normalized) centroids C_g.
+        """
+        groups = [group for group in groups if group]
+        if sum(len(group) for group in groups) < 2:
+            return torch.tensor(0.0, device=self.device)
+        
+        sim, mask = self._group_similarities(groups)
+        loss = (sim[mask] ** 2).sum()
+        
+        if len(groups) > 1:
+            centroids = torch.stack([
+                torch.stack([s["vector"] for s in group]).mean(dim=0) for group in groups
+            ])
+            centroids = F.normalize(centroids, dim=1, eps=self.eps)
+            between = torch.mm(centroids, centroids.t())
+            off_diagonal = ~torch.eye(len(groups), dtype=torch.bool, device=self.device)
+            loss = loss + (between[off_diagonal] ** 2).sum()
+        
+        return weight * loss
+    
     def apply_repulsion(
         self, 
         slots: List[Dict], 
@@ -0,0 +1,200 @@
+"""
+Avadhan Profiling - Per-stage timing and opt-in trace capture
+Stage timings feed rolling percentile windows; traces are dumped to disk
+"""
+import cProfile
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+import numpy as np
+import torch
+
+
+PERCENTILES = (50, 90, 99)
+
+TRACE_MODES = ("torch", "cprofile")
+
+
+class StageTimer:
+    """
+    Rolling per-stage wall-clock timings
+
+    Each stage keeps the last `window` durations in a fixed-size ring
+    buffer, so recording is one perf_counter pair and one array write.
+    Percentiles are only computed when summary() is called.
+
+    On CUDA, pass synchronize=torch.cuda.synchronize so a stage's time
+    covers its kernels rather than just their launch.
+    """
+
+    def __init__(
+        self,
+        window: int = 1024,
+        synchronize: Optional[Callable[[], None]] = None,
+    ):
+        self.window = max(1, window)
+        self.synchronize = synchronize
+        self.enabled = True
+
+        self._lock = threading.Lock()
+        self._samples: Dict[str, np.ndarray] = {}
+        self._counts: Dict[str, int] = {}
+        self._totals: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as one sample of `name`"""
+        if not self.enabled:
+            yield
+            return
+
+        if self.synchronize is not None:
+            self.synchronize()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.synchronize is not None:
+                self.synchronize()
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float):
+        """Add one duration sample for a stage"""
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = np.zeros(self.window)
+                self._counts[name] = 0
+                self._totals[name] = 0.0
+
+            count = self._counts[name]
+            samples[count % self.window] = seconds
+            self._counts[name] = count + 1
+            self._totals[name] += seconds
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Percentiles (ms) over each stage's window
+
+        Returns:
+            {stage: {count, total_s, mean_ms, p50_ms, p90_ms, p99_ms, max_ms, last_ms}}
+        """
+        with self._lock:
+            snapshot = {
+                name: (samples[:min(self._counts[name], self.window)].copy(),
+                       self._counts[name], self._totals[name],
+                       samples[(self._counts[name] - 1) % self.window])
+                for name, samples in self._samples.items()
+            }
+
+        stats = {}
+        for name, (window, count, total, last) in snapshot.items():
+            values = window * 1000.0
+            stage_stats = {
+                "count": count,
+                "total_s": total,
+                "mean_ms": float(values.mean()),
+                "max_ms": float(values.max()),
+                "last_ms": float(last * 1000.0),
+            }
+            for q, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+                stage_stats[f"p{q}_ms"] = float(value)
+            stats[name] = stage_stats
+
+        return stats
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+            self._totals.clear()
+
+
+class TraceCapture:
+    """
+    Captures a torch.profiler or cProfile trace over a fixed number of steps
+
+    Must be started and stepped on the thread that runs the steps (cProfile
+    only sees its own thread). Output:
+    - torch: Chrome trace JSON (open in chrome://tracing or Perfetto)
+    - cprofile: pstats dump (python -m pstats / snakeviz)
+    """
+
+    def __init__(self, steps: int, output_dir: str, mode: str = "torch"):
+        if mode not in TRACE_MODES:
+            raise ValueError(f"Unknown trace mode: {mode}")
+
+        self.steps = max(1, steps)
+        self.mode = mode
+        self.output_dir = output_dir
+        self.path: Optional[str] = None
+        self.started = False
+        self.done = False
+
+        self._remaining = self.steps
+        self._profiler = None
+
+    @property
+    def active(self) -> bool:
+        return self.started and not self.done
+
+    def start(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.started = True
+
+        if self.mode == "torch":
+            activities = [torch.profiler.ProfilerActivity.CPU]
+            if torch.cuda.is_available():
+                activities.append(torch.profiler.ProfilerActivity.CUDA)
+            self._profiler = torch.profiler.profile(
+                activities=activities,
+                record_shapes=True,
+                profile_memory=True,
+            )
+            self._profiler.__enter__()
+        else:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def step(self) -> bool:
+        """
+        Mark one step finished; writes the trace after the last one
+
+        Returns:
+            True once the capture is complete
+        """
+        self._remaining -= 1
+        if self._remaining <= 0:
+            self.stop()
+        return self.done
+
+    def stop(self):
+        """Stop early (or on schedule) and write whatever was captured"""
+        if self.done or self._profiler is None:
+            return
+
+        now = time.time()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f"-{int(now * 1000) % 1000:03d}"
+        if self.mode == "torch":
+            self._profiler.__exit__(None, None, None)
+            self.path = os.path.join(self.output_dir, f"trace-{stamp}.json")
+            self._profiler.export_chrome_trace(self.path)
+        else:
+            self._profiler.disable()
+            self.path = os.path.join(self.output_dir, f"trace-{stamp}.prof")
+            self._profiler.dump_stats(self.path)
+
+        self._profiler = None
+        self.done = True
+
+    def get_status(self) -> Dict:
+        return {
+            "mode": self.mode,
+            "steps": self.steps,
+            "remaining": max(0, self._remaining),
+            "done": self.done,
+            "path": self.path,
+        }
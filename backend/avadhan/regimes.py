@@ -0,0 +1,70 @@
+"""
+Avadhan Regimes - Performance profiles for Ashta / Shata / Sahasra
+Each regime maps to engine settings that scale with its slot count
+"""
+from typing import Any, Dict, Optional
+
+
+# Engine kwargs chosen by regime; any of them can be overridden per session
+REGIME_PROFILES: Dict[str, Dict[str, Any]] = {
+    # 8 slots: exact Gram-Schmidt and flat (uncompressed) memory search
+    "ashta": {
+        "num_slots": 8,
+        "slot_groups": 0,
+        "orthogonalization": "exact",
+        "lazy_attention": False,
+        "memory_compression": "none",
+        "memory_rerank": 0,
+    },
+    # 100 slots: only re-orthogonalize slots touched by an ingest
+    "shata": {
+        "num_slots": 100,
+        "slot_groups": 0,
+        "orthogonalization": "incremental",
+        "lazy_attention": False,
+        "memory_compression": "int8",
+        "memory_rerank": 0,
+    },
+    # 1000 slots: ~sqrt(N) slot groups, incremental orthogonalization,
+    # attention weights refreshed only when read, memory searched by a
+    # compressed (PQ) linear scan with exact re-ranking of candidates
+    "sahasra": {
+        "num_slots": 1000,
+        "slot_groups": 32,
+        "orthogonalization": "incremental",
+        "lazy_attention": True,
+        "memory_compression": "pq",
+        "memory_rerank": 64,
+    },
+}
+
+PROFILE_KEYS = tuple(REGIME_PROFILES["ashta"])
+
+
+def resolve_regime(
+    regime: str,
+    overrides: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Engine settings for a regime with explicit overrides applied
+
+    Args:
+        regime: ashta, shata or sahasra
+        overrides: Profile keys to replace (None values are ignored)
+
+    Returns:
+        Complete profile (a new dict)
+    """
+    if regime not in REGIME_PROFILES:
+        raise ValueError(
+            f"Unknown regime: {regime} (expected one of {', '.join(REGIME_PROFILES)})"
+        )
+
+    profile = dict(REGIME_PROFILES[regime])
+    for key, value in (overrides or {}).items():
+        if key not in profile:
+            raise ValueError(f"Unknown regime setting: {key}")
+        if value is not None:
+            profile[key] = value
+
+    return profile
@@ -2,10 +2,12 @@
 Avadhan Slot Manager - PyTorch Implementation
 Manages the Ashta (8-slot) working memory system with GPU tensors
 """
+import numpy as np
 import torch
 import torch.nn.functional as F
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 from dataclasses import dataclass
+import math
 import time
 
 
@@ -13,6 +15,18 @@ class SlotManager:
     """
     Manages parallel attention slots with GPU tensors
     Implements the Ashta (8-slot), Shata (100-slot), Sahasra (1000-slot) regimes
+    
+    With num_groups > 0 slots are clustered into groups by centroid. A new
+    slot is routed to the nearest group, evictions and attention re-weighting
+    stay within that group, and the engine re-orthogonalizes only the group,
+    so a write costs O(N/G) instead of O(N). Every rebalance_every writes
+    the groups are re-clustered and weights are refreshed globally.
+    
+    With routing_threshold set, an input whose thread id has no slot is
+    matched by content: the most similar live slot (cosine, via a dense
+    index over the slot matrix updated on every write) is updated instead
+    of creating a new slot when the similarity reaches the threshold. The
+    thread id is then mapped to that slot, so later inputs skip the search.
     """
     
     def __init__(
@@ -20,18 +34,81 @@ class SlotManager:
         num_slots: int = 8,
         dim: int = 384,
         device: torch.device = None,
+        lazy_attention: bool = False,
+        num_groups: int = 0,
+        rebalance_every: int = 1000,
+        routing_threshold: Optional[float] = None,
     ):
         self.num_slots = num_slots
         self.dim = dim
         self.device = device or torch.device("cpu")
         
+        # Lazy mode defers the Boltzmann refresh until weights or priorities
+        # are read (eviction, export), instead of after every ingest
+        self.lazy_attention = lazy_attention
+        self._weights_dirty = False
+        
+        # Slot groups (0 = flat); a group may grow to twice its fair share
+        self.num_groups = max(0, min(num_groups, num_slots))
+        self.rebalance_every = max(1, rebalance_every)
+        self.group_capacity = 2 * math.ceil(num_slots / self.num_groups) if self.num_groups else 0
+        self.groups: List[List[Dict]] = [[] for _ in range(self.num_groups)]
+        self._centroids = torch.zeros(self.num_groups, dim, device=self.device)
+        self._dirty_groups: Set[int] = set()
+        self._writes_since_rebalance = 0
+        # Group re-weighting changes priorities without rebuilding the tensor
+        self._weights_stale = False
+        
+        # Content routing index: one row per live slot (keyed by slot id),
+        # rows reused on eviction
+        self.routing_threshold = routing_threshold
+        self._index = torch.zeros(num_slots, dim, device=self.device)
+        self._index_live = torch.zeros(num_slots, dtype=torch.bool, device=self.device)
+        self._index_rows: Dict[str, int] = {}
+        self._index_slots: List[Optional[Dict]] = [None] * num_slots
+        self._free_rows = list(range(num_slots - 1, -1, -1))
+        
         # Slot storage
         self.slots: List[Dict] = []
         self.next_index = 0
         
+        # Thread ID -> slot dict
+        self._thread_slots: Dict[str, Dict] = {}
+        # Slot id -> thread ids routed to it by content (dropped on eviction)
+        self._routed_threads: Dict[str, Set[str]] = {}
+        
         # Attention weights (α_i) - Boltzmann distributed
-        self.attention_weights = torch.ones(num_slots, device=self.device) / num_slots
+        self._attention_weights = torch.ones(num_slots, device=self.device) / num_slots
+    
+    @property
+    def attention_weights(self) -> torch.Tensor:
+        self.refresh_attention_weights()
+        if self._weights_stale:
+            self._weights_stale = False
+            if self.slots:
+                self._attention_weights = torch.tensor(
+                    [slot["priority"] for slot in self.slots], device=self.device
+                )
+        return self._attention_weights
+    
+    @attention_weights.setter
+    def attention_weights(self, weights: torch.Tensor):
+        self._attention_weights = weights
+        self._weights_dirty = False
+        self._weights_stale = False
+        self._dirty_groups.clear()
+    
+    def refresh_attention_weights(self):
+        """Apply deferred attention-weight updates (lazy mode)"""
+        if self._weights_dirty:
+            self._weights_dirty = False
+            self._update_attention_weights()
         
+        if self._dirty_groups:
+            groups, self._dirty_groups = self._dirty_groups, set()
+            for group in groups:
+                self._reweight_group(group)
+    
     def ingest(
         self, 
         vector: torch.Tensor, 
@@ -49,6 +126,57 @@ class SlotManager:
         Returns:
             Result dict with slot info and any evicted slot
         """
+        result = self._ingest_one(vector, thread_id, metadata)
+        
+        # Update attention weights
+        self._after_write([result])
+        
+        return result
+    
+    def ingest_batch(
+        self, 
+        vectors: torch.Tensor, 
+        thread_ids: List[str],
+        metadata: Optional[List[Dict]] = None,
+    ) -> List[Dict]:
+        """
+        Ingest a batch of vectors with a single attention-weight update
+        
+        Items are applied in order, so repeated thread ids in one batch
+        fold into the same slot.
+        
+        Args:
+            vectors: Encoded input vectors [batch, dim]
+            thread_ids: Thread identifier per vector
+            metadata: Optional metadata per vector
+        
+        Returns:
+            Result dict per input
+        """
+        if not isinstance(vectors, torch.Tensor):
+            vectors = torch.tensor(vectors, device=self.device, dtype=torch.float32)
+        vectors = vectors.to(self.device)
+        
+        results = [
+            self._ingest_one(
+                vectors[i], 
+                thread_id, 
+                metadata[i] if metadata else None,
+            )
+            for i, thread_id in enumerate(thread_ids)
+        ]
+        
+        self._after_write(results)
+        
+        return results
+    
+    def _ingest_one(
+        self, 
+        vector: torch.Tensor, 
+        thread_id: str,
+        metadata: Optional[Dict] = None,
+    ) -> Dict:
+        """Ingest one vector without refreshing attention weights"""
         result = {"evicted": None, "updated": False, "created": False}
         
         # Ensure vector is on correct device
@@ -57,28 +185,49 @@ class SlotManager:
         vector = vector.to(self.device)
         
         # Check if slot for this thread exists
-        existing_idx = self._find_slot(thread_id)
+        slot = self._thread_slots.get(thread_id)
         
-        if existing_idx is not None:
-            # Update existing slot
-            slot = self.slots[existing_idx]
-            
+        # Otherwise fall back to the most similar slot, if close enough
+        if slot is None and self.routing_threshold is not None:
+            slot, similarity = self._route_by_content(vector)
+            if slot is not None:
+                result["routed"] = True
+                result["similarity"] = similarity
+                # Later inputs of this thread go straight to the same slot
+                self._thread_slots[thread_id] = slot
+                self._routed_threads.setdefault(slot["id"], set()).add(thread_id)
+        
+        if slot is not None:
             # Exponential moving average update
             alpha = 0.7
             slot["vector"] = alpha * slot["vector"] + (1 - alpha) * vector
             slot["vector"] = F.normalize(slot["vector"], dim=0)
             slot["last_active"] = time.time()
             slot["update_count"] += 1
+            self._index_write(slot)
             
             result["updated"] = True
             result["slot_id"] = slot["id"]
             
+            if self.num_groups:
+                result["group"] = slot["group"]
+                self._update_centroid(slot["group"])
+            
         else:
+            group = self._route(vector) if self.num_groups else None
+            
             # Need to create new slot
             if len(self.slots) >= self.num_slots:
-                # Evict lowest priority slot
-                evict_idx = self._select_eviction_target()
-                result["evicted"] = self.slots.pop(evict_idx)
+                # Evict lowest priority slot (within the target group)
+                evict_idx = self._select_eviction_target(group)
+                evicted = self.slots.pop(evict_idx)
+                self._thread_slots.pop(evicted["thread_id"], None)
+                for routed in self._routed_threads.pop(evicted["id"], ()):
+                    self._thread_slots.pop(routed, None)
+                self._index_remove(evicted)
+                if self.num_groups:
+                    self._remove_from_group(evicted)
+                result["evicted"] = evicted
             
             # Create new slot
             slot = {
@@ -93,39 +242,258 @@ class SlotManager:
             }
             
             self.slots.append(slot)
+            self._thread_slots[thread_id] = slot
+            self._index_write(slot)
             self.next_index += 1
             
+            if self.num_groups:
+                slot["group"] = group
+                self.groups[group].append(slot)
+                self._update_centroid(group)
+                result["group"] = group
+            
             result["created"] = True
             result["slot_id"] = slot["id"]
         
-        # Update attention weights
+        return result
+    
+    def _route_by_content(self, vector: torch.Tensor) -> Tuple[Optional[Dict], float]:
+        """
+        Most similar live slot if its cosine similarity reaches the threshold
+        One [num_slots, dim] matrix-vector product per lookup
+        """
+        if not self._index_rows:
+            return None, 0.0
+        
+        query = F.normalize(vector.detach(), dim=0)
+        scores = torch.mv(self._index, query).masked_fill(~self._index_live, float("-inf"))
+        row = int(scores.argmax())
+        similarity = float(scores[row])
+        
+        if similarity < self.routing_threshold:
+            return None, similarity
+        return self._index_slots[row], similarity
+    
+    def _index_write(self, slot: Dict):
+        """Insert or refresh a slot's row in the routing index"""
+        if self.routing_threshold is None:
+            return
+        
+        row = self._index_rows.get(slot["id"])
+        if row is None:
+            row = self._free_rows.pop()
+            self._index_rows[slot["id"]] = row
+            self._index_slots[row] = slot
+            self._index_live[row] = True
+        
+        self._index[row] = F.normalize(slot["vector"].detach(), dim=0)
+    
+    def _index_remove(self, slot: Dict):
+        if self.routing_threshold is None:
+            return
+        
+        row = self._index_rows.pop(slot["id"], None)
+        if row is not None:
+            self._index_live[row] = False
+            self._index_slots[row] = None
+            self._free_rows.append(row)
+    
+    def update_index(self, slots: Iterable[Dict]):
+        """Refresh index rows after slot vectors change outside ingest (orthogonalization)"""
+        if self.routing_threshold is None:
+            return
+        
+        for slot in slots:
+            self._index_write(slot)
+    
+    def _rebuild_index(self):
+        self._index.zero_()
+        self._index_live.zero_()
+        self._index_rows = {}
+        self._index_slots = [None] * self.num_slots
+        self._free_rows = list(range(self.num_slots - 1, -1, -1))
+        self.update_index(self.slots)
+    
+    def _after_write(self, results: List[Dict]):
+        """Schedule attention updates (and periodic rebalancing) after ingest"""
+        if not self.num_groups:
+            self._schedule_attention_update()
+            return
+        
+        self._writes_since_rebalance += len(results)
+        if self._writes_since_rebalance >= self.rebalance_every:
+            self.rebalance()
+            results[-1]["rebalanced"] = True
+            return
+        
+        touched = {result["group"] for result in results}
+        if self.lazy_attention:
+            self._dirty_groups |= touched
+        else:
+            for group in touched:
+                self._reweight_group(group)
+    
+    def _route(self, vector: torch.Tensor) -> int:
+        """
+        Nearest group by centroid similarity that can take a new slot
+        
+        While filling, groups at group_capacity are skipped; once full, the
+        new slot replaces an eviction, so only non-empty groups qualify.
+        """
+        scores = torch.mv(self._centroids, F.normalize(vector.detach(), dim=0))
+        sizes = torch.tensor([len(members) for members in self.groups], device=self.device)
+        
+        if len(self.slots) >= self.num_slots:
+            allowed = sizes > 0
+        else:
+            allowed = sizes < self.group_capacity
+        
+        scores = scores.masked_fill(~allowed, float("-inf"))
+        return int(scores.argmax())
+    
+    def _update_centroid(self, group: int):
+        """Recompute one group's centroid from its members"""
+        members = self.groups[group]
+        if not members:
+            self._centroids[group] = 0.0
+            return
+        
+        vectors = torch.stack([slot["vector"].detach() for slot in members])
+        self._centroids[group] = F.normalize(vectors.mean(dim=0), dim=0)
+    
+    def _remove_from_group(self, slot: Dict):
+        members = self.groups[slot["group"]]
+        for i, member in enumerate(members):
+            if member is slot:
+                members.pop(i)
+                break
+        self._update_centroid(slot["group"])
+    
+    def rebalance(self, iterations: int = 3):
+        """
+        Re-cluster all slots into groups and refresh weights globally
+        
+        Balanced spherical k-means: each pass assigns slots to their most
+        similar centroid with at most ceil(N / G) slots per group, then
+        recomputes centroids. Seeding is deterministic (current centroids,
+        evenly spaced slots for empty groups), so replicas agree.
+        """
+        self._writes_since_rebalance = 0
+        if not self.num_groups or not self.slots:
+            return
+        
+        vectors = F.normalize(self.get_state_matrix().detach(), dim=1)
+        n = len(vectors)
+        
+        centroids = self._centroids.clone()
+        empty = torch.nonzero(centroids.norm(dim=1) == 0).flatten()
+        if len(empty):
+            seeds = torch.linspace(0, n - 1, len(empty), device=self.device).long()
+            centroids[empty] = vectors[seeds]
+        
+        for _ in range(iterations):
+            assignment = self._balanced_assign(torch.mm(vectors, centroids.t()))
+            sums = torch.zeros_like(centroids).index_add_(0, assignment, vectors)
+            centroids = F.normalize(sums, dim=1)
+        
+        self.groups = [[] for _ in range(self.num_groups)]
+        for slot, group in zip(self.slots, assignment.tolist()):
+            slot["group"] = group
+            self.groups[group].append(slot)
+        self._centroids = centroids
+        
         self._update_attention_weights()
+    
+    def _balanced_assign(self, scores: torch.Tensor) -> torch.Tensor:
+        """Greedy capacity-constrained assignment of [N, G] similarity scores"""
+        n = scores.shape[0]
+        capacity = math.ceil(n / self.num_groups)
         
-        return result
+        # Most confident slots choose first
+        order = torch.argsort(scores.max(dim=1).values, descending=True).tolist()
+        preferences = torch.argsort(scores, dim=1, descending=True).tolist()
+        
+        sizes = [0] * self.num_groups
+        assignment = [0] * n
+        for i in order:
+            for group in preferences[i]:
+                if sizes[group] < capacity:
+                    assignment[i] = group
+                    sizes[group] += 1
+                    break
+        
+        return torch.tensor(assignment, device=self.device)
     
     def _find_slot(self, thread_id: str) -> Optional[int]:
         """Find slot index by thread ID"""
-        for i, slot in enumerate(self.slots):
-            if slot["thread_id"] == thread_id:
-                return i
-        return None
+        slot = self._thread_slots.get(thread_id)
+        if slot is None:
+            return None
+        return self.slots.index(slot)
+    
+    def load_slots(self, slots: List[Dict]):
+        """
+        Replace all slots (e.g. after a data-parallel merge)
+        Priorities are taken as given, so every replica ends up identical
+        """
+        self.slots = slots[:self.num_slots]
+        self._thread_slots = {slot["thread_id"]: slot for slot in self.slots}
+        self._routed_threads = {}
+        self._rebuild_index()
+        self.next_index = max([self.next_index] + [slot["index"] + 1 for slot in self.slots])
+        
+        if self.slots:
+            priorities = torch.tensor(
+                [slot["priority"] for slot in self.slots], device=self.device
+            )
+            self.attention_weights = priorities / priorities.sum().clamp_min(1e-12)
+        
+        # Regroup deterministically, keeping the given priorities
+        if self.num_groups:
+            weights = self._attention_weights
+            self.rebalance()
+            self.attention_weights = weights
+            for slot, weight in zip(self.slots, weights.tolist()):
+                slot["priority"] = weight
+    
+    def detach(self):
+        """Cut slot vectors from the autograd graph (after a training step)"""
+        for slot in self.slots:
+            slot["vector"] = slot["vector"].detach()
     
-    def _select_eviction_target(self) -> int:
-        """Select slot to evict based on LRU + priority"""
+    def _select_eviction_target(self, group: Optional[int] = None) -> int:
+        """Select slot to evict based on LRU + priority (within a group if given)"""
         if not self.slots:
             return 0
         
+        # Priorities must be current before they are compared
+        if group is None:
+            self.refresh_attention_weights()
+            candidates = self.slots
+        else:
+            if group in self._dirty_groups:
+                self._dirty_groups.discard(group)
+                self._reweight_group(group)
+            candidates = self.groups[group]
+        
         now = time.time()
-        scores = []
+        # Lower score = more likely to evict
+        target = min(
+            candidates,
+            key=lambda slot: slot["priority"] / (1 + (now - slot["last_active"]) * 0.01),
+        )
         
         for i, slot in enumerate(self.slots):
-            age = now - slot["last_active"]
-            # Lower score = more likely to evict
-            score = slot["priority"] / (1 + age * 0.01)
-            scores.append((i, score))
-        
-        scores.sort(key=lambda x: x[1])
-        return scores[0][0]
+            if slot is target:
+                return i
+        return 0
+    
+    def _schedule_attention_update(self):
+        """Refresh attention weights now, or mark them stale in lazy mode"""
+        if self.lazy_attention:
+            self._weights_dirty = True
+        else:
+            self._update_attention_weights()
     
     def _update_attention_weights(self):
         """
@@ -136,22 +504,41 @@ class SlotManager:
             return
         
         beta = 1.0  # Temperature
-        utilities = []
         
+        # Utility = priority - fatigue (time decay)
         now = time.time()
-        for slot in self.slots:
-            # Utility = priority - fatigue (time decay)
-            fatigue = (now - slot["last_active"]) * 0.001
-            utility = slot["priority"] - fatigue
-            utilities.append(utility)
-        
-        utilities = torch.tensor(utilities, device=self.device)
+        utilities = torch.tensor(
+            [slot["priority"] - (now - slot["last_active"]) * 0.001 for slot in self.slots],
+            device=self.device,
+        )
         self.attention_weights = F.softmax(beta * utilities, dim=0)
         
-        # Update slot priorities
-        for i, slot in enumerate(self.slots):
-            if i < len(self.attention_weights):
-                slot["priority"] = self.attention_weights[i].item()
+        # Update slot priorities (one device-to-host copy)
+        for slot, weight in zip(self.slots, self._attention_weights.tolist()):
+            slot["priority"] = weight
+    
+    def _reweight_group(self, group: int):
+        """
+        Boltzmann update within one group
+        The group's total priority mass is preserved, so weights stay
+        comparable across groups until the next global refresh.
+        """
+        members = self.groups[group]
+        if not members:
+            return
+        
+        beta = 1.0  # Temperature
+        
+        now = time.time()
+        priorities = torch.tensor([slot["priority"] for slot in members], device=self.device)
+        fatigue = torch.tensor(
+            [(now - slot["last_active"]) * 0.001 for slot in members], device=self.device
+        )
+        weights = F.softmax(beta * (priorities - fatigue), dim=0) * priorities.sum()
+        
+        for slot, weight in zip(members, weights.tolist()):
+            slot["priority"] = weight
+        self._weights_stale = True
     
     def get_slot(self, slot_id: str) -> Optional[Dict]:
         """Get slot by ID"""
@@ -170,8 +557,17 @@ class SlotManager:
     
     def export_slots(self) -> List[Dict]:
         """Export slots for API response"""
+        self.refresh_attention_weights()
+        if not self.slots:
+            return []
+        
+        # One stack and two host copies for all slots, not two per slot
+        vectors = self.get_state_matrix().detach()
+        norms = vectors.norm(dim=1).tolist()
+        previews = vectors[:, :10].tolist()
+        
         exported = []
-        for slot in self.slots:
+        for slot, norm, preview in zip(self.slots, norms, previews):
             exported.append({
                 "id": slot["id"],
                 "index": slot["index"],
@@ -179,13 +575,121 @@ class SlotManager:
                 "thread_id": slot["thread_id"],
                 "last_active": slot["last_active"],
                 "update_count": slot["update_count"],
-                "vector_norm": slot["vector"].norm().item(),
-                "vector_preview": slot["vector"][:10].tolist(),
+                "group": slot.get("group"),
+                "vector_norm": norm,
+                "vector_preview": preview,
             })
         return exported
     
+    def export_columns(self) -> Dict[str, Any]:
+        """
+        export_slots() as columns, for binary encodings
+        
+        Numeric fields are NumPy arrays (group is -1 for ungrouped slots),
+        ids and thread ids are lists, vector_preview is [N, 10] float32.
+        """
+        self.refresh_attention_weights()
+        slots = self.slots
+        vectors = self.get_state_matrix().detach().float()
+        
+        return {
+            "id": [slot["id"] for slot in slots],
+            "index": np.array([slot["index"] for slot in slots], dtype=np.int64),
+            "priority": np.array([slot["priority"] for slot in slots], dtype=np.float64),
+            "thread_id": [slot["thread_id"] for slot in slots],
+            "last_active": np.array([slot["last_active"] for slot in slots], dtype=np.float64),
+            "update_count": np.array([slot["update_count"] for slot in slots], dtype=np.int64),
+            "group": np.array(
+                [-1 if slot.get("group") is None else slot["group"] for slot in slots], dtype=np.int64
+            ),
+            "vector_norm": vectors.norm(dim=1).cpu().numpy(),
+            "vector_preview": vectors[:, :10].cpu().numpy(),
+        }
+    
+    def state(self) -> Tuple[Dict[str, torch.Tensor], Dict]:
+        """
+        Copy of the full slot state for a checkpoint
+        
+        Returns:
+            (tensors, meta): slot matrix, attention weights, group centroids
+            and routing index on the CPU; per-slot fields, group membership,
+            thread map and deferred-update flags as JSON-serializable values
+        """
+        slots = self.slots
+        positions = {id(slot): i for i, slot in enumerate(slots)}
+        
+        def cpu(tensor: torch.Tensor) -> torch.Tensor:
+            return tensor.detach().to("cpu", copy=True)
+        
+        tensors = {
+            "vectors": cpu(self.get_state_matrix()),
+            "attention_weights": cpu(self._attention_weights),
+            "centroids": cpu(self._centroids),
+            "index": cpu(self._index),
+            "index_live": cpu(self._index_live),
+        }
+        meta = {
+            "slots": [
+                {key: value for key, value in slot.items() if key != "vector"}
+                for slot in slots
+            ],
+            "next_index": self.next_index,
+            "thread_slots": {
+                thread_id: positions[id(slot)] for thread_id, slot in self._thread_slots.items()
+            },
+            "groups": [[positions[id(slot)] for slot in members] for members in self.groups],
+            "dirty_groups": sorted(self._dirty_groups),
+            "writes_since_rebalance": self._writes_since_rebalance,
+            "weights_dirty": self._weights_dirty,
+            "weights_stale": self._weights_stale,
+            "index_rows": [self._index_rows.get(slot["id"]) for slot in slots],
+            "free_rows": list(self._free_rows),
+        }
+        return tensors, meta
+    
+    def load_state(self, tensors: Dict[str, torch.Tensor], meta: Dict):
+        """Restore a state() exactly, without refreshing weights or regrouping"""
+        vectors = tensors["vectors"].to(self.device)
+        slots = [
+            {**fields, "vector": vectors[i].clone()}
+            for i, fields in enumerate(meta["slots"])
+        ]
+        
+        self.slots = slots
+        self.next_index = meta["next_index"]
+        self._thread_slots = {
+            thread_id: slots[i] for thread_id, i in meta["thread_slots"].items()
+        }
+        self._routed_threads = {}
+        for thread_id, slot in self._thread_slots.items():
+            if thread_id != slot["thread_id"]:
+                self._routed_threads.setdefault(slot["id"], set()).add(thread_id)
+        self.groups = [[slots[i] for i in members] for members in meta["groups"]]
+        self._centroids = tensors["centroids"].to(self.device)
+        self._dirty_groups = set(meta["dirty_groups"])
+        self._writes_since_rebalance = meta["writes_since_rebalance"]
+        self._attention_weights = tensors["attention_weights"].to(self.device)
+        self._weights_dirty = meta["weights_dirty"]
+        self._weights_stale = meta["weights_stale"]
+        
+        self._index = tensors["index"].to(self.device)
+        self._index_live = tensors["index_live"].to(self.device)
+        self._index_rows = {}
+        self._index_slots = [None] * self.num_slots
+        for slot, row in zip(slots, meta["index_rows"]):
+            if row is not None:
+                self._index_rows[slot["id"]] = row
+                self._index_slots[row] = slot
+        self._free_rows = list(meta["free_rows"])
+    
     def reset(self):
         """Reset all slots"""
         self.slots = []
         self.next_index = 0
+        self._thread_slots = {}
+        self._routed_threads = {}
+        self.groups = [[] for _ in range(self.num_groups)]
+        self._centroids = torch.zeros(self.num_groups, self.dim, device=self.device)
+        self._writes_since_rebalance = 0
+        self._rebuild_index()
         self.attention_weights = torch.ones(self.num_slots, device=self.device) / self.num_slots
@@ -0,0 +1,3 @@
+"""
+Avadhan Benchmarks - Offline CPU performance suite (python -m benchmarks.run)
+"""
@@ -0,0 +1,447 @@
+"""
+Avadhan Benchmarks - Offline CPU performance suite
+
+Measures ingest latency, training-step throughput, orthogonalization time,
+memory search latency/recall and peak RSS for the Ashta (8), Shata (100)
+and Sahasra (1000) regimes and several memory sizes. Every case runs in a
+fresh process so peak RSS is per case.
+
+Usage (from backend/):
+    python -m benchmarks.run                          # full suite, compare to baseline
+    python -m benchmarks.run --quick                  # smaller sizes
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --update-baseline        # record a new baseline
+
+Exit code 1 if any metric regressed past its threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+REGIMES = {"ashta": 8, "shata": 100, "sahasra": 1000}
+
+MEMORY_SIZES = (1_000, 10_000, 100_000)
+QUICK_MEMORY_SIZES = (1_000, 10_000)
+QUICK_REGIMES = ("ashta", "shata")
+
+COMPRESSIONS = ("none", "fp16", "int8", "pq")
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Relative slack before a timing / memory metric counts as a regression,
+# and absolute slack for recall
+THRESHOLDS = {
+    "time": 0.25,
+    "throughput": 0.25,
+    "memory": 0.15,
+    "recall": 0.02,
+}
+
+DIM = 384
+RECALL_K = 10
+
+
+# ============== Helpers ==============
+
+def _seed(seed: int):
+    import torch
+
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of this process"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _repeat(
+    fn: Callable[[int], None],
+    iterations: int,
+    budget: float,
+    warmup: int = 2
+) -> np.ndarray:
+    """
+    Time fn(i) for up to `iterations` calls or `budget` seconds (min 3)
+
+    Returns:
+        Durations in milliseconds
+    """
+    for i in range(warmup):
+        fn(i)
+
+    durations = []
+    deadline = time.perf_counter() + budget
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(warmup + i)
+        durations.append(time.perf_counter() - start)
+        if len(durations) >= 3 and time.perf_counter() > deadline:
+            break
+
+    return np.array(durations) * 1000.0
+
+
+def _latency(prefix: str, durations: np.ndarray) -> Dict[str, float]:
+    return {
+        f"{prefix}_p50_ms": float(np.percentile(durations, 50)),
+        f"{prefix}_p95_ms": float(np.percentile(durations, 95)),
+        f"{prefix}_mean_ms": float(durations.mean()),
+        f"{prefix}_samples": int(len(durations)),
+    }
+
+
+def _filled_engine(regime: str):
+    """Engine built from the regime profile with every slot occupied"""
+    import torch
+    from avadhan.engine import AvadhanEngine
+    from avadhan.regimes import resolve_regime
+
+    profile = resolve_regime(regime)
+    num_slots = profile["num_slots"]
+    engine = AvadhanEngine(
+        **profile,
+        encoder_dim=DIM,
+        device="cpu",
+        async_consolidation=False,
+    )
+    with torch.no_grad():
+        vectors = engine.encoder.encode([f"warmup input {i}" for i in range(num_slots)])
+    engine.slot_manager.ingest_batch(vectors, [f"thread_{i}" for i in range(num_slots)])
+    engine.slot_manager.slots = engine.orthogonalizer.orthogonalize(engine.slot_manager.slots)
+    return engine
+
+
+# ============== Cases ==============
+
+def bench_ingest(regime: str, budget: float) -> Dict:
+    """Single-input ingest latency: half existing threads, half evictions"""
+    num_slots = REGIMES[regime]
+    engine = _filled_engine(regime)
+
+    def step(i: int):
+        thread = f"thread_{i % num_slots}" if i % 2 == 0 else f"new_thread_{i}"
+        engine.ingest(f"benchmark input {i}", thread)
+
+    durations = _repeat(step, iterations=200, budget=budget)
+    engine.close()
+    return _latency("ingest", durations)
+
+
+def bench_train_step(regime: str, budget: float) -> Dict:
+    """Optimizer steps per second and inputs per second"""
+    num_slots = REGIMES[regime]
+    engine = _filled_engine(regime)
+
+    def step(i: int):
+        engine.training_step([
+            (f"train input {i} {j}", f"thread_{(i * 7 + j) % (num_slots + 2)}")
+            for j in range(engine.step_size)
+        ])
+
+    durations = _repeat(step, iterations=50, budget=budget)
+    engine.close()
+
+    results = _latency("step", durations)
+    results["steps_per_s"] = float(1000.0 / durations.mean())
+    results["inputs_per_s"] = float(engine.step_size * 1000.0 / durations.mean())
+    return results
+
+
+def bench_orthogonalize(regime: str, budget: float) -> Dict:
+    """Orthogonalizer.orthogonalize over random slot vectors"""
+    import torch
+    from avadhan.orthogonalizer import Orthogonalizer
+
+    num_slots = REGIMES[regime]
+    orthogonalizer = Orthogonalizer()
+    vectors = torch.randn(num_slots, DIM)
+
+    def step(i: int):
+        slots = [{"vector": vectors[j]} for j in range(num_slots)]
+        orthogonalizer.orthogonalize(slots)
+
+    return _latency("orthogonalize", _repeat(step, iterations=100, budget=budget))
+
+
+def bench_memory_search(size: int, compression: str, budget: float) -> Dict:
+    """
+    GistStore build time, search latency and recall@k against exact search
+
+    Queries are noisy copies of stored vectors; ground truth is brute-force
+    cosine top-k over the uncompressed vectors.
+    """
+    from avadhan.gist_store import GistStore
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((size, DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    store = GistStore(dim=DIM, compression=compression)
+    start = time.perf_counter()
+    for offset in range(0, size, 1024):
+        chunk = vectors[offset:offset + 1024]
+        n = len(chunk)
+        store.append_batch(
+            gist_ids=[f"gist_{offset + i}" for i in range(n)],
+            texts=[""] * n,
+            vectors=chunk,
+            slot_ids=[""] * n,
+            created_at=[0.0] * n,
+            confidence=[0.5] * n,
+            ttls=[None] * n,
+        )
+    build_s = time.perf_counter() - start
+
+    queries = vectors[rng.choice(size, 64, replace=False)]
+    queries = queries + 0.1 * rng.standard_normal(queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    exact = np.argsort(-(queries @ vectors.T), axis=1)[:, :RECALL_K]
+    hits = 0
+    for query, truth in zip(queries, exact):
+        _, rows = store.search(query, RECALL_K)
+        hits += len(set(rows.tolist()) & set(truth.tolist()))
+
+    def step(i: int):
+        store.search(queries[i % len(queries)], RECALL_K)
+
+    results = _latency("search", _repeat(step, iterations=200, budget=budget))
+    results["recall_at_10"] = hits / (len(queries) * RECALL_K)
+    results["build_s"] = build_s
+    results["bytes"] = int(store.nbytes())
+    return results
+
+
+# ============== Runner ==============
+
+def _run_case(name: str, fn_name: str, args: Tuple, threads: int) -> Tuple[str, Dict]:
+    """Run one case (inside a fresh worker process)"""
+    import torch
+
+    torch.set_num_threads(threads)
+    _seed(0)
+
+    results = globals()[fn_name](*args)
+    results["peak_rss_mb"] = _peak_rss_mb()
+    return name, results
+
+
+def build_cases(quick: bool, budget: float) -> List[Tuple[str, str, Tuple]]:
+    """(case name, function name, args) for the selected suite"""
+    from avadhan.gist_store import FAISS_AVAILABLE
+
+    regimes = QUICK_REGIMES if quick else tuple(REGIMES)
+    sizes = QUICK_MEMORY_SIZES if quick else MEMORY_SIZES
+
+    cases = []
+    for regime in regimes:
+        cases.append((f"ingest/{regime}", "bench_ingest", (regime, budget)))
+        cases.append((f"train_step/{regime}", "bench_train_step", (regime, budget)))
+        cases.append((f"orthogonalize/{regime}", "bench_orthogonalize", (regime, budget)))
+
+    for size in sizes:
+        for compression in COMPRESSIONS:
+            if compression == "pq" and not FAISS_AVAILABLE:
+                continue
+            cases.append((
+                f"memory_search/{compression}/{size}",
+                "bench_memory_search",
+                (size, compression, budget),
+            ))
+
+    return cases
+
+
+def run_suite(
+    quick: bool = False,
+    budget: float = 5.0,
+    threads: int = 1,
+    only: Optional[str] = None
+) -> Dict:
+    """
+    Run every case in its own spawned process
+
+    Returns:
+        {"meta": {...}, "results": {case: {metric: value}}}
+    """
+    cases = build_cases(quick, budget)
+    if only:
+        cases = [case for case in cases if only in case[0]]
+
+    results = {}
+    ctx = get_context("spawn")
+    for name, fn_name, args in cases:
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            case_name, case_results = pool.submit(_run_case, name, fn_name, args, threads).result()
+        results[case_name] = case_results
+        print(f"  {case_name}: " + ", ".join(
+            f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}"
+            for key, value in case_results.items()
+        ), flush=True)
+
+    return {"meta": _metadata(quick, budget, threads), "results": results}
+
+
+def _metadata(quick: bool, budget: float, threads: int) -> Dict:
+    import torch
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "quick": quick,
+        "budget_s": budget,
+        "threads": threads,
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+# ============== Baseline comparison ==============
+
+def _metric_kind(metric: str) -> Optional[str]:
+    """Threshold class of a metric (None = informational only)"""
+    if metric.endswith("_ms") and "_p95_" not in metric:
+        return "time"
+    if metric.endswith("_per_s"):
+        return "throughput"
+    if metric in ("peak_rss_mb", "bytes"):
+        return "memory"
+    if metric.startswith("recall"):
+        return "recall"
+    return None
+
+
+def compare(
+    results: Dict,
+    baseline: Dict,
+    thresholds: Dict[str, float] = THRESHOLDS
+) -> List[Dict]:
+    """
+    Regressions of results against baseline
+
+    Times and memory regress when they grow by more than the relative
+    threshold, throughput when it drops by more, recall when it drops by
+    more than the absolute threshold. p95 latencies are reported but not
+    gated (too noisy on shared CPUs).
+
+    Returns:
+        One {case, metric, baseline, current, change} dict per regression
+    """
+    regressions = []
+
+    for case, metrics in results["results"].items():
+        base_metrics = baseline.get("results", {}).get(case)
+        if base_metrics is None:
+            continue
+
+        for metric, current in metrics.items():
+            kind = _metric_kind(metric)
+            base = base_metrics.get(metric)
+            if kind is None or base is None:
+                continue
+
+            threshold = thresholds[kind]
+            if kind == "recall":
+                change = current - base
+                regressed = change < -threshold
+            elif kind == "throughput":
+                change = current / base - 1.0 if base else 0.0
+                regressed = change < -threshold
+            else:
+                change = current / base - 1.0 if base else 0.0
+                regressed = change > threshold
+
+            if regressed:
+                regressions.append({
+                    "case": case,
+                    "metric": metric,
+                    "baseline": base,
+                    "current": current,
+                    "change": change,
+                })
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Avadhan CPU benchmark suite")
+    parser.add_argument("--quick", action="store_true", help="Ashta/Shata and smaller memories only")
+    parser.add_argument("--only", type=str, default=None, help="Run cases whose name contains this")
+    parser.add_argument("--budget", type=float, default=5.0, help="Seconds per measured case")
+    parser.add_argument("--threads", type=int, default=1, help="torch intra-op threads")
+    parser.add_argument("--output", type=str, default=None, help="Write results JSON here")
+    parser.add_argument("--baseline", type=str, default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    for kind, default in THRESHOLDS.items():
+        parser.add_argument(f"--{kind}-threshold", type=float, default=default)
+    args = parser.parse_args()
+
+    print(f"Running {'quick' if args.quick else 'full'} benchmark suite")
+    results = run_suite(args.quick, args.budget, args.threads, args.only)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.update_baseline:
+        # A partial run (--only) only replaces the cases it ran
+        if args.only and os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+            baseline["results"].update(results["results"])
+            results = dict(results, results=baseline["results"])
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; skipping comparison")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    thresholds = {kind: getattr(args, f"{kind}_threshold") for kind in THRESHOLDS}
+    regressions = compare(results, baseline, thresholds)
+
+    if not regressions:
+        print("No regressions against baseline")
+        return
+
+    print(f"{len(regressions)} regression(s) against baseline:")
+    for r in regressions:
+        print(f"  {r['case']} {r['metric']}: {r['baseline']:.4g} -> {r['current']:.4g} "
+              f"({r['change']:+.1%})")
+    raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -22,22 +22,66 @@ class Settings(BaseSettings):
     DEFAULT_ENCODER: str = "sentence-transformers/all-MiniLM-L6-v2"
     DEFAULT_GENERATOR: str = "microsoft/DialoGPT-small"
     MAX_MODEL_SIZE_MB: int = 5000
+    MODEL_CACHE_MB: int = 4096  # loaded models kept in memory; LRU-evicted when not in use
+    
+    # ONNX Runtime (CPU inference for uploaded .onnx models)
+    ONNX_SESSION_POOL_SIZE: int = 2  # sessions per model, for concurrent callers
+    ONNX_INTRA_OP_THREADS: int = 0  # threads per session; 0 = cores / pool size
+    ONNX_INTER_OP_THREADS: int = 1  # only used with ONNX_PARALLEL_EXECUTION
+    ONNX_PARALLEL_EXECUTION: bool = False
+    ONNX_CACHE_OPTIMIZED: bool = True  # save optimized graphs under MODELS_DIR/.onnx-cache
+    UPLOAD_CHUNK_SIZE: int = 1 << 20  # bytes buffered per disk write while streaming uploads
+    UPLOAD_SESSION_TTL: float = 3600.0  # seconds before an idle resumable upload is discarded
+    UPLOAD_PRUNE_INTERVAL: float = 300.0  # seconds between sweeps of unreferenced upload blobs
     
     # Training defaults
     DEFAULT_BATCH_SIZE: int = 8
     DEFAULT_LEARNING_RATE: float = 1e-4
     DEFAULT_NUM_SLOTS: int = 8
     DEFAULT_ENCODER_DIM: int = 384
+    MAX_CONCURRENT_TRAINING: int = 2  # sessions training at once; the rest are queued
+    MAX_QUEUED_TRAINING: int = 32  # queued sessions before /train/start is refused
+    TRAINING_CPU_THREADS: int = 0  # threads shared by running jobs; 0 = all cores
+    TRAINING_THREADS_PER_JOB: int = 0  # fixed torch intra-op threads; 0 = share of TRAINING_CPU_THREADS
+    SLOT_STATE_EVERY: int = 10  # steps between slot state exports for status and the session store
     
     # Avadhan hyperparameters
     ORTHOGONALITY_WEIGHT: float = 0.1
     CONTRASTIVE_TEMP: float = 0.07
     CONTROLLER_LR: float = 1e-4
     
+    # Memory maintenance
+    MEMORY_SWEEP_INTERVAL: float = 5.0  # seconds between TTL expiry sweeps
+    
     # Paths
     MODELS_DIR: str = "./models"
     CHECKPOINTS_DIR: str = "./checkpoints"
     LOGS_DIR: str = "./logs"
+    DATASETS_DIR: str = "./datasets"
+    PROFILES_DIR: str = "./profiles"
+    
+    # Profiling
+    PROFILE_WINDOW: int = 1024  # timing samples kept per stage
+    MAX_TRACE_STEPS: int = 50
+    
+    # Metrics (per session): steps kept at full resolution, older ones are
+    # downsampled into min/max/mean buckets of METRICS_BUCKET_SIZE steps
+    METRICS_RETENTION: int = 10000
+    METRICS_BUCKET_SIZE: int = 10
+    
+    # Checkpoints (written in the background every TrainingConfig.checkpoint_every steps)
+    CHECKPOINT_KEEP_LAST: int = 3  # newest checkpoints kept per project
+    CHECKPOINT_KEEP_EVERY: int = 0  # also keep epochs that are multiples of this; 0 = none
+    
+    # Session state shared by server workers (sqlite or memory)
+    SESSION_BACKEND: str = "sqlite"
+    SESSION_DB_PATH: str = "./sessions.db"
+    SESSION_FLUSH_INTERVAL: float = 0.25  # seconds of training updates batched per write
+    SESSION_HEARTBEAT_INTERVAL: float = 2.0
+    SESSION_STALE_AFTER: float = 15.0  # a training session without a heartbeat this long is interrupted
+    
+    # Data pipeline
+    DATASET_PREFETCH_DEPTH: int = 4  # step batches prepared ahead
     
     class Config:
         env_file = ".env"
@@ -9,7 +9,9 @@ from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
 from config import settings
-from api.routes import router as api_router
+from api.routes import router as api_router, sweep_expired_memory, sync_sessions
+from api.sessions import session_store
+from api.encoding import FastJSONResponse
 from api.websocket import router as ws_router
 
 # Setup logging
@@ -31,11 +33,21 @@ async def lifespan(app: FastAPI):
     os.makedirs(settings.MODELS_DIR, exist_ok=True)
     os.makedirs(settings.CHECKPOINTS_DIR, exist_ok=True)
     os.makedirs(settings.LOGS_DIR, exist_ok=True)
+    os.makedirs(settings.DATASETS_DIR, exist_ok=True)
+    os.makedirs(settings.PROFILES_DIR, exist_ok=True)
+    
+    # Background TTL expiry for episodic memory
+    sweeper = asyncio.create_task(sweep_expired_memory(settings.MEMORY_SWEEP_INTERVAL))
+    # Heartbeats for this worker's sessions, stale-owner expiry and remote stop requests
+    syncer = asyncio.create_task(sync_sessions(settings.SESSION_HEARTBEAT_INTERVAL))
     
     yield
     
     # Shutdown
     logger.info("Shutting down Avadhan Backend")
+    sweeper.cancel()
+    syncer.cancel()
+    session_store.close()
 
 # Create FastAPI app
 app = FastAPI(
@@ -43,6 +55,7 @@ app = FastAPI(
     description="Python/PyTorch backend for Avadhan hybrid architecture training",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 # CORS middleware
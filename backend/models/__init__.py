@@ -1,4 +1,7 @@
 # Models module
-from .loader import ModelLoader
+from .cache import ModelCache
+from .loader import LazyStateDict, ModelLoader
+from .onnx_session import OnnxSessionPool
+from .uploads import UploadError, UploadStore
 
-__all__ = ["ModelLoader"]
+__all__ = ["LazyStateDict", "ModelCache", "ModelLoader", "OnnxSessionPool", "UploadError", "UploadStore"]
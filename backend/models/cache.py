@@ -0,0 +1,221 @@
+"""
+Model Cache - Process-level cache of loaded models
+Models are shared by key, reference counted, and evicted LRU within a byte budget
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+def fingerprint(path: str) -> Tuple:
+    """
+    Identity of a model file or directory's current contents
+
+    Uses (inode, size, mtime) of the file, or of every non-hidden file under
+    a directory. Uploads replace files by rename, so any new content changes
+    the fingerprint without hashing the weights.
+    """
+    st = os.stat(path)
+    if not os.path.isdir(path):
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    files = []
+    for root, dirs, names in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(names):
+            if name.startswith("."):
+                continue
+            full = os.path.join(root, name)
+            st = os.stat(full)
+            files.append((os.path.relpath(full, path), st.st_ino, st.st_size, st.st_mtime_ns))
+    return tuple(files)
+
+
+def disk_bytes(path: str) -> int:
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path)
+        for name in names
+    )
+
+
+def model_nbytes(model: Any) -> int:
+    """Bytes held by the tensors reachable from a loaded model (shared storage counted once)"""
+    import torch
+
+    seen = set()
+    total = 0
+
+    def visit(obj):
+        nonlocal total
+        if isinstance(obj, torch.Tensor):
+            storage = obj.untyped_storage()
+            if storage.data_ptr() not in seen:
+                seen.add(storage.data_ptr())
+                total += storage.nbytes()
+        elif isinstance(obj, torch.nn.Module):
+            for tensor in obj.state_dict(keep_vars=True).values():
+                visit(tensor)
+        elif isinstance(obj, dict):
+            for value in obj.values():
+                visit(value)
+        elif isinstance(obj, (list, tuple)):
+            for value in obj:
+                visit(value)
+
+    visit(model)
+    return total
+
+
+@dataclass
+class CacheEntry:
+    """A cached model; `refs` callers hold it, so it is not evicted"""
+    key: Tuple
+    model: Any
+    nbytes: int
+    load_s: float
+    refs: int = 0
+    hits: int = 0
+    loaded_at: float = field(default_factory=time.time)
+    last_used: float = field(default_factory=time.time)
+
+    def get_status(self) -> Dict:
+        return {
+            "path": self.key[0],
+            "model_type": self.key[2],
+            "device": self.key[3],
+            "bytes": self.nbytes,
+            "refs": self.refs,
+            "hits": self.hits,
+            "load_s": round(self.load_s, 4),
+            "loaded_at": self.loaded_at,
+            "last_used": self.last_used,
+        }
+
+
+class ModelCache:
+    """
+    Loaded models keyed by (resolved path, fingerprint, model_type, device, options)
+
+    acquire() returns the cached entry for a key, loading it on a miss (one
+    load per key at a time; concurrent callers wait for it), and release()
+    drops the caller's reference. Entries are kept in LRU order and, once
+    the total exceeds max_bytes, the least recently used unreferenced ones
+    are evicted. Referenced models are never evicted, so the budget can be
+    exceeded while they are in use. Loading a path whose contents changed
+    drops the unreferenced entries for its old contents.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple, CacheEntry]" = OrderedDict()
+        self._loading: Dict[Tuple, threading.Event] = {}
+        self.nbytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(path: str, model_type: str, device: str, options: Optional[Dict[str, Hashable]] = None) -> Tuple:
+        resolved = os.path.realpath(path)
+        return (
+            resolved,
+            fingerprint(resolved),
+            model_type,
+            str(device),
+            tuple(sorted((options or {}).items())),
+        )
+
+    def acquire(self, key: Tuple, load: Callable[[], Any]) -> CacheEntry:
+        """The entry for key, calling load() on a miss; release() it when done"""
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    entry.refs += 1
+                    entry.hits += 1
+                    entry.last_used = time.time()
+                    self.hits += 1
+                    return entry
+
+                pending = self._loading.get(key)
+                if pending is None:
+                    pending = self._loading[key] = threading.Event()
+                    self.misses += 1
+                    break
+
+            # Another thread is loading this key; use its result (or retry if it failed)
+            pending.wait()
+
+        try:
+            start = time.perf_counter()
+            model = load()
+            load_s = time.perf_counter() - start
+            entry = CacheEntry(key=key, model=model, nbytes=model_nbytes(model) or disk_bytes(key[0]), load_s=load_s, refs=1)
+
+            with self._lock:
+                self._invalidate(key)
+                self._entries[key] = entry
+                self.nbytes += entry.nbytes
+                self._evict()
+            return entry
+        finally:
+            with self._lock:
+                del self._loading[key]
+            pending.set()
+
+    def release(self, entry: CacheEntry):
+        with self._lock:
+            entry.refs = max(0, entry.refs - 1)
+            self._evict()
+
+    def _invalidate(self, key: Tuple):
+        """Drop unreferenced entries for the same path and options with other contents"""
+        for other in list(self._entries.values()):
+            if other.refs == 0 and other.key[0] == key[0] and other.key[2:] == key[2:]:
+                self._remove(other)
+                self.invalidations += 1
+
+    def _evict(self):
+        for entry in list(self._entries.values()):
+            if self.nbytes <= self.max_bytes:
+                break
+            if entry.refs == 0:
+                self._remove(entry)
+                self.evictions += 1
+
+    def _remove(self, entry: CacheEntry):
+        del self._entries[entry.key]
+        self.nbytes -= entry.nbytes
+
+    def clear(self) -> int:
+        """Drop every unreferenced entry"""
+        with self._lock:
+            idle = [entry for entry in self._entries.values() if entry.refs == 0]
+            for entry in idle:
+                self._remove(entry)
+            return len(idle)
+
+    def get_status(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": [entry.get_status() for entry in self._entries.values()],
+                "bytes": self.nbytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
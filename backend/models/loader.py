@@ -2,15 +2,15 @@
 Model Loader - Supports ONNX, PyTorch, HuggingFace, SafeTensors
 """
 import os
+import threading
 import torch
-from typing import Optional, Dict, Any, Union
+from collections.abc import Mapping
+from typing import Optional, Dict, Any, Iterator, Union
 from pathlib import Path
 
-try:
-    import onnxruntime as ort
-    ONNX_AVAILABLE = True
-except ImportError:
-    ONNX_AVAILABLE = False
+from .cache import CacheEntry, ModelCache
+
+from .onnx_session import ONNX_AVAILABLE, OnnxSessionPool
 
 try:
     from transformers import AutoModel, AutoTokenizer
@@ -19,12 +19,59 @@ except ImportError:
     HF_AVAILABLE = False
 
 try:
+    from safetensors import safe_open
     from safetensors.torch import load_file as load_safetensors
     SAFETENSORS_AVAILABLE = True
 except ImportError:
     SAFETENSORS_AVAILABLE = False
 
 
+class LazyStateDict(Mapping):
+    """
+    Read-only state dict over a .safetensors file, loaded tensor by tensor
+    
+    Opening only parses the header. A tensor is materialized on first
+    access (then kept); on CPU it is a view of the memory-mapped file, so
+    processes loading the same weights share one page-cache copy.
+    """
+    
+    def __init__(self, path: str, device: str = "cpu"):
+        self.path = path
+        self._handle = safe_open(path, framework="pt", device=device)
+        self._names = list(self._handle.keys())
+        self._name_set = set(self._names)
+        self._tensors: Dict[str, torch.Tensor] = {}
+        self._lock = threading.Lock()
+    
+    def __getitem__(self, name: str) -> torch.Tensor:
+        tensor = self._tensors.get(name)
+        if tensor is None:
+            if name not in self._name_set:
+                raise KeyError(name)
+            with self._lock:
+                tensor = self._tensors.get(name)
+                if tensor is None:
+                    tensor = self._tensors[name] = self._handle.get_tensor(name)
+        return tensor
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names)
+    
+    def __len__(self) -> int:
+        return len(self._names)
+    
+    def materialize(self, prefix: str = "") -> Dict[str, torch.Tensor]:
+        """Load every tensor whose name starts with prefix"""
+        return {name: self[name] for name in self._names if name.startswith(prefix)}
+    
+    @property
+    def materialized(self) -> int:
+        return len(self._tensors)
+    
+    def metadata(self) -> Optional[Dict[str, str]]:
+        return self._handle.metadata()
+
+
 class ModelLoader:
     """
     Universal model loader supporting multiple formats:
@@ -32,10 +79,13 @@ class ModelLoader:
     - PyTorch (.pt, .pth, .bin)
     - HuggingFace transformers
     - SafeTensors (.safetensors)
+    
+    With a ModelCache, acquire() shares loaded models across loaders.
     """
     
-    def __init__(self, device: str = "cuda"):
+    def __init__(self, device: str = "cuda", cache: Optional[ModelCache] = None):
         self.device = torch.device(device if torch.cuda.is_available() else "cpu")
+        self.cache = cache
         
         print(f"ModelLoader initialized on {self.device}")
         print(f"  ONNX: {ONNX_AVAILABLE}")
@@ -54,6 +104,7 @@ class ModelLoader:
         Args:
             path: Path to model file or directory
             model_type: One of 'auto', 'onnx', 'pytorch', 'huggingface', 'safetensors'
+            lazy: Memory-map weights instead of reading them (pytorch, safetensors)
         
         Returns:
             Loaded model
@@ -76,6 +127,30 @@ class ModelLoader:
         
         return loader(path, **kwargs)
     
+    def acquire(
+        self,
+        path: str,
+        model_type: str = "auto",
+        **kwargs
+    ) -> CacheEntry:
+        """
+        Load a model through the cache (entry.model is what load() returns)
+        
+        The entry is referenced until release(entry); unreferenced models
+        stay cached until evicted.
+        """
+        if self.cache is None:
+            raise RuntimeError("ModelLoader has no cache")
+        
+        if model_type == "auto":
+            model_type = self._detect_type(Path(path))
+        
+        key = ModelCache.make_key(path, model_type, self.device, kwargs)
+        return self.cache.acquire(key, lambda: self.load(path, model_type, **kwargs))
+    
+    def release(self, entry: CacheEntry):
+        self.cache.release(entry)
+    
     def _detect_type(self, path: Path) -> str:
         """Auto-detect model type from path"""
         if path.is_dir():
@@ -100,8 +175,23 @@ class ModelLoader:
         
         return "pytorch"  # Default
     
-    def _load_onnx(self, path: Path, **kwargs) -> Any:
-        """Load ONNX model with ONNX Runtime"""
+    def _load_onnx(
+        self,
+        path: Path,
+        pool_size: int = 1,
+        intra_op_threads: int = 0,
+        inter_op_threads: int = 0,
+        parallel: bool = False,
+        optimized_dir: Optional[str] = None,
+        **kwargs
+    ) -> Any:
+        """
+        Load ONNX model with ONNX Runtime
+        
+        Returns an OnnxSessionPool ("pool") of tuned sessions; use
+        pool.run() for batched inference. "session" is the pool's first
+        session, for direct use by a single caller.
+        """
         if not ONNX_AVAILABLE:
             raise ImportError("onnxruntime not installed")
         
@@ -112,22 +202,37 @@ class ModelLoader:
                 raise FileNotFoundError(f"No .onnx files in {path}")
             path = onnx_files[0]
         
-        # Create session
+        # Create sessions
         providers = ['CUDAExecutionProvider', 'CPUExecutionProvider']
         if self.device.type == "cpu":
             providers = ['CPUExecutionProvider']
         
-        session = ort.InferenceSession(str(path), providers=providers)
+        pool = OnnxSessionPool(
+            str(path),
+            providers=providers,
+            size=pool_size,
+            intra_op_threads=intra_op_threads,
+            inter_op_threads=inter_op_threads,
+            parallel=parallel,
+            optimized_dir=optimized_dir,
+        )
         
         return {
             "type": "onnx",
-            "session": session,
-            "inputs": session.get_inputs(),
-            "outputs": session.get_outputs(),
+            "session": pool.sessions[0],
+            "pool": pool,
+            "inputs": pool.inputs,
+            "outputs": pool.outputs,
         }
     
-    def _load_pytorch(self, path: Path, **kwargs) -> Any:
-        """Load PyTorch model"""
+    def _load_pytorch(self, path: Path, lazy: bool = False, **kwargs) -> Any:
+        """
+        Load PyTorch model
+        
+        With lazy, tensor storages are memory-mapped from the file (zipfile
+        checkpoints only; legacy ones are read normally) and their pages are
+        read on first use. On CPU the mapping is shared with other processes.
+        """
         # Find model file
         if path.is_dir():
             for ext in [".pt", ".pth", ".bin"]:
@@ -140,7 +245,14 @@ class ModelLoader:
             raise FileNotFoundError(f"Model not found: {path}")
         
         # Load checkpoint
-        checkpoint = torch.load(path, map_location=self.device)
+        mmap = lazy
+        try:
+            checkpoint = torch.load(path, map_location=self.device, mmap=mmap)
+        except RuntimeError:
+            if not mmap:
+                raise
+            mmap = False
+            checkpoint = torch.load(path, map_location=self.device)
         
         # Handle different checkpoint formats
         if isinstance(checkpoint, dict):
@@ -154,12 +266,13 @@ class ModelLoader:
             # Assume it's a model directly
             model = checkpoint
             model.to(self.device)
-            return {"type": "pytorch", "model": model}
+            return {"type": "pytorch", "model": model, "mmap": mmap}
         
         return {
             "type": "pytorch",
             "state_dict": state_dict,
             "checkpoint": checkpoint,
+            "mmap": mmap,
         }
     
     def _load_huggingface(self, path: Path, **kwargs) -> Any:
@@ -185,8 +298,13 @@ class ModelLoader:
             "tokenizer": tokenizer,
         }
     
-    def _load_safetensors(self, path: Path, **kwargs) -> Any:
-        """Load SafeTensors model"""
+    def _load_safetensors(self, path: Path, lazy: bool = False, **kwargs) -> Any:
+        """
+        Load SafeTensors model
+        
+        With lazy, the state dict is a LazyStateDict: only the header is read
+        up front, and tensors are loaded on access or by name prefix.
+        """
         if not SAFETENSORS_AVAILABLE:
             raise ImportError("safetensors not installed")
         
@@ -197,11 +315,15 @@ class ModelLoader:
                 raise FileNotFoundError(f"No .safetensors files in {path}")
             path = st_files[0]
         
-        state_dict = load_safetensors(str(path), device=str(self.device))
+        if lazy:
+            state_dict = LazyStateDict(str(path), device=str(self.device))
+        else:
+            state_dict = load_safetensors(str(path), device=str(self.device))
         
         return {
             "type": "safetensors",
             "state_dict": state_dict,
+            "lazy": lazy,
         }
     
     def get_model_info(self, model: Dict) -> Dict:
@@ -219,11 +341,18 @@ class ModelLoader:
             elif "state_dict" in model:
                 info["layers"] = len(model["state_dict"])
         
+        elif model_type == "safetensors":
+            info["layers"] = len(model["state_dict"])
+            if model.get("lazy"):
+                info["materialized"] = model["state_dict"].materialized
+        
         elif model_type == "onnx":
             session = model.get("session")
             if session:
                 info["inputs"] = [i.name for i in session.get_inputs()]
                 info["outputs"] = [o.name for o in session.get_outputs()]
+            if "pool" in model:
+                info["pool"] = model["pool"].get_status()
         
         elif model_type == "huggingface":
             if "model" in model:
@@ -0,0 +1,227 @@
+"""
+ONNX Sessions - Tuned ONNX Runtime sessions, pooled, with I/O-bound batched runs
+"""
+import hashlib
+import os
+import queue
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    import onnxruntime as ort
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+
+
+# ONNX tensor element types -> NumPy dtypes
+ONNX_DTYPES = {
+    "tensor(float)": np.float32,
+    "tensor(float16)": np.float16,
+    "tensor(double)": np.float64,
+    "tensor(int8)": np.int8,
+    "tensor(int16)": np.int16,
+    "tensor(int32)": np.int32,
+    "tensor(int64)": np.int64,
+    "tensor(uint8)": np.uint8,
+    "tensor(bool)": np.bool_,
+}
+
+
+def session_options(
+    intra_op_threads: int = 0,
+    inter_op_threads: int = 0,
+    parallel: bool = False,
+    optimized_model_path: Optional[str] = None,
+) -> "ort.SessionOptions":
+    """
+    SessionOptions for CPU inference
+
+    All graph optimizations are enabled, with the memory arena and memory
+    pattern planning on. Thread counts of 0 leave the choice to ONNX Runtime.
+    parallel runs independent graph branches concurrently (inter-op threads);
+    sequential is faster for most single-path models. With
+    optimized_model_path, the optimized graph is saved there.
+    """
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.intra_op_num_threads = intra_op_threads
+    options.inter_op_num_threads = inter_op_threads
+    options.execution_mode = (
+        ort.ExecutionMode.ORT_PARALLEL if parallel else ort.ExecutionMode.ORT_SEQUENTIAL
+    )
+    options.enable_cpu_mem_arena = True
+    options.enable_mem_pattern = True
+    if optimized_model_path:
+        options.optimized_model_filepath = optimized_model_path
+    return options
+
+
+def optimized_model_path(path: str, cache_dir: str, providers: Sequence[str]) -> str:
+    """
+    Where the optimized graph for a model file is cached
+
+    The name covers the file's identity and the ONNX Runtime version and
+    providers, since optimized graphs are specific to all of them.
+    """
+    st = os.stat(path)
+    key = "|".join([
+        os.path.realpath(path), str(st.st_size), str(st.st_mtime_ns),
+        ort.__version__, ",".join(providers),
+    ])
+    digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{os.path.splitext(os.path.basename(path))[0]}.{digest}.onnx")
+
+
+class OnnxSessionPool:
+    """
+    A fixed pool of InferenceSessions for one model
+
+    Concurrent callers each check out their own session, so runs (and
+    their I/O bindings) never share one, and intra_op_threads cores are
+    split between the sessions. The first session optimizes the graph and,
+    with an optimized_dir, saves it; later sessions (and later pools for
+    the same file) load the saved graph without re-optimizing.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        providers: Sequence[str] = ("CPUExecutionProvider",),
+        size: int = 1,
+        intra_op_threads: int = 0,
+        inter_op_threads: int = 0,
+        parallel: bool = False,
+        optimized_dir: Optional[str] = None,
+    ):
+        if not ONNX_AVAILABLE:
+            raise ImportError("onnxruntime not installed")
+
+        self.path = path
+        self.providers = list(providers)
+        self.size = max(1, size)
+
+        threads = intra_op_threads or max(1, (os.cpu_count() or 1) // self.size)
+        cached = optimized_model_path(path, optimized_dir, self.providers) if optimized_dir else None
+        self.optimized_path = cached if cached and os.path.exists(cached) else None
+
+        self.sessions: List["ort.InferenceSession"] = []
+        for _ in range(self.size):
+            save_path = None
+            if cached and self.optimized_path is None:
+                # Saved under a temporary name, so other processes never load a partial file
+                os.makedirs(optimized_dir, exist_ok=True)
+                save_path = f"{cached}.{os.getpid()}.tmp"
+            options = session_options(threads, inter_op_threads, parallel, save_path)
+            if self.optimized_path is not None:
+                # Already optimized; don't repeat the work
+                options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+
+            self.sessions.append(ort.InferenceSession(
+                self.optimized_path or path, sess_options=options, providers=self.providers
+            ))
+            if save_path is not None and os.path.exists(save_path):
+                os.replace(save_path, cached)
+                self.optimized_path = cached
+
+        self._idle: "queue.Queue[ort.InferenceSession]" = queue.Queue()
+        for session in self.sessions:
+            self._idle.put(session)
+
+        session = self.sessions[0]
+        self.inputs = session.get_inputs()
+        self.outputs = session.get_outputs()
+
+    @contextmanager
+    def session(self, timeout: Optional[float] = None) -> Iterator["ort.InferenceSession"]:
+        """Check out a session (blocks until one is free)"""
+        session = self._idle.get(timeout=timeout)
+        try:
+            yield session
+        finally:
+            self._idle.put(session)
+
+    def run(
+        self,
+        inputs: Dict[str, np.ndarray],
+        batch_size: Optional[int] = None,
+        output_names: Optional[Sequence[str]] = None,
+        out: Optional[Dict[str, np.ndarray]] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Run on inputs batched along dim 0, writing outputs in place
+
+        Outputs whose shape is known apart from a leading batch dimension
+        are allocated once for the whole input (or taken from `out`, to reuse
+        buffers across calls) and bound with I/O binding, so each batch is
+        written straight into its slice. Other outputs are allocated by ONNX
+        Runtime and concatenated.
+
+        Returns:
+            Output name -> array
+        """
+        inputs = {name: np.ascontiguousarray(array) for name, array in inputs.items()}
+        total = len(next(iter(inputs.values())))
+        batch_size = max(1, batch_size or total)
+        names = list(output_names or [output.name for output in self.outputs])
+        specs = {output.name: output for output in self.outputs}
+
+        results = dict(out or {})
+        for name, buffer in results.items():
+            if not buffer.flags.c_contiguous or len(buffer) != total:
+                raise ValueError(f"Output buffer for {name} must be C-contiguous with {total} rows")
+        for name in names:
+            if name not in results:
+                buffer = self._allocate(specs[name], total)
+                if buffer is not None:
+                    results[name] = buffer
+        unbound = {name: [] for name in names if name not in results}
+
+        with self.session() as session:
+            binding = session.io_binding()
+            for start in range(0, max(total, 1), batch_size):
+                end = min(start + batch_size, total)
+                binding.clear_binding_inputs()
+                binding.clear_binding_outputs()
+                for name, array in inputs.items():
+                    binding.bind_cpu_input(name, array[start:end])
+                for name in names:
+                    if name in unbound:
+                        binding.bind_output(name, "cpu")
+                    else:
+                        view = results[name][start:end]
+                        binding.bind_output(
+                            name, "cpu", 0, view.dtype, list(view.shape), view.ctypes.data
+                        )
+
+                session.run_with_iobinding(binding)
+
+                if unbound:
+                    for name, value in zip(names, binding.get_outputs()):
+                        if name in unbound:
+                            unbound[name].append(value.numpy())
+
+        for name, parts in unbound.items():
+            results[name] = parts[0] if len(parts) == 1 else np.concatenate(parts)
+        return {name: results[name] for name in names}
+
+    def _allocate(self, spec, batch: int) -> Optional[np.ndarray]:
+        """Output buffer for a [batch, *static] output, or None if its shape isn't that"""
+        dtype = ONNX_DTYPES.get(spec.type)
+        shape = list(spec.shape)
+        if dtype is None or not shape or isinstance(shape[0], int):
+            return None
+        if not all(isinstance(dim, int) for dim in shape[1:]):
+            return None
+        return np.empty([batch] + shape[1:], dtype=dtype)
+
+    def get_status(self) -> Dict:
+        return {
+            "path": self.path,
+            "size": self.size,
+            "idle": self._idle.qsize(),
+            "providers": self.providers,
+            "optimized_path": self.optimized_path,
+        }
@@ -0,0 +1,491 @@
+"""
+Model Uploads - Streaming, hashed and resumable model file uploads
+Uploads are streamed to a part file and committed into a content-addressed blob store
+"""
+import asyncio
+import hashlib
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+
+SHA256_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+# Total size of the non-file fields accepted in a multipart upload
+MAX_FORM_FIELD_BYTES = 64 * 1024
+
+
+class UploadError(Exception):
+    """An upload was rejected; status is the HTTP status code to report"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def safe_name(name: str) -> str:
+    """A single path component (rejects separators, '.', '..' and hidden names)"""
+    base = os.path.basename(name or "")
+    if base != name or not base or base.startswith("."):
+        raise UploadError(f"Invalid name: {name!r}")
+    return base
+
+
+@dataclass
+class Upload:
+    """An upload in progress; `received` bytes are in part_path and hashed"""
+    id: str
+    project_id: Optional[str]  # may be set after the data (multipart fields sent after the file)
+    filename: str
+    part_path: str
+    size: Optional[int] = None  # declared total, if known
+    sha256: Optional[str] = None  # expected digest, if known
+    received: int = 0
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    hasher: "hashlib._Hash" = field(default_factory=hashlib.sha256, repr=False)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False)
+
+    def get_status(self) -> Dict:
+        return {
+            "upload_id": self.id,
+            "project_id": self.project_id,
+            "filename": self.filename,
+            "offset": self.received,
+            "size": self.size,
+            "in_progress": self.lock.locked(),
+            "updated_at": self.updated_at,
+        }
+
+
+class MultipartFile:
+    """
+    Incremental multipart/form-data parser for a body with one file field
+
+    feed() takes raw body chunks and returns the file's bytes parsed from
+    them, so the file is never buffered; other fields are collected in
+    `fields` (at most MAX_FORM_FIELD_BYTES in total).
+    """
+
+    def __init__(self, content_type: str, file_field: str = "file"):
+        media, params = parse_options_header(content_type or "")
+        boundary = params.get(b"boundary")
+        if media != b"multipart/form-data" or not boundary:
+            raise UploadError("Expected a multipart/form-data body")
+
+        self.file_field = file_field
+        self.filename: Optional[str] = None
+        self.fields: Dict[str, str] = {}
+        self._data: List[bytes] = []
+        self._field_bytes = 0
+
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = bytearray()
+        self._header_value = bytearray()
+        self._name: Optional[str] = None
+        self._is_file = False
+        self._value = bytearray()
+
+        self._parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def feed(self, chunk: bytes) -> List[bytes]:
+        try:
+            self._parser.write(chunk)
+        except UploadError:
+            raise
+        except Exception as e:
+            raise UploadError(f"Malformed multipart body: {e}")
+        data, self._data = self._data, []
+        return data
+
+    def _on_part_begin(self):
+        self._headers = {}
+        self._name, self._is_file = None, False
+        self._value = bytearray()
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[bytes(self._header_field).lower()] = bytes(self._header_value)
+        self._header_field, self._header_value = bytearray(), bytearray()
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._name = options.get(b"name", b"").decode("utf-8", "replace")
+        filename = options.get(b"filename")
+        if self._name == self.file_field and filename is not None:
+            if self.filename is not None:
+                raise UploadError(f"Only one {self.file_field!r} field is accepted")
+            self._is_file = True
+            self.filename = filename.decode("utf-8", "replace")
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._is_file:
+            self._data.append(bytes(data[start:end]))
+            return
+        self._field_bytes += end - start
+        if self._field_bytes > MAX_FORM_FIELD_BYTES:
+            raise UploadError("Form fields too large", status=413)
+        self._value += data[start:end]
+
+    def _on_part_end(self):
+        if not self._is_file and self._name:
+            self.fields[self._name] = self._value.decode("utf-8", "replace")
+
+
+class UploadStore:
+    """
+    Model uploads under one models directory
+
+    Bytes are streamed to `.uploads/<id>.part` with the size limit enforced
+    per chunk (the upload is aborted as soon as it is exceeded) and SHA-256
+    computed incrementally, so a file is never held in memory. A committed
+    file is renamed into `.blobs/<sha256>` and hard-linked (atomically, via
+    a temporary name) to `<project>/<filename>`, so identical content is
+    stored once. If the blob already exists, the part file is dropped.
+
+    Uploads can be sent in several requests: each write must start at the
+    current offset, and an interrupted request keeps every chunk that was
+    fully received. Idle uploads expire after session_ttl seconds.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        max_bytes: int,
+        chunk_size: int = 1 << 20,
+        session_ttl: float = 3600.0,
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.chunk_size = max(1, chunk_size)
+        self.session_ttl = session_ttl
+        self.blob_dir = os.path.join(root, ".blobs")
+        self.part_dir = os.path.join(root, ".uploads")
+
+        self.uploads: Dict[str, Upload] = {}
+        # Orders blob renames/links against pruning (commits run in threads)
+        self._blob_lock = threading.Lock()
+
+    def blob_path(self, sha256: str) -> str:
+        return os.path.join(self.blob_dir, sha256)
+
+    def has_blob(self, sha256: str) -> bool:
+        return os.path.isfile(self.blob_path(sha256))
+
+    # ============== Upload lifecycle ==============
+
+    def begin(
+        self,
+        project_id: Optional[str],
+        filename: str,
+        size: Optional[int] = None,
+        sha256: Optional[str] = None,
+    ) -> Upload:
+        """
+        Start an upload (call dedupe() first to skip content already stored)
+
+        project_id may be None if it is only known later; it must be set
+        on the upload before commit().
+        """
+        self.expire()
+
+        project_id = safe_name(project_id) if project_id is not None else None
+        filename = safe_name(filename)
+        if size is not None:
+            if size < 0:
+                raise UploadError("size must be non-negative")
+            if size > self.max_bytes:
+                raise UploadError(self._too_large(), status=413)
+        if sha256 is not None:
+            sha256 = sha256.lower()
+            if not SHA256_PATTERN.match(sha256):
+                raise UploadError("sha256 must be 64 hex digits")
+
+        os.makedirs(self.part_dir, exist_ok=True)
+        upload_id = uuid.uuid4().hex
+        part_path = os.path.join(self.part_dir, f"{upload_id}.part")
+        open(part_path, "wb").close()
+
+        upload = Upload(
+            id=upload_id,
+            project_id=project_id,
+            filename=filename,
+            part_path=part_path,
+            size=size,
+            sha256=sha256,
+        )
+        self.uploads[upload_id] = upload
+        return upload
+
+    def get(self, upload_id: str) -> Upload:
+        upload = self.uploads.get(upload_id)
+        if upload is None:
+            raise UploadError("Upload not found", status=404)
+        return upload
+
+    async def write(self, upload: Upload, chunks: AsyncIterator[bytes], offset: int) -> int:
+        """
+        Append a stream of bytes at `offset` (must equal upload.received)
+
+        Data is buffered up to chunk_size, then written and hashed in a worker
+        thread. Exceeding the declared size or max_bytes aborts the upload.
+
+        Returns:
+            The new offset
+        """
+        if upload.lock.locked():
+            raise UploadError("Another write to this upload is in progress", status=409)
+
+        async with upload.lock:
+            if offset != upload.received:
+                raise UploadError(
+                    f"Offset mismatch: upload is at {upload.received}, got {offset}",
+                    status=409,
+                )
+
+            limit = self.max_bytes if upload.size is None else upload.size
+            with open(upload.part_path, "ab") as f:
+                buffer = bytearray()
+                try:
+                    async for chunk in chunks:
+                        if upload.received + len(buffer) + len(chunk) > limit:
+                            self.abort(upload.id)
+                            if limit == upload.size:
+                                raise UploadError(f"Upload exceeds declared size of {upload.size} bytes", status=413)
+                            raise UploadError(self._too_large(), status=413)
+
+                        buffer += chunk
+                        if len(buffer) >= self.chunk_size:
+                            await self._flush(upload, f, buffer)
+                            buffer = bytearray()
+                finally:
+                    # Keep what arrived before a disconnect, so the client can resume
+                    if buffer and upload.id in self.uploads:
+                        await self._flush(upload, f, buffer)
+
+            upload.updated_at = time.time()
+            return upload.received
+
+    async def _flush(self, upload: Upload, f, data: bytearray):
+        def append():
+            f.write(data)
+            upload.hasher.update(data)
+
+        await asyncio.to_thread(append)
+        upload.received += len(data)
+
+    def commit(self, upload: Upload) -> Dict:
+        """
+        Verify and store a finished upload (blocking file operations)
+
+        Returns:
+            {"path", "sha256", "size", "deduplicated"}
+        """
+        if upload.project_id is None:
+            raise UploadError("project_id is required")
+        if upload.size is not None and upload.received != upload.size:
+            raise UploadError(
+                f"Upload incomplete: {upload.received} of {upload.size} bytes received",
+                status=409,
+            )
+
+        digest = upload.hasher.hexdigest()
+        if upload.sha256 is not None and digest != upload.sha256:
+            self.abort(upload.id)
+            raise UploadError(f"SHA-256 mismatch: expected {upload.sha256}, got {digest}")
+
+        os.makedirs(self.blob_dir, exist_ok=True)
+        with self._blob_lock:
+            deduplicated = self.has_blob(digest)
+            if deduplicated:
+                os.remove(upload.part_path)
+            else:
+                os.replace(upload.part_path, self.blob_path(digest))
+            self.uploads.pop(upload.id, None)
+            path = self._link(digest, upload.project_id, upload.filename)
+
+        return {
+            "path": path,
+            "sha256": digest,
+            "size": upload.received,
+            "deduplicated": deduplicated,
+        }
+
+    def dedupe(self, project_id: str, filename: str, sha256: str) -> Optional[Dict]:
+        """Link an already-stored blob as project_id/filename; None if not stored"""
+        sha256 = sha256.lower()
+        project_id, filename = safe_name(project_id), safe_name(filename)
+        if not SHA256_PATTERN.match(sha256):
+            return None
+
+        with self._blob_lock:
+            if not self.has_blob(sha256):
+                return None
+            return {
+                "path": self._link(sha256, project_id, filename),
+                "sha256": sha256,
+                "size": os.path.getsize(self.blob_path(sha256)),
+                "deduplicated": True,
+            }
+
+    def abort(self, upload_id: str) -> bool:
+        upload = self.uploads.pop(upload_id, None)
+        if upload is None:
+            return False
+        self.remove_parts([upload])
+        return True
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Abort uploads idle for longer than session_ttl"""
+        stale = self.pop_expired(now)
+        self.remove_parts(stale)
+        return len(stale)
+
+    def pop_expired(self, now: Optional[float] = None) -> List[Upload]:
+        """
+        Forget uploads idle for longer than session_ttl (on the event loop)
+        and return them; their .part files are deleted by remove_parts(),
+        which can run in a thread
+        """
+        now = time.time() if now is None else now
+        stale = [
+            upload_id for upload_id, upload in self.uploads.items()
+            if not upload.lock.locked() and now - upload.updated_at > self.session_ttl
+        ]
+        return [self.uploads.pop(upload_id) for upload_id in stale]
+
+    def remove_parts(self, uploads: List[Upload]):
+        for upload in uploads:
+            try:
+                os.remove(upload.part_path)
+            except FileNotFoundError:
+                pass
+
+    # ============== Blob store ==============
+
+    def _link(self, sha256: str, project_id: str, filename: str) -> str:
+        """Atomically point project_id/filename at a blob (hard link, or copy)"""
+        project_dir = os.path.join(self.root, project_id)
+        os.makedirs(project_dir, exist_ok=True)
+
+        path = os.path.join(project_dir, filename)
+        tmp = os.path.join(project_dir, f".{filename}.{uuid.uuid4().hex}.tmp")
+        try:
+            os.link(self.blob_path(sha256), tmp)
+        except OSError:
+            shutil.copyfile(self.blob_path(sha256), tmp)
+        os.replace(tmp, path)
+        # rename() is a no-op when both names already link to the blob
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+        return path
+
+    def prune_blobs(self) -> int:
+        """
+        Delete blobs no project file links to any more (e.g. after the file
+        was replaced). Where hard links are unsupported, project files are
+        copies and this only discards blobs kept for deduplication.
+        """
+        if not os.path.isdir(self.blob_dir):
+            return 0
+
+        removed = 0
+        with self._blob_lock:
+            for name in os.listdir(self.blob_dir):
+                path = os.path.join(self.blob_dir, name)
+                if os.stat(path).st_nlink == 1:
+                    os.remove(path)
+                    removed += 1
+        return removed
+
+    async def receive(
+        self,
+        chunks: AsyncIterator[bytes],
+        project_id: str,
+        filename: str,
+    ) -> Dict:
+        """One-shot upload: stream, hash and commit"""
+        upload = self.begin(project_id, filename)
+        try:
+            await self.write(upload, chunks, 0)
+            return await asyncio.to_thread(self.commit, upload)
+        finally:
+            self.abort(upload.id)
+
+    async def receive_form(
+        self,
+        chunks: AsyncIterator[bytes],
+        content_type: str,
+        content_length: Optional[int] = None,
+        file_field: str = "file",
+    ) -> Tuple[Dict, Dict[str, str]]:
+        """
+        One-shot multipart upload: stream the file field straight from the
+        request body (never spooled), hash and commit it under the body's
+        project_id field
+
+        A body whose declared content_length cannot fit under max_bytes is
+        rejected before any of it is read.
+
+        Returns:
+            (commit result, the other form fields)
+        """
+        if content_length is not None and content_length > self.max_bytes + MAX_FORM_FIELD_BYTES:
+            raise UploadError(self._too_large(), status=413)
+
+        form = MultipartFile(content_type, file_field)
+        chunks = chunks.__aiter__()
+
+        # Parse up to the file's headers; fields sent before it are collected
+        pending: List[bytes] = []
+        async for chunk in chunks:
+            pending += form.feed(chunk)
+            if form.filename is not None:
+                break
+        if form.filename is None:
+            raise UploadError(f"Missing {file_field!r} file field")
+
+        upload = self.begin(form.fields.get("project_id"), form.filename)
+
+        async def file_data() -> AsyncIterator[bytes]:
+            for data in pending:
+                yield data
+            # The rest of the body: the file, then any trailing fields
+            async for chunk in chunks:
+                for data in form.feed(chunk):
+                    yield data
+
+        try:
+            await self.write(upload, file_data(), 0)
+            if not form.fields.get("project_id"):
+                raise UploadError("project_id is required")
+            upload.project_id = safe_name(form.fields["project_id"])
+            return await asyncio.to_thread(self.commit, upload), form.fields
+        finally:
+            self.abort(upload.id)
+
+    def _too_large(self) -> str:
+        return f"File too large. Max: {self.max_bytes // (1024 * 1024)}MB"
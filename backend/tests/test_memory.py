@@ -0,0 +1,36 @@
+import torch
+
+from avadhan.memory import MemoryHierarchy
+
+
+def make_slots(n, dim=32):
+    vector = torch.randn(dim)
+    return [{"id": f"slot_{i}", "vector": vector + 1e-4 * torch.randn(dim)} for i in range(n)]
+
+
+def test_consolidate_batch_merges_duplicates_within_the_batch():
+    slots = make_slots(10)
+
+    batched = MemoryHierarchy(dim=32, use_faiss=False)
+    gist_ids = batched.consolidate_batch(slots)
+
+    sequential = MemoryHierarchy(dim=32, use_faiss=False)
+    for slot in slots:
+        sequential.consolidate(slot)
+
+    for memory in (batched, sequential):
+        stats = memory.get_stats()
+        assert stats["episodic_count"] == 1
+        assert stats["inserted_count"] == 1
+        assert stats["merged_count"] == 9
+    assert len(set(gist_ids)) == 1
+
+
+def test_consolidate_batch_keeps_distinct_slots():
+    slots = [{"id": f"slot_{i}", "vector": vector} for i, vector in enumerate(torch.eye(32)[:5])]
+
+    memory = MemoryHierarchy(dim=32, use_faiss=False)
+    gist_ids = memory.consolidate_batch(slots)
+
+    assert len(set(gist_ids)) == 5
+    assert memory.get_stats()["merged_count"] == 0
@@ -0,0 +1,27 @@
+import threading
+
+import numpy as np
+
+from api.sessions import SQLiteSessionStore
+
+
+def flush(store, timeout=5.0) -> bool:
+    """flush() in a thread; False if it did not return within timeout"""
+    thread = threading.Thread(target=store.flush, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return not thread.is_alive()
+
+
+def test_unserializable_metrics_row_does_not_stop_the_writer(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    assert store.claim("project", {}, stale_after=60)
+
+    store.append_metrics("project", [{"epoch": 0, "loss": np.zeros(2)}])
+    assert flush(store)
+
+    store.append_metrics("project", [{"epoch": 1, "loss": 0.5}])
+    assert flush(store)
+
+    assert [row["epoch"] for row in store.metrics("project")] == [1]
+    store.close()